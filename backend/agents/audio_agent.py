@@ -1,39 +1,212 @@
-import librosa
+from collections import deque
+
 import numpy as np
 
+from stt.streaming import resample
 
-def analyze_audio_chunk(audio: np.ndarray, sample_rate: int = 16000) -> dict:
+SAMPLE_RATE = 16000
+FRAME = 512          # 32 ms analysis window
+HOP = 256            # 16 ms hop
+VOICED_RMS = 0.01    # per-frame RMS treated as speech
+# YIN search range: 70-400 Hz covers adult speaking voices.
+PITCH_MIN_HZ = 70
+PITCH_MAX_HZ = 400
+YIN_THRESHOLD = 0.15
+# Spectral-flux peaks closer than this are one syllable nucleus.
+MIN_ONSET_GAP = 6    # frames (~96 ms)
+SYLLABLES_PER_WORD = 1.5
+RATE_WINDOW_CHUNKS = 4
+
+# pitch_variance is in semitones; ~2 is an ordinary, moderately animated voice.
+DEFAULT_SIGNALS = {"energy": "MED", "pace_wpm": 130, "pitch_variance": 2.0}
+
+
+class StreamingAudioAnalyzer:
     """
-    Takes a float32 PCM numpy array and returns pace/energy/pitch signals.
+    Per-session pace/energy/pitch extractor. Frames overlap across chunk
+    boundaries (the tail of each chunk is carried into the next), spectral
+    flux continues from the previous chunk's last spectrum, and pace and
+    pitch statistics are pooled over the last few chunks instead of being
+    guessed from one chunk in isolation. All math is vectorized float32.
+
+    ``pitch_variance`` is the standard deviation of f0 in semitones (below
+    1 sounds monotone, 3+ very expressive). It used to be the zero-crossing
+    rate's spread x 1000, a different scale; ``zcr`` is still reported.
     """
-    try:
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, max_chunk_seconds: float = 4.0):
+        self.sample_rate = sample_rate
+        self._window = np.hanning(FRAME).astype(np.float32)
+        self._tau_min = sample_rate // PITCH_MAX_HZ
+        self._tau_max = sample_rate // PITCH_MIN_HZ
+        self._carry = 0
+        self._buf = np.zeros(int(max_chunk_seconds * sample_rate) + FRAME, dtype=np.float32)
+        self._prev_mag: np.ndarray | None = None
+        self._rate_history: deque[tuple[float, int]] = deque(maxlen=RATE_WINDOW_CHUNKS)
+        self._pitch_history: deque[np.ndarray] = deque(maxlen=RATE_WINDOW_CHUNKS)
+        self.pace_wpm = DEFAULT_SIGNALS["pace_wpm"]
+
+    def process(self, audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> dict:
+        try:
+            return self._process(audio, sample_rate)
+        except Exception as e:
+            print(f"Audio agent error: {e}")
+            return dict(DEFAULT_SIGNALS)
+
+    def _process(self, audio: np.ndarray, sample_rate: int) -> dict:
         if len(audio) < 100:
-            return {"energy": "MED", "pace_wpm": 130, "pitch_variance": 0.5}
+            return dict(DEFAULT_SIGNALS)
 
+        audio = np.asarray(audio, dtype=np.float32)
         if not np.all(np.isfinite(audio)):
             audio = np.nan_to_num(audio, nan=0.0, posinf=0.0, neginf=0.0)
+        audio = resample(audio, sample_rate) if sample_rate != self.sample_rate else audio
 
-        audio = audio.astype(np.float64)
-
-        rms = float(np.sqrt(np.mean(audio ** 2)))
-        if not np.isfinite(rms):
-            rms = 0.0
+        rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float32))))
         energy = "HIGH" if rms > 0.05 else "MED" if rms > 0.02 else "LOW"
 
-        zcr = float(np.mean(librosa.feature.zero_crossing_rate(y=audio)))
-        pitch_variance = round(zcr * 1000, 2)
+        frames = self._frames(audio)
+        if len(frames) == 0:
+            return {"energy": energy, "pace_wpm": self.pace_wpm,
+                    "pitch_variance": 0.0, "rms": round(rms, 4)}
+
+        frame_rms = np.sqrt(np.mean(frames * frames, axis=1))
+        voiced = frame_rms > VOICED_RMS
 
-        onset_env = librosa.onset.onset_strength(y=audio, sr=sample_rate)
-        pace_proxy = int(np.mean(onset_env) * 100)
-        pace_wpm = max(80, min(200, pace_proxy + 100))
+        signs = np.signbit(frames)
+        zcr = float(np.mean(signs[:, 1:] != signs[:, :-1]))
+
+        onsets = self._count_onsets(frames, voiced)
+        # Pace is measured over the speaking span, pauses between syllables included.
+        voiced_idx = np.flatnonzero(voiced)
+        span = (voiced_idx[-1] - voiced_idx[0] + 1) if len(voiced_idx) else 0
+        self._update_pace(span * HOP / self.sample_rate, onsets)
+
+        f0 = self._yin(frames[voiced]) if voiced.any() else np.empty(0, np.float32)
+        self._pitch_history.append(f0[f0 > 0])
+        pitch_hz, pitch_variance = self._pitch_stats()
 
         return {
             "energy": energy,
-            "pace_wpm": pace_wpm,
+            "pace_wpm": self.pace_wpm,
             "pitch_variance": pitch_variance,
+            "pitch_hz": pitch_hz,
+            "zcr": round(zcr, 4),
             "rms": round(rms, 4),
         }
 
-    except Exception as e:
-        print(f"Audio agent error: {e}")
-        return {"energy": "MED", "pace_wpm": 130, "pitch_variance": 0.5}
+    def _frames(self, audio: np.ndarray) -> np.ndarray:
+        """Overlapping frames over (carried tail + chunk), in the reused buffer."""
+        n = self._carry + len(audio)
+        if n > len(self._buf):
+            grown = np.zeros(n, dtype=np.float32)
+            grown[:self._carry] = self._buf[:self._carry]
+            self._buf = grown
+        self._buf[self._carry:n] = audio
+        if n < FRAME:
+            self._carry = n
+            return np.empty((0, FRAME), dtype=np.float32)
+
+        n_frames = 1 + (n - FRAME) // HOP
+        frames = np.lib.stride_tricks.sliding_window_view(self._buf[:n], FRAME)[::HOP][:n_frames]
+        frames = frames.copy()
+
+        # Keep the samples the next chunk's first frame must overlap with.
+        consumed = n_frames * HOP
+        self._carry = n - consumed
+        self._buf[:self._carry] = self._buf[consumed:n]
+        return frames
+
+    def _count_onsets(self, frames: np.ndarray, voiced: np.ndarray) -> int:
+        mag = np.abs(np.fft.rfft(frames * self._window, axis=1)).astype(np.float32)
+        mag = np.log1p(mag, out=mag)
+        prev = self._prev_mag if self._prev_mag is not None else mag[:1]
+        self._prev_mag = mag[-1:].copy()
+        diff = np.diff(np.concatenate([prev, mag]), axis=0)
+        flux = np.maximum(diff, 0.0).mean(axis=1)
+        flux[~voiced] = 0.0
+        if not voiced.any():
+            return 0
+
+        threshold = flux[voiced].mean() + 0.5 * flux[voiced].std()
+        peaks = np.flatnonzero(
+            (flux[1:-1] > threshold)
+            & (flux[1:-1] > flux[:-2])
+            & (flux[1:-1] >= flux[2:])
+        ) + 1
+        if len(peaks) == 0:
+            return 0
+        # Enforce the minimum gap between syllable onsets.
+        kept = 1
+        last = peaks[0]
+        for p in peaks[1:]:
+            if p - last >= MIN_ONSET_GAP:
+                kept += 1
+                last = p
+        return kept
+
+    def _update_pace(self, speech_seconds: float, onsets: int):
+        self._rate_history.append((speech_seconds, onsets))
+        total_speech = sum(s for s, _ in self._rate_history)
+        if total_speech < 0.5:
+            return
+        syllables_per_sec = sum(n for _, n in self._rate_history) / total_speech
+        wpm = syllables_per_sec * 60 / SYLLABLES_PER_WORD
+        self.pace_wpm = int(max(80, min(200, round(wpm))))
+
+    def _yin(self, frames: np.ndarray) -> np.ndarray:
+        """Vectorized YIN f0 per frame (0 where unvoiced)."""
+        tau_max = self._tau_max
+        w = FRAME - tau_max
+        n_fft = 1 << (FRAME + w - 1).bit_length()
+
+        # Cross term sum_j x[j] * x[j + tau] for j < w, all tau at once.
+        spec_full = np.fft.rfft(frames, n_fft, axis=1)
+        spec_head = np.fft.rfft(frames[:, :w], n_fft, axis=1)
+        cross = np.fft.irfft(spec_full * np.conj(spec_head), n_fft, axis=1)[:, :tau_max + 1]
+
+        sq = np.concatenate(
+            [np.zeros((len(frames), 1), np.float32), np.cumsum(frames * frames, axis=1)], axis=1
+        )
+        head_energy = sq[:, w:w + 1]
+        taus = np.arange(tau_max + 1)
+        shifted_energy = sq[:, taus + w] - sq[:, taus]
+        diff = head_energy + shifted_energy - 2 * cross
+        diff[:, 0] = 0
+
+        cumulative = np.cumsum(diff[:, 1:], axis=1)
+        cmnd = np.ones_like(diff)
+        cmnd[:, 1:] = diff[:, 1:] * taus[1:] / np.maximum(cumulative, 1e-9)
+
+        search = cmnd[:, self._tau_min:]
+        below = search < YIN_THRESHOLD
+        has_pitch = below.any(axis=1)
+        first = np.argmax(below, axis=1)
+        # Walk to the local minimum right after the threshold crossing.
+        idx = first.copy()
+        for _ in range(8):
+            nxt = np.minimum(idx + 1, search.shape[1] - 1)
+            step = search[np.arange(len(idx)), nxt] < search[np.arange(len(idx)), idx]
+            if not step.any():
+                break
+            idx = np.where(step, nxt, idx)
+        tau = (idx + self._tau_min).astype(np.float32)
+        return np.where(has_pitch, self.sample_rate / tau, 0.0).astype(np.float32)
+
+    def _pitch_stats(self) -> tuple[float, float]:
+        """Median f0 (Hz) and its spread in semitones over recent chunks."""
+        if not self._pitch_history:
+            return 0.0, 0.0
+        f0 = np.concatenate(list(self._pitch_history))
+        if len(f0) < 3:
+            return 0.0, 0.0
+        semitones = 12 * np.log2(f0 / np.median(f0))
+        return round(float(np.median(f0)), 1), round(float(np.std(semitones)), 2)
+
+
+def analyze_audio_chunk(audio: np.ndarray, sample_rate: int = 16000) -> dict:
+    """
+    Takes a float32 PCM numpy array and returns pace/energy/pitch signals.
+    Stateless: sessions should hold a StreamingAudioAnalyzer instead.
+    """
+    return StreamingAudioAnalyzer().process(audio, sample_rate)
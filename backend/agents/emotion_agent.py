@@ -1,121 +1,343 @@
-import base64
-import re
+import math
+import os
 import time
+import numpy as np
 import torch
-from models.loader import paligemma_model, paligemma_processor, DEVICE, PALIGEMMA_RESOLUTION
-
-# Map categories to their keywords.
-# Weights indicate positive (engaged) or negative (disengaged) engagement delta.
-EMOTION_CATEGORY = {
-    "engaged":     ["attentive", "interested", "engaged", "nodding", "smiling",
-                    "happy", "excited", "leaning", "smile", "grinning", "grin",
-                    "laughing", "focused", "concentrating", "talking", "speaking",
-                    "presenting", "gesturing", "looking at camera",
-                    "looking at the camera", "eye contact", "bright"],
-    "neutral":     ["neutral", "calm", "relaxed", "steady", "sitting", "standing",
-                    "person", "listening"],
-    "confused":    ["confused", "frowning", "puzzled", "uncertain", "squinting",
-                    "furrowed", "tilted head", "raised eyebrow"],
-    "checked_out": ["bored", "disengaged", "distracted", "tired", "looking away",
-                    "looking down", "phone", "yawning", "arms crossed",
-                    "frustrated", "skeptical", "slouching", "slumped",
-                    "looking at phone", "looking at their phone",
-                    "eyes closed", "sleeping"],
-}
+from models.loader import DEVICE, PALIGEMMA_RESOLUTION, registry
+from agents.faces import FACE_DETECTION, crop_faces, detect_faces, face_limit
+from agents.preprocess import PixelBuffer, decode_frame, decode_pool, resize_square
+from agents.lexicon import DEFAULT_LEXICON, NEUTRAL_EMOTIONS
+
+EMA_ALPHA = 0.35
 
-KEYWORD_WEIGHTS = {
-    # Negative
-    "confused": -20, "bored": -25, "disengaged": -30, "frustrated": -25,
-    "skeptical": -15, "distracted": -20, "tired": -15, "frowning": -15,
-    "arms crossed": -15, "looking away": -20, "looking down": -15,
-    "phone": -30, "looking at phone": -30, "looking at their phone": -30,
-    "puzzled": -18, "uncertain": -15, "squinting": -10, "yawning": -25,
-    "slouching": -15, "slumped": -15, "eyes closed": -25, "sleeping": -30,
-    "furrowed": -12, "tilted head": -5, "raised eyebrow": -8,
-    # Neutral
-    "neutral": 0, "calm": 5, "relaxed": 5, "steady": 5,
-    "sitting": 0, "standing": 0, "person": 0, "listening": 5,
-    # Positive
-    "attentive": 15, "interested": 20, "engaged": 25, "nodding": 20,
-    "smiling": 25, "smile": 25, "grinning": 22, "grin": 22,
-    "happy": 20, "excited": 30, "leaning": 10, "laughing": 25,
-    "focused": 18, "concentrating": 15, "talking": 10, "speaking": 10,
-    "presenting": 10, "gesturing": 12, "looking at camera": 15,
-    "looking at the camera": 15, "eye contact": 18, "bright": 8,
+PROMPT = "<image>answer en Describe the person's facial expression, body language, and emotional state. Are they engaged, confused, bored, or excited?\n"
+
+# "caption" generates a description and scores it with the lexicon.
+# "classify" runs a single forward pass and reads the next-token
+# probabilities of a fixed label set; no decoding at all.
+VISION_MODE = os.environ.get("PITCHMIND_VISION_MODE", "caption")
+CLASSIFY_PROMPT = "<image>answer en Is the person engaged, neutral, confused, or bored?\n"
+# Answer words counted toward each label; a label's logit is the
+# log-sum-exp over the first tokens of its words.
+LABEL_WORDS = {
+    "engaged": ("engaged", "interested", "attentive", "happy", "excited"),
+    "neutral": ("neutral", "calm"),
+    "confused": ("confused", "puzzled"),
+    "checked_out": ("bored", "distracted", "tired"),
 }
+# Engagement score of a confident answer; the frame's score is the
+# probability-weighted mean.
+LABEL_SCORES = {"engaged": 85, "neutral": 55, "confused": 30, "checked_out": 15}
+# In classify mode, a caption is still generated at most this often (in
+# seconds) for the "signal" text; 0 turns captions off.
+CAPTION_INTERVAL = float(os.environ.get("PITCHMIND_VISION_CAPTION_INTERVAL", 30))
+# Per-face crops together cost no more than one whole 448 px frame.
+FACES_PER_FRAME = face_limit(PALIGEMMA_RESOLUTION)
 
-_KEYWORD_TO_CATEGORY = {}
-for cat, keywords in EMOTION_CATEGORY.items():
-    for kw in keywords:
-        _KEYWORD_TO_CATEGORY[kw] = cat
+_label_ids: dict[str, list[int]] | None = None
+_pixels: PixelBuffer | None = None
+# Tokenized prompt (with its expanded <image> tokens) by prompt text; it
+# is identical for every frame.
+_prompt_inputs: dict[str, dict] = {}
+# Last side caption per session ("" for callers that don't say).
+_last_caption_time: dict[str, float] = {}
+
+
+class ScoreSmoother:
+    """Exponential moving average of engagement scores across one session's frames."""
+
+    def __init__(self, alpha: float = EMA_ALPHA):
+        self.alpha = alpha
+        self.value: float | None = None
+
+    def update(self, raw_score: int) -> int:
+        if self.value is None:
+            self.value = float(raw_score)
+        else:
+            self.value = self.alpha * raw_score + (1 - self.alpha) * self.value
+        return int(round(self.value))
 
-MAX_SCORE_DELTA = 40
-EMA_ALPHA = 0.35
-_ema_score: float | None = None
 
+_default_smoother = ScoreSmoother()
 
-def analyze_frame(frame_base64: str) -> dict:
+
+def analyze_frame(frame: str | bytes, smoother: ScoreSmoother | None = None) -> dict:
     """
-    Analyze a base64 JPEG frame for audience emotion/engagement.
+    Analyze a JPEG frame (base64 text or raw bytes) for audience emotion/engagement.
     Returns dominant emotion, smoothed score, emotion distribution,
     confidence, and the raw vision-model signal.
     """
-    if paligemma_model is None or paligemma_processor is None:
-        return _fallback("Vision model not loaded")
+    return smooth(analyze_frames([frame])[0], smoother or _default_smoother)
+
 
+def analyze_frames(frames: list[str | bytes], sessions: list[str] | None = None) -> list[dict]:
+    """
+    Batched variant of ``analyze_frame``: one padded ``generate`` call (or
+    one forward pass in classify mode) for all faces in all frames. Frames
+    without a face skip the model. Scores are returned unsmoothed
+    (``score == raw_score``) so each caller can apply its own session's
+    EMA with ``smooth``. ``sessions`` names each frame's session, so the
+    classify mode's occasional captions are paced per session.
+    """
+    vision = registry.get("vision")
+    if vision is None:
+        return [_fallback("Vision model not loaded") for _ in frames]
+
+    results: list[dict | None] = [None] * len(frames)
+    # Per prepared frame: its face boxes (None: scored whole) and model inputs.
+    groups, slots = [], []
+    # Decoding releases the GIL, so the batch's frames decode in parallel.
+    for i, prepared in enumerate(decode_pool.map(_prepare_frame, frames)):
+        if isinstance(prepared, dict):
+            results[i] = prepared
+        else:
+            groups.append(prepared)
+            slots.append(i)
+
+    # Faces from every frame in the batch go through the model together.
+    images = [img for _, inputs in groups for img in inputs]
+    owners = [sessions[i] if sessions else "" for i, (_, inputs) in zip(slots, groups)
+              for _ in inputs]
+    if images:
+        try:
+            t0 = time.time()
+            scored = _score_images(vision, images, owners)
+            elapsed = time.time() - t0
+            start = 0
+            for i, (boxes, inputs) in zip(slots, groups):
+                part = scored[start:start + len(inputs)]
+                start += len(inputs)
+                results[i] = part[0] if boxes is None else _aggregate_faces(part, boxes)
+            print(f"[Emotion] {elapsed:.1f}s for {VISION_MODE} batch of {len(images)} "
+                  f"images from {len(groups)} frames")
+        except Exception as e:
+            import traceback
+            print(f"Emotion agent error: {e}")
+            traceback.print_exc()
+            for i in slots:
+                results[i] = _fallback(str(e)[:100])
+
+    return results
+
+
+def _prepare_frame(frame: str | bytes) -> tuple | dict:
+    """(face boxes or None, model-ready images), or a fallback result."""
     try:
+        image = decode_frame(frame, PALIGEMMA_RESOLUTION)
+    except Exception as e:
+        print(f"Emotion agent decode error: {e}")
+        return _fallback(str(e)[:100])
+    boxes = detect_faces(np.asarray(image), FACES_PER_FRAME) if FACE_DETECTION else None
+    if boxes is None:
+        return None, [resize_square(image, PALIGEMMA_RESOLUTION)]
+    if not boxes:
+        return _fallback("No face in frame")
+    return boxes, crop_faces(image, boxes, PALIGEMMA_RESOLUTION)
+
+
+def _score_images(vision: tuple, images: list, owners: list[str] | None = None) -> list[dict]:
+    """Unsmoothed result dicts for model-ready images, in the configured mode."""
+    if VISION_MODE == "classify":
+        probabilities = _classify_batch(vision, images)
+        captions = _side_captions(vision, images, owners or [""] * len(images))
+        return [_result_from_probabilities(p, c) for p, c in zip(probabilities, captions)]
+    return [_result_from_caption(response) for response in _caption_batch(vision, images)]
+
+
+def smooth(result: dict, smoother: ScoreSmoother) -> dict:
+    """Apply a session's EMA to an unsmoothed result (fallbacks pass through)."""
+    if result.get("confidence", 0.0) == 0.0 and not result.get("raw"):
+        return result
+    smoothed = smoother.update(result["raw_score"])
+    print(f"[Emotion] score={smoothed} raw={result['raw_score']} "
+          f"dom={result['dominant_emotion']} conf={result['confidence']:.1f} | "
+          f"{result['raw'][:100]}")
+    return {**result, "score": smoothed}
+
+
+def _model_inputs(vision: tuple, prompt: str, images: list) -> dict:
+    """
+    Model kwargs for ``images`` under ``prompt``: the cached prompt tokens
+    repeated per row, and pixels normalized into the reusable buffer.
+    """
+    global _pixels
+    paligemma_model, paligemma_processor = vision
+    image_processor = paligemma_processor.image_processor
+    if _pixels is None:
+        size = image_processor.size
+        _pixels = PixelBuffer.for_processor(
+            image_processor, getattr(size, "height", None) or size["height"]
+        )
+    text = _prompt_inputs.get(prompt)
+    if text is None:
         from PIL import Image
-        import io
+        sample = paligemma_processor(
+            text=[prompt], images=[Image.new("RGB", (_pixels.size, _pixels.size))],
+            return_tensors="pt",
+        )
+        # The processor also returns training labels; they'd add a loss.
+        text = {k: v for k, v in sample.items() if k not in ("pixel_values", "labels")}
+        _prompt_inputs[prompt] = text
 
-        t0 = time.time()
+    inputs = {k: v.expand(len(images), -1).to(DEVICE) for k, v in text.items()}
+    inputs["pixel_values"] = _pixels.fill(images).to(DEVICE, dtype=paligemma_model.dtype)
+    return inputs
 
-        img_bytes = base64.b64decode(frame_base64)
-        image = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-        image = image.resize((PALIGEMMA_RESOLUTION, PALIGEMMA_RESOLUTION))
 
-        prompt = "<image>answer en Describe the person's facial expression, body language, and emotional state. Are they engaged, confused, bored, or excited?\n"
+def _caption_batch(vision: tuple, images: list) -> list[str]:
+    paligemma_model, paligemma_processor = vision
+    inputs = _model_inputs(vision, PROMPT, images)
 
-        inputs = paligemma_processor(
-            text=prompt,
-            images=image,
-            return_tensors="pt",
-        ).to(DEVICE)
-
-        with torch.no_grad():
-            outputs = paligemma_model.generate(
-                **inputs,
-                max_new_tokens=120,
-                do_sample=False,
-            )
-
-        input_len = inputs["input_ids"].shape[-1]
-        response = paligemma_processor.decode(
-            outputs[0][input_len:], skip_special_tokens=True
-        ).strip()
-
-        elapsed = time.time() - t0
-
-        parsed = _parse_emotion(response)
-        smoothed_score = _apply_ema(parsed["score"])
-
-        print(f"[Emotion] {elapsed:.1f}s | score={smoothed_score} raw={parsed['score']} "
-              f"dom={parsed['dominant_emotion']} conf={parsed['confidence']:.1f} | {response[:100]}")
-
-        return {
-            "dominant_emotion": parsed["dominant_emotion"],
-            "score": smoothed_score,
-            "raw_score": parsed["score"],
-            "emotions": parsed["emotions"],
-            "confidence": parsed["confidence"],
-            "signal": response[:200] if response else "",
-            "raw": response,
+    with torch.no_grad():
+        outputs = paligemma_model.generate(
+            **inputs,
+            max_new_tokens=120,
+            do_sample=False,
+        )
+
+    input_len = inputs["input_ids"].shape[-1]
+    return [
+        paligemma_processor.decode(row[input_len:], skip_special_tokens=True).strip()
+        for row in outputs
+    ]
+
+
+def _classify_batch(vision: tuple, images: list) -> list[dict[str, float]]:
+    """Label probabilities per image from one prefill; nothing is decoded."""
+    paligemma_model, paligemma_processor = vision
+    inputs = _model_inputs(vision, CLASSIFY_PROMPT, images)
+
+    with torch.no_grad():
+        # Only the last position's logits; the full sequence over a 256k
+        # vocabulary would be gigabytes.
+        logits = paligemma_model(**inputs, logits_to_keep=1).logits[:, -1, :].float()
+
+    label_ids = _label_token_ids(paligemma_processor.tokenizer)
+    label_logits = torch.stack(
+        [torch.logsumexp(logits[:, ids], dim=-1) for ids in label_ids.values()], dim=-1
+    )
+    probs = torch.softmax(label_logits, dim=-1).cpu().tolist()
+    return [dict(zip(label_ids, row)) for row in probs]
+
+
+def _label_token_ids(tokenizer) -> dict[str, list[int]]:
+    """
+    First token of each answer word, with and without a leading space and
+    capitalized. Tokens that start words of two different labels are
+    dropped so they can't count twice.
+    """
+    global _label_ids
+    if _label_ids is None:
+        candidates = {}
+        for label, words in LABEL_WORDS.items():
+            ids = set()
+            for word in words:
+                for form in (word, f" {word}", word.capitalize(), f" {word.capitalize()}"):
+                    tokens = tokenizer.encode(form, add_special_tokens=False)
+                    if tokens:
+                        ids.add(tokens[0])
+            candidates[label] = ids
+        _label_ids = {
+            label: sorted(ids - set().union(*(o for l, o in candidates.items() if l != label)))
+            for label, ids in candidates.items()
         }
+    return _label_ids
 
-    except Exception as e:
-        import traceback
-        print(f"Emotion agent error: {e}")
-        traceback.print_exc()
-        return _fallback(str(e)[:100])
+
+def _side_captions(vision: tuple, images: list, owners: list[str]) -> list[str]:
+    """
+    Captions for the images of sessions whose caption interval has passed
+    (each session keeps its own clock), blanks for the rest.
+    """
+    captions = [""] * len(images)
+    if CAPTION_INTERVAL <= 0:
+        return captions
+    now = time.monotonic()
+    due = {o for o in set(owners)
+           if now - _last_caption_time.get(o, float("-inf")) >= CAPTION_INTERVAL}
+    if not due:
+        return captions
+    for o in due:
+        _last_caption_time[o] = now
+    picked = [i for i, o in enumerate(owners) if o in due]
+    for i, caption in zip(picked, _caption_batch(vision, [images[i] for i in picked])):
+        captions[i] = caption
+    return captions
+
+
+def forget_session(session_id: str):
+    """Drop a finished session's caption clock."""
+    _last_caption_time.pop(session_id, None)
+
+
+def _result_from_probabilities(probs: dict[str, float], caption: str = "") -> dict:
+    score = int(round(sum(p * LABEL_SCORES[label] for label, p in probs.items())))
+    # 1 when all mass is on one label, 0 when the labels are equally likely.
+    entropy = -sum(p * math.log(p) for p in probs.values() if p > 0)
+    confidence = max(0.0, 1.0 - entropy / math.log(len(probs)))
+    summary = ", ".join(f"{label} {p:.2f}" for label, p in probs.items())
+    return {
+        "dominant_emotion": max(probs, key=probs.get),
+        "score": score,
+        "raw_score": score,
+        "emotions": {label: int(round(p * 100)) for label, p in probs.items()},
+        "confidence": round(confidence, 3),
+        "signal": caption[:200],
+        "raw": caption or summary,
+    }
+
+
+def _result_from_caption(response: str) -> dict:
+    parsed = _parse_emotion(response)
+    return {
+        "dominant_emotion": parsed["dominant_emotion"],
+        "score": parsed["score"],
+        "raw_score": parsed["score"],
+        "emotions": parsed["emotions"],
+        "confidence": parsed["confidence"],
+        "signal": response[:200] if response else "",
+        "raw": response,
+    }
+
+
+def _aggregate_faces(faces: list[dict], boxes: list) -> dict:
+    """
+    One reading for a frame from its per-face results: a confidence-weighted
+    mean, with each face kept under ``"faces"``.
+    """
+    weights = [max(f["confidence"], 0.05) for f in faces]
+    total = sum(weights)
+    score = int(round(sum(w * f["raw_score"] for w, f in zip(weights, faces)) / total))
+    emotions = {
+        category: int(round(sum(w * f["emotions"].get(category, 0)
+                                for w, f in zip(weights, faces)) / total))
+        for category in faces[0]["emotions"]
+    }
+    lead = max(faces, key=lambda f: f["confidence"])
+    if len(faces) == 1:
+        signal, raw = lead["signal"], lead["raw"]
+    else:
+        signal = " | ".join(f"Face {n}: {f['signal']}" for n, f in enumerate(faces, 1) if f["signal"])
+        raw = " | ".join(f"Face {n}: {f['raw']}" for n, f in enumerate(faces, 1) if f["raw"])
+    return {
+        "dominant_emotion": lead["dominant_emotion"],
+        "score": score,
+        "raw_score": score,
+        "emotions": emotions,
+        "confidence": round(sum(f["confidence"] for f in faces) / len(faces), 3),
+        "signal": signal[:200],
+        "raw": raw,
+        "faces": [
+            {
+                "box": [int(v) for v in box],
+                "score": f["raw_score"],
+                "dominant_emotion": f["dominant_emotion"],
+                "emotions": f["emotions"],
+                "confidence": f["confidence"],
+            }
+            for box, f in zip(boxes, faces)
+        ],
+    }
 
 
 def _fallback(reason: str) -> dict:
@@ -123,89 +345,16 @@ def _fallback(reason: str) -> dict:
         "dominant_emotion": "neutral",
         "score": 50,
         "raw_score": 50,
-        "emotions": {"engaged": 10, "neutral": 60, "confused": 10, "checked_out": 20},
+        "emotions": dict(NEUTRAL_EMOTIONS),
         "confidence": 0.0,
         "signal": reason,
         "raw": "",
     }
 
 
-def _apply_ema(raw_score: int) -> int:
-    """Exponential moving average across consecutive frames."""
-    global _ema_score
-    if _ema_score is None:
-        _ema_score = float(raw_score)
-    else:
-        _ema_score = EMA_ALPHA * raw_score + (1 - EMA_ALPHA) * _ema_score
-    return int(round(_ema_score))
-
-
 def _parse_emotion(text: str) -> dict:
     """
     Parse PaliGemma free-text output into a structured emotion result:
     dominant_emotion, engagement score, per-category distribution, confidence.
     """
-    text_lower = text.lower()
-
-    # Match multi-word keywords first (longest match wins for overlapping phrases)
-    hits: list[tuple[str, int]] = []
-    matched_spans: list[tuple[int, int]] = []
-
-    sorted_keywords = sorted(KEYWORD_WEIGHTS.keys(), key=len, reverse=True)
-    for keyword in sorted_keywords:
-        pos = text_lower.find(keyword)
-        if pos >= 0:
-            end = pos + len(keyword)
-            overlaps = any(
-                not (end <= ms or pos >= me) for ms, me in matched_spans
-            )
-            if not overlaps:
-                hits.append((keyword, KEYWORD_WEIGHTS[keyword]))
-                matched_spans.append((pos, end))
-
-    # Filter out the generic "person" / "sitting" / "standing" hits if stronger
-    # signals are present, to avoid diluting the distribution.
-    strong_hits = [(kw, d) for kw, d in hits if abs(d) >= 10]
-    if strong_hits:
-        hits = strong_hits
-
-    confidence = min(1.0, len(hits) / 3.0) if hits else 0.0
-
-    best_emotion = "neutral"
-    best_weight = 0
-    capped_delta = 0
-
-    for keyword, delta in hits:
-        if abs(delta) > abs(best_weight):
-            best_weight = delta
-            best_emotion = keyword
-        capped_delta += delta
-
-    capped_delta = max(-MAX_SCORE_DELTA, min(MAX_SCORE_DELTA, capped_delta))
-    score = max(0, min(100, 50 + capped_delta))
-
-    explicit = re.search(r"(?:engagement|score|level)[:\s]*(\d+)", text_lower)
-    if explicit:
-        score = max(0, min(100, int(explicit.group(1))))
-
-    category_hits: dict[str, int] = {"engaged": 0, "neutral": 0, "confused": 0, "checked_out": 0}
-    for keyword, _ in hits:
-        cat = _KEYWORD_TO_CATEGORY.get(keyword)
-        if cat:
-            category_hits[cat] += 1
-
-    total_hits = sum(category_hits.values()) or 1
-    emotions = {
-        cat: int(round(count / total_hits * 100))
-        for cat, count in category_hits.items()
-    }
-
-    if not hits:
-        emotions = {"engaged": 10, "neutral": 60, "confused": 10, "checked_out": 20}
-
-    return {
-        "dominant_emotion": best_emotion,
-        "score": score,
-        "emotions": emotions,
-        "confidence": confidence,
-    }
+    return DEFAULT_LEXICON.score(text)
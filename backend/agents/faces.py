@@ -0,0 +1,143 @@
+"""
+Face detection ahead of the vision model. Frames with nobody in them
+skip inference, and each person in a group shot is scored from their
+own crop instead of one blended reading of the whole room.
+
+OpenCV's Haar cascade runs on a small grayscale copy of the frame, a
+few milliseconds on CPU. OpenCV 5 dropped the cascade; there, or to get
+better recall on turned heads and low light, point
+PITCHMIND_FACE_MODEL at a YuNet ONNX file (face_detection_yunet_*.onnx
+from the OpenCV model zoo).
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+
+FACE_DETECTION = os.environ.get("PITCHMIND_FACE_DETECTION", "1") != "0"
+FACE_MODEL = os.environ.get("PITCHMIND_FACE_MODEL", "")
+MAX_FACES = int(os.environ.get("PITCHMIND_MAX_FACES", 4))
+# Detection runs on a copy this wide; webcam faces are large enough.
+DETECT_WIDTH = 320
+# Faces narrower than this fraction of the frame are ignored (background).
+MIN_FACE_FRACTION = 0.06
+# Context kept around each face box, as a fraction of its size, so the
+# crop still shows head tilt, shoulders and hands.
+CROP_MARGIN = 0.4
+# PaliGemma's SigLIP encoder: one image token per 14x14 patch.
+PATCH = 14
+# What one whole frame cost at the 448 px checkpoint, in image tokens.
+FRAME_TOKEN_BUDGET = (448 // PATCH) ** 2
+
+# Cascade and network objects are not safe to share between threads, and
+# frames are detected on the decode pool, so each thread builds its own.
+_local = threading.local()
+_unavailable = False
+_stats = {"frames": 0, "no_face": 0, "faces": 0, "faces_over_limit": 0,
+          "crops": 0, "image_tokens": 0}
+
+
+class _HaarDetector:
+    def __init__(self):
+        path = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        self._cascade = cv2.CascadeClassifier(path)
+
+    def detect(self, gray: np.ndarray, bgr: np.ndarray) -> list:
+        min_side = max(12, int(gray.shape[1] * MIN_FACE_FRACTION))
+        return list(self._cascade.detectMultiScale(
+            cv2.equalizeHist(gray), scaleFactor=1.15, minNeighbors=5,
+            minSize=(min_side, min_side),
+        ))
+
+
+class _YuNetDetector:
+    def __init__(self, model_path: str):
+        self._net = cv2.FaceDetectorYN.create(model_path, "", (DETECT_WIDTH, DETECT_WIDTH))
+
+    def detect(self, gray: np.ndarray, bgr: np.ndarray) -> list:
+        self._net.setInputSize((bgr.shape[1], bgr.shape[0]))
+        _, faces = self._net.detect(bgr)
+        min_side = bgr.shape[1] * MIN_FACE_FRACTION
+        return [f[:4] for f in (faces if faces is not None else []) if f[2] >= min_side]
+
+
+def _get_detector():
+    """The configured detector, or None (logged once) if OpenCV can't provide one."""
+    global _unavailable
+    detector = getattr(_local, "detector", None)
+    if detector is None and not _unavailable:
+        if FACE_MODEL:
+            detector = _local.detector = _YuNetDetector(FACE_MODEL)
+        elif hasattr(cv2, "CascadeClassifier"):
+            detector = _local.detector = _HaarDetector()
+        else:
+            print("⚠ OpenCV has no Haar cascades (OpenCV 5): set PITCHMIND_FACE_MODEL to a "
+                  "YuNet ONNX file or install opencv-python-headless<5; scoring whole frames")
+            _unavailable = True
+    return detector
+
+
+def face_limit(size: int) -> int:
+    """
+    Faces scored per frame at crop ``size``: MAX_FACES, but never so many
+    that their crops cost more image tokens than one 448 px frame (4 at
+    224 px, 1 at 448 px).
+    """
+    return max(1, min(MAX_FACES, FRAME_TOKEN_BUDGET // (size // PATCH) ** 2))
+
+
+def detect_faces(rgb: np.ndarray, limit: int = MAX_FACES) -> list[tuple[int, int, int, int]] | None:
+    """
+    Up to ``limit`` face boxes ``(x, y, w, h)`` in ``rgb`` pixels, largest
+    first, or None when no detector is available.
+    """
+    detector = _get_detector()
+    if detector is None:
+        return None
+    h, w = rgb.shape[:2]
+    scale = min(1.0, DETECT_WIDTH / w)
+    small = rgb if scale == 1.0 else cv2.resize(
+        rgb, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA
+    )
+    bgr = cv2.cvtColor(small, cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+    boxes = detector.detect(gray, bgr)
+    boxes = sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)
+    _stats["faces_over_limit"] += max(0, len(boxes) - limit)
+    boxes = boxes[:limit]
+
+    _stats["frames"] += 1
+    _stats["faces"] += len(boxes)
+    _stats["no_face"] += not boxes
+    return [tuple(int(round(v / scale)) for v in box) for box in boxes]
+
+
+def crop_faces(image, boxes, size: int) -> list:
+    """Square ``size``x``size`` crops of a PIL image around each face box."""
+    crops = []
+    for x, y, w, h in boxes:
+        side = max(w, h) * (1 + 2 * CROP_MARGIN)
+        cx, cy = x + w / 2, y + h / 2
+        left = int(max(0, cx - side / 2))
+        top = int(max(0, cy - side / 2))
+        right = int(min(image.width, cx + side / 2))
+        bottom = int(min(image.height, cy + side / 2))
+        crops.append(image.crop((left, top, right, bottom)).resize((size, size)))
+    _stats["crops"] += len(crops)
+    _stats["image_tokens"] += len(crops) * (size // PATCH) ** 2
+    return crops
+
+
+def face_stats() -> dict:
+    frames = _stats["frames"]
+    scored = frames - _stats["no_face"]
+    return {
+        "enabled": FACE_DETECTION,
+        **_stats,
+        "no_face_rate": round(_stats["no_face"] / frames, 3) if frames else 0.0,
+        # Vision cost per frame that reached the model, against the whole
+        # 448 px frame every frame used to cost.
+        "image_tokens_per_frame": round(_stats["image_tokens"] / scored, 1) if scored else 0.0,
+        "whole_frame_tokens": FRAME_TOKEN_BUDGET,
+    }
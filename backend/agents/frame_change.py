@@ -0,0 +1,105 @@
+import base64
+import io
+import os
+import threading
+
+import numpy as np
+from PIL import Image
+
+THUMB_SIZE = 32
+# Mean absolute grayscale difference (0-255) between 32x32 thumbnails
+# below which a frame counts as "nothing changed".
+CHANGE_THRESHOLD = float(os.environ.get("PITCHMIND_FRAME_CHANGE_THRESHOLD", 6.0))
+# Re-run the vision model at least this often even on a static shot, so a
+# slowly changing expression still gets a fresh reading.
+MAX_CONSECUTIVE_SKIPS = int(os.environ.get("PITCHMIND_FRAME_MAX_SKIPS", 10))
+
+_totals = {"analyzed": 0, "skipped": 0}
+_totals_lock = threading.Lock()
+
+
+def thumbnail(frame: str | bytes) -> np.ndarray:
+    """Tiny grayscale float32 thumbnail; JPEGs are DCT-downscaled while decoding."""
+    img_bytes = frame if isinstance(frame, bytes) else base64.b64decode(frame)
+    image = Image.open(io.BytesIO(img_bytes))
+    image.draft("L", (THUMB_SIZE * 2, THUMB_SIZE * 2))
+    image = image.convert("L").resize((THUMB_SIZE, THUMB_SIZE), Image.BILINEAR)
+    return np.asarray(image, dtype=np.float32)
+
+
+class FrameChangeDetector:
+    """
+    Per-session gate in front of the vision model: remembers the thumbnail
+    and result of the last analyzed frame, and hands that result back when
+    the new frame is visually the same.
+    """
+
+    def __init__(self, threshold: float = CHANGE_THRESHOLD,
+                 max_consecutive_skips: int = MAX_CONSECUTIVE_SKIPS):
+        self.threshold = threshold
+        self.max_consecutive_skips = max_consecutive_skips
+        self._last_thumb: np.ndarray | None = None
+        self._pending_thumb: np.ndarray | None = None
+        self._last_result: dict | None = None
+        self._consecutive_skips = 0
+        self.analyzed = 0
+        self.skipped = 0
+
+    def check(self, frame: str | bytes) -> dict | None:
+        """Return the cached result if the frame is unchanged, else None."""
+        try:
+            thumb = thumbnail(frame)
+        except Exception:
+            self._pending_thumb = None
+            return None
+
+        if (self._last_result is not None and self._last_thumb is not None
+                and self._consecutive_skips < self.max_consecutive_skips
+                and float(np.mean(np.abs(thumb - self._last_thumb))) < self.threshold):
+            self._consecutive_skips += 1
+            self._count("skipped")
+            return self._last_result
+
+        self._pending_thumb = thumb
+        return None
+
+    def store(self, result: dict):
+        """Record the vision result for the frame last passed to ``check``."""
+        self._count("analyzed")
+        self._consecutive_skips = 0
+        # Fallbacks (model missing, decode error) are not worth reusing.
+        if self._pending_thumb is None or not result.get("raw"):
+            self._last_result = None
+            return
+        self._last_thumb = self._pending_thumb
+        self._last_result = result
+
+    def stats(self) -> dict:
+        return _ratio(self.analyzed, self.skipped)
+
+    def _count(self, key: str):
+        if key == "skipped":
+            self.skipped += 1
+        else:
+            self.analyzed += 1
+        tally(key)
+
+
+def tally(key: str):
+    """Count an "analyzed" or "skipped" frame towards ``skip_stats``."""
+    with _totals_lock:
+        _totals[key] += 1
+
+
+def skip_stats() -> dict:
+    """Skip ratio across every session since startup."""
+    return _ratio(_totals["analyzed"], _totals["skipped"])
+
+
+def _ratio(analyzed: int, skipped: int) -> dict:
+    total = analyzed + skipped
+    return {
+        "analyzed": analyzed,
+        "skipped": skipped,
+        "skip_ratio": round(skipped / total, 3) if total else 0.0,
+    }
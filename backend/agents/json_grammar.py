@@ -0,0 +1,198 @@
+"""
+Token-level grammar for the coaching model's JSON reply:
+
+    {"action": "<whisper|stay_silent|log_insight|escalate>", "message": <null|"...">}
+
+optionally followed by ``, "reasoning": "..."`` before the closing brace.
+Structural tokens are forced, the action is restricted to the enum, and
+string bodies may only use tokens that cannot break the JSON. Generation
+stops the moment the closing brace is emitted.
+"""
+import torch
+from transformers import LogitsProcessor, StoppingCriteria
+
+ACTIONS = ("whisper", "stay_silent", "log_insight", "escalate")
+
+MAX_MESSAGE_TOKENS = 24
+MAX_REASONING_TOKENS = 40
+
+# Step kinds
+_LITERAL = "literal"
+_CHOICE = "choice"
+_STRING = "string"
+_OPTIONAL_STRING = "optional_string"   # only entered if the previous choice opened a quote
+
+
+class CoachingGrammar:
+    """Token tables for one tokenizer, built once and shared by every call."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.eos_token_id = tokenizer.eos_token_id
+        self.quote_ids = self._ids('"')
+
+        vocab_size = len(tokenizer)
+        special = set(tokenizer.all_special_ids)
+        body = torch.zeros(vocab_size, dtype=torch.bool)
+        closing = torch.zeros(vocab_size, dtype=torch.bool)
+        for token_id in range(vocab_size):
+            if token_id in special:
+                continue
+            text = tokenizer.decode([token_id])
+            if not text or "\\" in text or any(ord(c) < 0x20 for c in text):
+                continue
+            quotes = text.count('"')
+            if quotes == 0:
+                body[token_id] = True
+            elif quotes == 1 and text.endswith('"'):
+                closing[token_id] = True
+        self.string_body = body
+        self.string_any = body | closing
+        self.string_closing = closing
+
+    def steps(self, include_reasoning: bool) -> list[tuple]:
+        steps = [
+            (_LITERAL, self._ids('{"action": "')),
+            (_CHOICE, [self._ids(f'{a}"') for a in ACTIONS]),
+            (_LITERAL, self._ids(', "message": ')),
+            (_CHOICE, [self._ids("null"), self.quote_ids]),
+            (_OPTIONAL_STRING, MAX_MESSAGE_TOKENS),
+        ]
+        if include_reasoning:
+            steps += [
+                (_LITERAL, self._ids(', "reasoning": "')),
+                (_STRING, MAX_REASONING_TOKENS),
+            ]
+        steps.append((_LITERAL, self._ids("}")))
+        return steps
+
+    def _ids(self, text: str) -> list[int]:
+        return self.tokenizer(text, add_special_tokens=False)["input_ids"]
+
+
+# llama.cpp samples against a GBNF grammar over characters rather than a
+# token mask; string lengths are bounded in characters (~5 per token).
+_GBNF_CHARS_PER_TOKEN = 5
+
+
+def gbnf(include_reasoning: bool) -> str:
+    """The same reply schema as ``CoachingGrammar``, in llama.cpp's GBNF."""
+    actions = " | ".join(f'"\\"{a}\\""' for a in ACTIONS)
+    rules = [
+        'root ::= "{\\"action\\": " action ", \\"message\\": " message '
+        + ('", \\"reasoning\\": " reasoning ' if include_reasoning else "")
+        + '"}"',
+        f"action ::= {actions}",
+        'message ::= "null" | message-string',
+        f'message-string ::= "\\"" char{{0,{MAX_MESSAGE_TOKENS * _GBNF_CHARS_PER_TOKEN}}} "\\""',
+        f'reasoning ::= "\\"" char{{0,{MAX_REASONING_TOKENS * _GBNF_CHARS_PER_TOKEN}}} "\\""',
+        'char ::= [^"\\\\\\x00-\\x1f]',
+    ]
+    return "\n".join(rules) + "\n"
+
+
+class _RowState:
+    def __init__(self, steps: list[tuple]):
+        self.steps = steps
+        self.step = 0
+        self.pos = 0                  # tokens consumed within the current step
+        self.candidates = None        # live choice sequences
+        self.opened = False           # last choice opened a string
+        self.done = False
+
+    def _next_step(self):
+        self.step += 1
+        self.pos = 0
+        self.candidates = None
+        self._skip_unopened()
+        if self.step >= len(self.steps):
+            self.done = True
+
+    def _skip_unopened(self):
+        if (self.step < len(self.steps)
+                and self.steps[self.step][0] == _OPTIONAL_STRING
+                and not self.opened):
+            self.step += 1
+
+    def advance(self, token_id: int, grammar: CoachingGrammar):
+        kind, arg = self.steps[self.step]
+        if kind == _LITERAL:
+            self.pos += 1
+            if self.pos >= len(arg):
+                self._next_step()
+        elif kind == _CHOICE:
+            live = self.candidates if self.candidates is not None else arg
+            live = [seq for seq in live if seq[self.pos] == token_id]
+            self.pos += 1
+            self.candidates = live
+            finished = [seq for seq in live if len(seq) == self.pos]
+            if finished:
+                self.opened = finished[0] == grammar.quote_ids
+                self._next_step()
+        else:
+            self.pos += 1
+            if grammar.string_closing[token_id] or self.pos > arg:
+                self.opened = False
+                self._next_step()
+
+    def allowed(self, grammar: CoachingGrammar, vocab_size: int) -> torch.Tensor:
+        mask = torch.zeros(vocab_size, dtype=torch.bool)
+        if self.done:
+            mask[grammar.eos_token_id] = True
+            return mask
+        kind, arg = self.steps[self.step]
+        if kind == _LITERAL:
+            mask[arg[self.pos]] = True
+        elif kind == _CHOICE:
+            live = self.candidates if self.candidates is not None else arg
+            for seq in live:
+                mask[seq[self.pos]] = True
+        elif self.pos >= arg:
+            mask[grammar.quote_ids[-1]] = True
+        else:
+            mask[:len(grammar.string_any)] = grammar.string_any
+        return mask
+
+
+class JsonGrammarProcessor(LogitsProcessor):
+    """Masks every token the grammar does not allow next, per batch row."""
+
+    def __init__(self, grammar: CoachingGrammar, batch_size: int,
+                 prompt_len: int, include_reasoning: bool):
+        self.grammar = grammar
+        self.prompt_len = prompt_len
+        steps = grammar.steps(include_reasoning)
+        self.rows = [_RowState(steps) for _ in range(batch_size)]
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        if input_ids.shape[-1] > self.prompt_len:
+            last = input_ids[:, -1].tolist()
+            for row, token_id in zip(self.rows, last):
+                if not row.done:
+                    row.advance(token_id, self.grammar)
+        vocab_size = scores.shape[-1]
+        allowed = torch.stack([row.allowed(self.grammar, vocab_size) for row in self.rows])
+        return scores.masked_fill(~allowed.to(scores.device), float("-inf"))
+
+
+class GrammarComplete(StoppingCriteria):
+    """Stops each row as soon as its closing brace has been generated."""
+
+    def __init__(self, processor: JsonGrammarProcessor):
+        self.processor = processor
+
+    def __call__(self, input_ids: torch.LongTensor, scores, **kwargs) -> torch.BoolTensor:
+        # The processor only sees a token on the following step, so advance
+        # a throwaway view of each row by the newest token here.
+        done = []
+        last = input_ids[:, -1].tolist()
+        for row, token_id in zip(self.processor.rows, last):
+            if row.done:
+                done.append(True)
+                continue
+            kind, arg = row.steps[row.step]
+            done.append(
+                row.step == len(row.steps) - 1 and kind == _LITERAL
+                and row.pos == len(arg) - 1 and token_id == arg[-1]
+            )
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
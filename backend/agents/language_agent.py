@@ -1,4 +1,10 @@
-from models.loader import coaching_model, coaching_tokenizer, DEVICE
+from models.loader import DEVICE, registry
+from agents.json_grammar import CoachingGrammar, GrammarComplete, JsonGrammarProcessor, gbnf
+from cache import LRUCache
+from transformers import LogitsProcessorList, StoppingCriteriaList
+import copy
+import os
+import threading
 import torch
 import json
 
@@ -13,6 +19,24 @@ TECH_LEVEL_LABELS = {
 
 MAX_WHISPER_WORDS = 15
 
+GENERATION_KWARGS = {"max_new_tokens": 100, "do_sample": True, "temperature": 0.7}
+
+# Prefill KV of each live session's static prompt prefix, keyed by prefix text.
+_prefix_cache = LRUCache(int(os.environ.get("PITCHMIND_PREFIX_CACHE_SIZE", 32)))
+
+# Force the reply into the JSON schema token by token and stop at "}".
+CONSTRAINED_DECODING = os.environ.get("PITCHMIND_CONSTRAINED_DECODING", "1") != "0"
+# Live coaching never shows "reasoning", so by default it isn't generated.
+INCLUDE_REASONING = os.environ.get("PITCHMIND_COACHING_REASONING", "0") == "1"
+
+_grammar: CoachingGrammar | None = None
+_gguf_grammar = None
+_grammar_lock = threading.Lock()
+# A llama.cpp context is single-threaded; coaching workers take turns.
+_gguf_lock = threading.Lock()
+
+_decode_stats = {"calls": 0, "generated_tokens": 0, "invalid_json": 0}
+
 
 def _truncate_message(msg: str | None) -> str | None:
     if not msg:
@@ -23,36 +47,28 @@ def _truncate_message(msg: str | None) -> str | None:
     return msg
 
 
-def analyze_call_state(
-    transcript: str,
-    client_emotion: str,
-    audio_tone: str,
+def session_prefix(
     call_goal: str,
     persona: str,
     cultural_context: str = "US English",
     jargon_to_avoid: list[str] | None = None,
     tech_level: int = 2,
     presenting: str = "",
-) -> dict:
+) -> str:
     """
-    Sends full call state to the fine-tuned Gemma 2 coaching model.
-    Returns dict with action, message, and reasoning.
+    The part of the prompt that is fixed for a whole session. It comes
+    first so its KV cache can be computed once and reused for every call.
     """
-    raw = ""
-    try:
-        jargon_section = ""
-        if jargon_to_avoid:
-            jargon_section = f"\nJargon to avoid with this audience: {', '.join(jargon_to_avoid)}"
+    jargon_section = ""
+    if jargon_to_avoid:
+        jargon_section = f"\nJargon to avoid with this audience: {', '.join(jargon_to_avoid)}"
 
-        tech_desc = TECH_LEVEL_LABELS.get(tech_level, "Mixed")
-        presenting_section = f"\nTopic being presented: {presenting}" if presenting else ""
+    tech_desc = TECH_LEVEL_LABELS.get(tech_level, "Mixed")
+    presenting_section = f"\nTopic being presented: {presenting}" if presenting else ""
 
-        prompt = f"""<start_of_turn>user
+    return f"""<start_of_turn>user
 You are a real-time sales coaching whisper agent. You deliver brief earpiece cues to a live presenter.
 
-Transcript: {transcript}
-Client emotion: {client_emotion}
-Audio tone: {audio_tone}
 Call goal: {call_goal}
 Persona: {persona}
 Audience technical level: {tech_desc}{presenting_section}{jargon_section}
@@ -65,53 +81,254 @@ Rules:
 - The "message" is whispered into the presenter's earpiece. It MUST be under 12 words — short, direct, actionable. No fluff.
 
 Respond with ONLY a JSON object: {{"action": "whisper|stay_silent|log_insight|escalate", "message": "brief cue or null", "reasoning": "one sentence"}}
+
+"""
+
+
+def call_suffix(transcript: str, client_emotion: str, audio_tone: str) -> str:
+    """The per-call part of the prompt, appended after the session prefix."""
+    return f"""Transcript: {transcript}
+Client emotion: {client_emotion}
+Audio tone: {audio_tone}
 <end_of_turn>
 <start_of_turn>model
 """
-        inputs = coaching_tokenizer(prompt, return_tensors="pt").to(DEVICE)
-        input_len = inputs["input_ids"].shape[-1]
 
+
+def build_prompt(
+    transcript: str,
+    client_emotion: str,
+    audio_tone: str,
+    call_goal: str,
+    persona: str,
+    cultural_context: str = "US English",
+    jargon_to_avoid: list[str] | None = None,
+    tech_level: int = 2,
+    presenting: str = "",
+) -> tuple[str, str]:
+    """Returns (session prefix, call suffix); the full prompt is their concatenation."""
+    prefix = session_prefix(
+        call_goal, persona, cultural_context, jargon_to_avoid, tech_level, presenting
+    )
+    return prefix, call_suffix(transcript, client_emotion, audio_tone)
+
+
+def analyze_call_state(
+    transcript: str,
+    client_emotion: str,
+    audio_tone: str,
+    call_goal: str,
+    persona: str,
+    cultural_context: str = "US English",
+    jargon_to_avoid: list[str] | None = None,
+    tech_level: int = 2,
+    presenting: str = "",
+) -> dict:
+    """
+    Sends full call state to the fine-tuned Gemma 2 coaching model.
+    Returns dict with action, message, and reasoning.
+    """
+    return analyze_call_states([{
+        "transcript": transcript,
+        "client_emotion": client_emotion,
+        "audio_tone": audio_tone,
+        "call_goal": call_goal,
+        "persona": persona,
+        "cultural_context": cultural_context,
+        "jargon_to_avoid": jargon_to_avoid,
+        "tech_level": tech_level,
+        "presenting": presenting,
+    }])[0]
+
+
+def analyze_call_states(call_states: list[dict]) -> list[dict]:
+    """
+    Batched ``analyze_call_state``: every prompt goes through one
+    left-padded ``generate`` call, and each row is parsed independently.
+    """
+    try:
+        prompts = [build_prompt(**state) for state in call_states]
+        raws = _generate_batch(_coaching_model(), prompts)
+    except Exception as e:
+        print(f"Language agent error: {e}")
+        return [
+            {"action": "stay_silent", "message": None, "reasoning": str(e), "error": True}
+            for _ in call_states
+        ]
+    return [parse_response(raw) for raw in raws]
+
+
+def release_prefix(prefix: str):
+    """Drop a session's cached prefix KV (called when the session ends)."""
+    _prefix_cache.pop(prefix)
+
+
+def prefix_cache_stats() -> dict:
+    return _prefix_cache.stats()
+
+
+def decode_stats() -> dict:
+    calls = _decode_stats["calls"]
+    return {
+        **_decode_stats,
+        "constrained": CONSTRAINED_DECODING,
+        "mean_tokens_per_call": round(_decode_stats["generated_tokens"] / calls, 1) if calls else 0.0,
+        "wasted_generation_rate": round(_decode_stats["invalid_json"] / calls, 3) if calls else 0.0,
+    }
+
+
+def _coaching_model() -> tuple:
+    loaded = registry.get("coaching")
+    if loaded is None:
+        raise RuntimeError("Coaching model not loaded")
+    return loaded
+
+
+def _constraint_kwargs(tokenizer, batch_size: int, prompt_len: int) -> dict:
+    if not CONSTRAINED_DECODING:
+        return {}
+    global _grammar
+    with _grammar_lock:
+        if _grammar is None:
+            _grammar = CoachingGrammar(tokenizer)
+    processor = JsonGrammarProcessor(_grammar, batch_size, prompt_len, INCLUDE_REASONING)
+    return {
+        "logits_processor": LogitsProcessorList([processor]),
+        "stopping_criteria": StoppingCriteriaList([GrammarComplete(processor)]),
+    }
+
+
+def _decode_generated(tokenizer, rows, input_len: int) -> list[str]:
+    texts = []
+    for row in rows:
+        generated = row[input_len:]
+        _decode_stats["calls"] += 1
+        _decode_stats["generated_tokens"] += int(
+            (generated != tokenizer.pad_token_id).sum()
+        )
+        texts.append(tokenizer.decode(generated, skip_special_tokens=True).strip())
+    return texts
+
+
+def _generate_batch(loaded: tuple, prompts: list[tuple[str, str]]) -> list[str]:
+    coaching_model, coaching_tokenizer = loaded
+    if coaching_tokenizer is None:
+        return [_generate_gguf(coaching_model, prefix + suffix) for prefix, suffix in prompts]
+
+    # Prefix KV reuse needs a torch model's cache; an ONNX Runtime graph
+    # takes the plain path and prefills the full prompt.
+    if len(prompts) == 1 and isinstance(coaching_model, torch.nn.Module):
+        return [_generate_with_prefix_cache(loaded, *prompts[0])]
+
+    # Rows in a batch don't share one prefix, so a padded batch prefills
+    # from scratch; the batching win outweighs the cache at that point.
+    # Left padding keeps every prompt flush against its generated tokens.
+    coaching_tokenizer.padding_side = "left"
+    inputs = coaching_tokenizer(
+        [prefix + suffix for prefix, suffix in prompts],
+        return_tensors="pt",
+        padding=True,
+    ).to(DEVICE)
+    input_len = inputs["input_ids"].shape[-1]
+
+    with torch.no_grad():
+        outputs = coaching_model.generate(
+            input_ids=inputs["input_ids"],
+            attention_mask=inputs["attention_mask"],
+            **GENERATION_KWARGS,
+            **_constraint_kwargs(coaching_tokenizer, len(prompts), input_len),
+            pad_token_id=coaching_tokenizer.pad_token_id,
+        )
+
+    return _decode_generated(coaching_tokenizer, outputs, input_len)
+
+
+def _generate_with_prefix_cache(loaded: tuple, prefix: str, suffix: str) -> str:
+    coaching_model, coaching_tokenizer = loaded
+    entry = _prefix_cache.get(prefix)
+    if entry is None:
+        prefix_ids = coaching_tokenizer(prefix, return_tensors="pt")["input_ids"].to(DEVICE)
         with torch.no_grad():
-            outputs = coaching_model.generate(
-                **inputs,
-                max_new_tokens=100,
-                do_sample=True,
-                temperature=0.7,
-            )
-
-        raw = coaching_tokenizer.decode(
-            outputs[0][input_len:], skip_special_tokens=True
-        ).strip()
-
-        print(f"[LangAgent] raw ({len(raw)} chars): {raw[:200]}")
-
-        decoder = json.JSONDecoder()
-        json_match = None
-        brace_pos = raw.find("{")
-        if brace_pos >= 0:
-            try:
-                json_match, _ = decoder.raw_decode(raw, brace_pos)
-            except json.JSONDecodeError:
-                pass
-
-        if json_match and isinstance(json_match, dict):
-            action = json_match.get("action", "stay_silent")
-            message = _truncate_message(json_match.get("message"))
-            reasoning = json_match.get("reasoning", "")
-            print(f"[LangAgent] action={action} message={message}")
-            return {
-                "action": action,
-                "message": message,
-                "reasoning": reasoning,
-            }
-
-        print(f"[LangAgent] non-JSON fallback -> stay_silent")
+            past = coaching_model(input_ids=prefix_ids, use_cache=True).past_key_values
+        entry = (prefix_ids, past)
+        _prefix_cache.put(prefix, entry)
+    prefix_ids, past = entry
+
+    suffix_ids = coaching_tokenizer(
+        suffix, return_tensors="pt", add_special_tokens=False
+    )["input_ids"].to(DEVICE)
+    input_ids = torch.cat([prefix_ids, suffix_ids], dim=-1)
+
+    with torch.no_grad():
+        outputs = coaching_model.generate(
+            input_ids=input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            # generate extends the cache in place; the cached copy must stay
+            # at the prefix length for the next call.
+            past_key_values=copy.deepcopy(past),
+            **GENERATION_KWARGS,
+            **_constraint_kwargs(coaching_tokenizer, 1, input_ids.shape[-1]),
+            pad_token_id=coaching_tokenizer.pad_token_id,
+        )
+
+    return _decode_generated(coaching_tokenizer, outputs, input_ids.shape[-1])[0]
+
+
+def _generate_gguf(llm, prompt: str) -> str:
+    """
+    llama.cpp path, one prompt at a time. Its prompt cache restores the
+    longest cached token prefix, which plays the role of the prefix KV cache.
+    """
+    global _gguf_grammar
+    grammar = None
+    if CONSTRAINED_DECODING:
+        with _grammar_lock:
+            if _gguf_grammar is None:
+                from llama_cpp import LlamaGrammar
+                _gguf_grammar = LlamaGrammar.from_string(gbnf(INCLUDE_REASONING), verbose=False)
+        grammar = _gguf_grammar
+
+    sampling = GENERATION_KWARGS.get("do_sample", False)
+    with _gguf_lock:
+        out = llm.create_completion(
+            prompt,
+            max_tokens=GENERATION_KWARGS["max_new_tokens"],
+            temperature=GENERATION_KWARGS.get("temperature", 1.0) if sampling else 0.0,
+            grammar=grammar,
+        )
+    _decode_stats["calls"] += 1
+    _decode_stats["generated_tokens"] += out["usage"]["completion_tokens"]
+    return out["choices"][0]["text"].strip()
+
+
+def parse_response(raw: str) -> dict:
+    """Extract the first JSON object from the model output, or stay silent."""
+    print(f"[LangAgent] raw ({len(raw)} chars): {raw[:200]}")
+
+    decoder = json.JSONDecoder()
+    json_match = None
+    brace_pos = raw.find("{")
+    if brace_pos >= 0:
+        try:
+            json_match, _ = decoder.raw_decode(raw, brace_pos)
+        except json.JSONDecodeError:
+            pass
+
+    if json_match and isinstance(json_match, dict):
+        action = json_match.get("action", "stay_silent")
+        message = _truncate_message(json_match.get("message"))
+        reasoning = json_match.get("reasoning", "")
+        print(f"[LangAgent] action={action} message={message}")
         return {
-            "action": "stay_silent",
-            "message": None,
-            "reasoning": f"Model returned non-JSON: {raw[:200]}",
+            "action": action,
+            "message": message,
+            "reasoning": reasoning,
         }
 
-    except Exception as e:
-        print(f"Language agent error: {e}")
-        return {"action": "stay_silent", "message": None, "reasoning": str(e)}
+    _decode_stats["invalid_json"] += 1
+    print(f"[LangAgent] non-JSON fallback -> stay_silent")
+    return {
+        "action": "stay_silent",
+        "message": None,
+        "reasoning": f"Model returned non-JSON: {raw[:200]}",
+    }
@@ -0,0 +1,144 @@
+import json
+import os
+import re
+
+# Map categories to their keywords.
+# Weights indicate positive (engaged) or negative (disengaged) engagement delta.
+EMOTION_CATEGORY = {
+    "engaged":     ["attentive", "interested", "engaged", "nodding", "smiling",
+                    "happy", "excited", "leaning", "lean", "nod", "smile", "grinning", "grin",
+                    "laughing", "laugh", "focused", "concentrating", "talking", "speaking",
+                    "presenting", "gesturing", "looking at camera",
+                    "looking at the camera", "eye contact", "bright"],
+    "neutral":     ["neutral", "calm", "relaxed", "steady", "sitting", "standing",
+                    "person", "listening"],
+    "confused":    ["confused", "frowning", "frown", "puzzled", "uncertain", "squinting",
+                    "furrowed", "tilted head", "raised eyebrow"],
+    "checked_out": ["bored", "disengaged", "distracted", "tired", "looking away",
+                    "looking down", "phone", "yawning", "yawn", "arms crossed",
+                    "frustrated", "skeptical", "slouching", "slumped",
+                    "looking at phone", "looking at their phone",
+                    "eyes closed", "sleeping"],
+}
+
+KEYWORD_WEIGHTS = {
+    # Negative
+    "confused": -20, "bored": -25, "disengaged": -30, "frustrated": -25,
+    "skeptical": -15, "distracted": -20, "tired": -15, "frowning": -15, "frown": -15,
+    "arms crossed": -15, "looking away": -20, "looking down": -15,
+    "phone": -30, "looking at phone": -30, "looking at their phone": -30,
+    "puzzled": -18, "uncertain": -15, "squinting": -10, "yawning": -25, "yawn": -25,
+    "slouching": -15, "slumped": -15, "eyes closed": -25, "sleeping": -30,
+    "furrowed": -12, "tilted head": -5, "raised eyebrow": -8,
+    # Neutral
+    "neutral": 0, "calm": 5, "relaxed": 5, "steady": 5,
+    "sitting": 0, "standing": 0, "person": 0, "listening": 5,
+    # Positive
+    "attentive": 15, "interested": 20, "engaged": 25, "nodding": 20, "nod": 20,
+    "smiling": 25, "smile": 25, "grinning": 22, "grin": 22,
+    "happy": 20, "excited": 30, "leaning": 10, "lean": 10, "laughing": 25, "laugh": 25,
+    "focused": 18, "concentrating": 15, "talking": 10, "speaking": 10,
+    "presenting": 10, "gesturing": 12, "looking at camera": 15,
+    "looking at the camera": 15, "eye contact": 18, "bright": 8,
+}
+
+MAX_SCORE_DELTA = 40
+
+NEUTRAL_EMOTIONS = {"engaged": 10, "neutral": 60, "confused": 10, "checked_out": 20}
+
+_EXPLICIT_SCORE = re.compile(r"(?:engagement|score|level)[:\s]*(\d+)")
+
+
+class Lexicon:
+    """
+    Weighted emotion phrases compiled into a single regex. One ``finditer``
+    pass finds every occurrence starting at a word boundary, inflections
+    included ("smiles", "phones"); alternatives are ordered longest first,
+    so overlapping phrases resolve to the longest match starting at each
+    position ("looking at their phone" beats "phone").
+    """
+
+    def __init__(self, weights: dict[str, int], categories: dict[str, list[str]]):
+        self.weights = {k.lower(): v for k, v in weights.items()}
+        self.category_of = {
+            kw.lower(): cat for cat, keywords in categories.items() for kw in keywords
+        }
+        self.categories = list(categories)
+        phrases = sorted(self.weights, key=len, reverse=True)
+        alternation = "|".join(
+            r"\s+".join(map(re.escape, p.split())) for p in phrases
+        )
+        # The phrase is group 1; trailing word characters are its inflection.
+        self._pattern = re.compile(rf"\b({alternation})\w*")
+
+    @classmethod
+    def from_file(cls, path: str) -> "Lexicon":
+        """Load ``{"weights": {phrase: delta}, "categories": {category: [phrase, ...]}}``."""
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["weights"], data["categories"])
+
+    def matches(self, text: str) -> list[str]:
+        """Every lexicon phrase in ``text``, in order, whitespace-normalized."""
+        return [" ".join(m.group(1).split()) for m in self._pattern.finditer(text.lower())]
+
+    def score(self, text: str) -> dict:
+        """Score one caption: dominant_emotion, score, emotions, confidence."""
+        hits = [(kw, self.weights[kw]) for kw in self.matches(text)]
+
+        # Filter out the generic "person" / "sitting" / "standing" hits if stronger
+        # signals are present, to avoid diluting the distribution.
+        strong_hits = [(kw, d) for kw, d in hits if abs(d) >= 10]
+        if strong_hits:
+            hits = strong_hits
+
+        confidence = min(1.0, len(hits) / 3.0) if hits else 0.0
+
+        best_emotion = "neutral"
+        best_weight = 0
+        capped_delta = 0
+
+        for keyword, delta in hits:
+            if abs(delta) > abs(best_weight):
+                best_weight = delta
+                best_emotion = keyword
+            capped_delta += delta
+
+        capped_delta = max(-MAX_SCORE_DELTA, min(MAX_SCORE_DELTA, capped_delta))
+        score = max(0, min(100, 50 + capped_delta))
+
+        explicit = _EXPLICIT_SCORE.search(text.lower())
+        if explicit:
+            score = max(0, min(100, int(explicit.group(1))))
+
+        if not hits:
+            emotions = dict(NEUTRAL_EMOTIONS)
+        else:
+            category_hits = {cat: 0 for cat in self.categories}
+            for keyword, _ in hits:
+                cat = self.category_of.get(keyword)
+                if cat:
+                    category_hits[cat] += 1
+            total_hits = sum(category_hits.values()) or 1
+            emotions = {
+                cat: int(round(count / total_hits * 100))
+                for cat, count in category_hits.items()
+            }
+
+        return {
+            "dominant_emotion": best_emotion,
+            "score": score,
+            "emotions": emotions,
+            "confidence": confidence,
+        }
+
+
+def load_lexicon() -> Lexicon:
+    """The built-in lexicon, or the file named by PITCHMIND_EMOTION_LEXICON."""
+    path = os.environ.get("PITCHMIND_EMOTION_LEXICON")
+    if path:
+        return Lexicon.from_file(path)
+    return Lexicon(KEYWORD_WEIGHTS, EMOTION_CATEGORY)
+
+
+DEFAULT_LEXICON = load_lexicon()
@@ -0,0 +1,154 @@
+"""
+Rule-based triage in front of the coaching model. Most transcript chunks
+come from a calm, on-track call and the model's answer is "stay_silent";
+the triage answers those itself and only lets a chunk through to the LLM
+when one of its triggers fires.
+
+Triggers are deliberately generous: a chunk the LLM didn't need to see
+costs a generation, a whisper the triage swallowed costs the presenter.
+The cue lists alone miss about a quarter of labelled whispers on held-out
+data (benchmarks/bench_triage.py), so by default the triage only answers
+on the clearly calm path: no trigger, engagement at or above CALM_SCORE,
+a stable trend and normal energy. PITCHMIND_TRIAGE=full answers whenever
+no trigger fires; PITCHMIND_TRIAGE=0 sends every chunk to the model.
+"""
+import os
+import re
+from collections import Counter
+
+# Terms that lose a non-technical audience, matched on word boundaries.
+# Words with an everyday meaning (token, pipeline, routing, real-time)
+# stay out of all three lists: they fire on calm calls too (see
+# benchmarks/bench_triage.py).
+TECH_JARGON = (
+    "api", "apis", "sdk", "endpoint", "webhook", "webhooks", "idempotency",
+    "idempotent", "oauth", "server-side", "client-side", "client secret",
+    "payload", "json", "backend", "front end", "frontend", "microservice",
+    "microservices", "kubernetes", "latency", "throughput", "schema",
+    "tokenization", "integration layer", "event listener",
+    "backoff", "exponential backoff",
+    "retry logic", "dunning", "proration", "pro-rata", "mcc", "pci",
+    "soc 2", "3ds", "3d secure", "interchange", "acquirer", "ach",
+    "machine learning", "predictive analytics", "sandbox",
+    "div", "mount", "post request", "sql",
+    "open banking", "key management", "multi-party computation",
+    "encryption", "cryptography",
+)
+
+# The buyer saying they are lost. Only words Whisper can hear: the
+# training set's stage directions ("[sighs]") never reach the live text.
+CONFUSION_CUES = (
+    "what's that", "what is that", "sorry?", "can you repeat",
+    "say that again", "slow down", "lost me", "i'm lost", "not sure i follow",
+    "i don't follow", "in plain english",
+    "i'll have to ask", "ask my tech", "ask our tech",
+)
+
+# Pushback the presenter should handle deliberately.
+OBJECTION_CUES = (
+    "too expensive", "that's high", "too high",
+    "concerned", "worried", "not convinced", "competitor",
+    "cheaper", "not a priority", "why should", "locked in",
+    "we don't have",
+)
+
+# Engagement below this (0-100) always goes to the model.
+LOW_SCORE = int(os.environ.get("PITCHMIND_TRIAGE_LOW_SCORE", 45))
+# Spoken pace outside this range (words per minute) goes to the model.
+PACE_RANGE = (100, 175)
+# Built-in jargon applies up to this tech level; above it only the
+# session's own jargon_to_avoid list does.
+TECH_JARGON_MAX_LEVEL = 2
+
+# "calm" (default), "full" or "0"; see the module docstring.
+MODE = {"0": "off", "full": "full"}.get(os.environ.get("PITCHMIND_TRIAGE", "calm"), "calm")
+ENABLED = MODE != "off"
+# In calm mode, engagement below this (0-100) goes to the model too.
+CALM_SCORE = int(os.environ.get("PITCHMIND_TRIAGE_CALM_SCORE", 60))
+
+# CamelCase identifiers (PaymentIntent) and dotted event names (charge.succeeded).
+_IDENTIFIER = re.compile(r"\b[A-Z][a-z]+[A-Z]\w*\b|\b[a-z]+\.[a-z_]+\b")
+# Anything beyond Latin script means the buyer may have switched language.
+_NON_LATIN = re.compile(r"[\u0370-\u1fff\u3000-\uffef]")
+
+_stats = {"checked": 0, "to_llm": 0, "silenced": 0}
+_trigger_counts: Counter = Counter()
+
+
+def _phrase_pattern(phrases) -> re.Pattern | None:
+    """One case-insensitive alternation, longest phrase first, spaces flexible."""
+    phrases = sorted({p.lower().strip() for p in phrases if p.strip()}, key=len, reverse=True)
+    if not phrases:
+        return None
+    alternation = "|".join(r"\s+".join(map(re.escape, p.split())) for p in phrases)
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE)
+
+
+_CONFUSION = _phrase_pattern(CONFUSION_CUES)
+_OBJECTION = _phrase_pattern(OBJECTION_CUES)
+
+
+class Triage:
+    """Per-session triage: the session's jargon list is compiled once."""
+
+    def __init__(self, jargon_to_avoid=(), tech_level: int = 2,
+                 cultural_context: str = "US English", mode: str = MODE):
+        self.mode = mode
+        phrases = list(jargon_to_avoid or ())
+        if tech_level <= TECH_JARGON_MAX_LEVEL:
+            phrases += TECH_JARGON
+        self._jargon = _phrase_pattern(phrases)
+        self._check_identifiers = tech_level <= TECH_JARGON_MAX_LEVEL
+        # Cross-cultural coaching is the model's job; don't second-guess it.
+        self._english = "english" in cultural_context.lower()
+
+    def triggers(self, transcript: str, score: float = 50, trend: str = "stable",
+                 energy: str = "MED", pace_wpm: float = 130) -> list[str]:
+        """
+        Reasons to run the coaching model on this chunk; an empty list
+        means the call is on track and the answer is "stay_silent".
+        """
+        found = []
+        if not self._english:
+            found.append("culture")
+        elif _NON_LATIN.search(transcript):
+            found.append("language")
+        if self._jargon is not None:
+            found += [f"jargon:{m.group(0).lower()}" for m in self._jargon.finditer(transcript)]
+        if self._check_identifiers:
+            found += [f"jargon:{m.group(0)}" for m in _IDENTIFIER.finditer(transcript)]
+        if _CONFUSION.search(transcript):
+            found.append("confusion")
+        if _OBJECTION.search(transcript):
+            found.append("objection")
+        if score < LOW_SCORE:
+            found.append("low_engagement")
+        if trend == "falling":
+            found.append("falling_engagement")
+        if energy == "LOW":
+            found.append("low_energy")
+        if not PACE_RANGE[0] <= pace_wpm <= PACE_RANGE[1]:
+            found.append("pace")
+        if (self.mode == "calm" and not found
+                and (score < CALM_SCORE or trend != "stable" or energy != "MED")):
+            found.append("not_calm")
+        return found
+
+    def check(self, transcript: str, **signals) -> list[str]:
+        """``triggers`` plus bookkeeping for /metrics."""
+        found = self.triggers(transcript, **signals)
+        _stats["checked"] += 1
+        _stats["to_llm" if found else "silenced"] += 1
+        _trigger_counts.update(t.split(":", 1)[0] for t in found)
+        return found
+
+
+def triage_stats() -> dict:
+    checked = _stats["checked"]
+    return {
+        "enabled": ENABLED,
+        "mode": MODE,
+        **_stats,
+        "llm_calls_eliminated": round(_stats["silenced"] / checked, 3) if checked else 0.0,
+        "triggers": dict(_trigger_counts),
+    }
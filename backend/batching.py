@@ -0,0 +1,69 @@
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item requests from every session into
+    batches. A batch is dispatched as soon as ``max_batch`` items are
+    waiting, or ``max_wait_ms`` after the first item arrived, whichever
+    comes first; each caller gets back its own element of the result list.
+    """
+
+    def __init__(self, name: str, run_batch: Callable[[list], Awaitable[list]],
+                 max_batch: int = 8, max_wait_ms: float = 10.0):
+        self.name = name
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self._run_batch = run_batch
+        self._pending: list[tuple[object, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self.batch_sizes: Counter = Counter()
+
+    async def submit(self, item):
+        fut = asyncio.get_running_loop().create_future()
+        self._pending.append((item, fut))
+        if len(self._pending) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_wait, self._dispatch
+            )
+        return await fut
+
+    def stats(self) -> dict:
+        batches = sum(self.batch_sizes.values())
+        items = sum(size * n for size, n in self.batch_sizes.items())
+        return {
+            "batches": batches,
+            "items": items,
+            "mean_batch_size": round(items / batches, 2) if batches else 0.0,
+            "pending": len(self._pending),
+            "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+        }
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            # Callers that gave up (cancelled) don't take a batch slot.
+            batch = [(item, fut) for item, fut in batch if not fut.done()]
+            if batch:
+                self.batch_sizes[len(batch)] += 1
+                asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: list[tuple[object, asyncio.Future]]):
+        try:
+            results = await self._run_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
@@ -0,0 +1,92 @@
+"""
+Audio signal extraction per chunk: the streaming NumPy analyzer versus the
+old per-chunk librosa pipeline (onset_detect + pyin + zero_crossing_rate).
+
+The input is a synthetic voice: a harmonic tone gliding around --f0 Hz,
+amplitude-modulated at --syllables per second, so the expected pitch and
+pace are known.
+
+    cd backend && python benchmarks/bench_audio_features.py [--chunks 20] [--chunk-seconds 2]
+
+The baseline needs librosa, which the server no longer installs; pass
+--skip-legacy without it.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agents.audio_agent import SYLLABLES_PER_WORD, StreamingAudioAnalyzer  # noqa: E402
+
+SR = 16000
+
+
+def legacy_analyze(audio: np.ndarray, sample_rate: int = SR) -> dict:
+    """The pre-streaming implementation, kept here as the baseline."""
+    import librosa
+
+    if len(audio) < 100:
+        return {"energy": "MED", "pace_wpm": 130, "pitch_variance": 0.5}
+    rms = float(np.sqrt(np.mean(audio ** 2)))
+    energy = "HIGH" if rms > 0.05 else "MED" if rms > 0.02 else "LOW"
+    onsets = librosa.onset.onset_detect(y=audio, sr=sample_rate, units="time")
+    duration = len(audio) / sample_rate
+    pace_wpm = int(max(80, min(200, (len(onsets) / duration) * 60 * 0.4))) if duration > 0 else 130
+    zcr = librosa.feature.zero_crossing_rate(audio)[0]
+    pitch_variance = float(np.std(zcr) * 1000)
+    f0, _, _ = librosa.pyin(audio, fmin=70, fmax=400, sr=sample_rate)
+    return {"energy": energy, "pace_wpm": pace_wpm, "pitch_variance": round(pitch_variance, 2),
+            "pitch_hz": float(np.nanmedian(f0)) if np.any(np.isfinite(f0)) else 0.0}
+
+
+def synth_voice(seconds: float, f0: float, syllables: float, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SR)) / SR
+    glide = f0 * 2 ** (np.sin(2 * np.pi * 0.3 * t) * 2 / 12)     # +-2 semitones
+    phase = 2 * np.pi * np.cumsum(glide) / SR
+    voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+    envelope = np.abs(np.sin(np.pi * syllables * t)) ** 2
+    audio = 0.08 * voice * envelope + 0.002 * rng.standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--chunk-seconds", type=float, default=2.0)
+    parser.add_argument("--f0", type=float, default=140.0)
+    parser.add_argument("--syllables", type=float, default=4.0)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    size = int(args.chunk_seconds * SR)
+    audio = synth_voice(args.chunks * args.chunk_seconds, args.f0, args.syllables)
+    chunks = [audio[i:i + size] for i in range(0, len(audio) - size + 1, size)]
+    print(f"{len(chunks)} chunks x {args.chunk_seconds}s, f0~{args.f0:.0f} Hz, "
+          f"expected pace ~{args.syllables * 60 / SYLLABLES_PER_WORD:.0f} wpm")
+
+    analyzer = StreamingAudioAnalyzer()
+    analyzer.process(chunks[0])
+    t0 = time.perf_counter()
+    for chunk in chunks:
+        result = analyzer.process(chunk)
+    streaming_ms = (time.perf_counter() - t0) * 1000 / len(chunks)
+    print(f"streaming : {streaming_ms:8.2f} ms/chunk  {result}")
+
+    if args.skip_legacy:
+        return
+    legacy_analyze(chunks[0])
+    t0 = time.perf_counter()
+    for chunk in chunks:
+        result = legacy_analyze(chunk)
+    legacy_ms = (time.perf_counter() - t0) * 1000 / len(chunks)
+    print(f"librosa   : {legacy_ms:8.2f} ms/chunk  {result}")
+    print(f"speedup   : {legacy_ms / streaming_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
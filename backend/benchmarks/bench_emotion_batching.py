@@ -0,0 +1,76 @@
+"""
+PaliGemma throughput (frames/sec) versus number of concurrent sessions,
+with cross-session micro-batching on and off.
+
+    cd backend && python benchmarks/bench_emotion_batching.py \\
+        [--sessions 1 2 4 8 12 16] [--frames 4] [--max-batch 8]
+
+Each simulated session sends --frames frames back to back, waiting for
+each result like the vision pipeline does. Needs the PaliGemma weights.
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from batching import MicroBatcher  # noqa: E402
+from agents.emotion_agent import analyze_frames  # noqa: E402
+from models.loader import registry  # noqa: E402
+
+
+def make_frame(seed: int, size=(1280, 720)) -> bytes:
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=70)
+    return buf.getvalue()
+
+
+async def run(sessions: int, frames: int, max_batch: int, wait_ms: float) -> float:
+    loop = asyncio.get_running_loop()
+    batcher = MicroBatcher(
+        "bench",
+        lambda batch: loop.run_in_executor(None, analyze_frames, batch),
+        max_batch=max_batch,
+        max_wait_ms=wait_ms,
+    )
+    payloads = [make_frame(i) for i in range(sessions)]
+
+    async def session(i: int):
+        for _ in range(frames):
+            await batcher.submit(payloads[i])
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    return sessions * frames / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 12, 16])
+    parser.add_argument("--frames", type=int, default=4)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--wait-ms", type=float, default=15)
+    args = parser.parse_args()
+
+    # Load and warm up weights and kernels before timing anything.
+    if registry.get("vision", wait=600) is None:
+        sys.exit(f"vision model unavailable: {registry.status()['vision']['error']}")
+    analyze_frames([make_frame(0)])
+
+    print(f"{'sessions':>8} | {'unbatched f/s':>13} | {'batched f/s':>11} | speedup")
+    for n in args.sessions:
+        single = asyncio.run(run(n, args.frames, 1, 0))
+        batched = asyncio.run(run(n, args.frames, args.max_batch, args.wait_ms))
+        print(f"{n:>8} | {single:>13.2f} | {batched:>11.2f} | {batched / single:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
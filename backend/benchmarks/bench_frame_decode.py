@@ -0,0 +1,92 @@
+"""
+Frame preprocessing before PaliGemma: the old path (full JPEG decode,
+resize, HF image processor) versus the new one (draft-mode decode,
+resize, normalize into the reusable pixel buffer), single-threaded and
+on the decode pool. Reports ms per frame at 720p and 1080p.
+
+    cd backend && python benchmarks/bench_frame_decode.py [--batch 4] [--repeats 20] [--size 448]
+
+No model weights needed; the processor is built from SigLIP defaults.
+"""
+import argparse
+import base64
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agents.preprocess import PixelBuffer, decode_frame, decode_pool, DECODE_WORKERS, resize_square  # noqa: E402
+
+
+def make_frames(width: int, height: int, n: int) -> list[str]:
+    """Base64 JPEGs like the websocket sends: smooth content plus sensor noise."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    frames = []
+    for i in range(n):
+        base = np.stack([(x + 40 * i) % 256, (y * 2) % 256, (x + y) % 256], axis=-1)
+        pixels = np.clip(base + rng.normal(0, 6, base.shape), 0, 255).astype(np.uint8)
+        buf = io.BytesIO()
+        Image.fromarray(pixels).save(buf, format="JPEG", quality=80)
+        frames.append(base64.b64encode(buf.getvalue()).decode())
+    return frames
+
+
+def old_path(frames, processor, size):
+    images = []
+    for frame in frames:
+        image = Image.open(io.BytesIO(base64.b64decode(frame))).convert("RGB")
+        images.append(image.resize((size, size)))
+    return processor(images=images, return_tensors="pt")["pixel_values"]
+
+
+def new_path(frames, pixels, size, pool=None):
+    def prepare(frame):
+        return resize_square(decode_frame(frame, size), size)
+    images = list(pool.map(prepare, frames)) if pool else [prepare(f) for f in frames]
+    return pixels.fill(images)
+
+
+def timed(fn, frames, batch, repeats) -> float:
+    fn(frames[:batch])  # warm up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, len(frames), batch):
+            fn(frames[i:i + batch])
+    return (time.perf_counter() - t0) / repeats / len(frames) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--size", type=int, default=448)
+    args = parser.parse_args()
+
+    from transformers import SiglipImageProcessor
+    processor = SiglipImageProcessor(size={"height": args.size, "width": args.size})
+    pixels = PixelBuffer.for_processor(processor, args.size)
+
+    print(f"batch {args.batch}, {DECODE_WORKERS} decode workers, model input {args.size}px")
+    print(f"{'frame':>10} {'old ms':>8} {'new ms':>8} {'pooled ms':>10} {'speedup':>8} {'mean diff':>9}")
+    for width, height in ((1280, 720), (1920, 1080)):
+        frames = make_frames(width, height, args.frames)
+        old = timed(lambda f: old_path(f, processor, args.size), frames, args.batch, args.repeats)
+        new = timed(lambda f: new_path(f, pixels, args.size), frames, args.batch, args.repeats)
+        pooled = timed(lambda f: new_path(f, pixels, args.size, decode_pool),
+                       frames, args.batch, args.repeats)
+        # Draft decoding averages in the DCT domain, so pixels shift slightly.
+        diff = (old_path(frames[:1], processor, args.size)
+                - new_path(frames[:1], pixels, args.size)).abs().mean().item()
+        print(f"{width}x{height:<5} {old:8.2f} {new:8.2f} {pooled:10.2f} "
+              f"{old / pooled:7.1f}x {diff:9.4f}")
+
+
+if __name__ == "__main__":
+    main()
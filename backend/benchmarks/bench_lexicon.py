@@ -0,0 +1,126 @@
+"""
+Caption scoring throughput: the compiled lexicon versus the old
+per-keyword ``str.find`` scan, plus a parity check of their scores on
+captions with inflected keywords ("smiles", "phones").
+
+    cd backend && python benchmarks/bench_lexicon.py [--captions 20000] [--lexicon path.json]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agents.lexicon import EMOTION_CATEGORY, KEYWORD_WEIGHTS, Lexicon, load_lexicon  # noqa: E402
+
+FILLER = (
+    "the person in the image appears to be wearing a dark shirt and is seated "
+    "in front of a bookshelf with soft lighting from a nearby window while"
+).split()
+
+
+# Stems added with inflection matching; the old keyword table lacked them.
+ADDED_STEMS = {"nod", "lean", "laugh", "frown", "yawn"}
+LEGACY_WEIGHTS = {k: v for k, v in KEYWORD_WEIGHTS.items() if k not in ADDED_STEMS}
+
+
+def legacy_hits(text: str) -> list[tuple[str, int]]:
+    """The pre-compilation matcher: first occurrence of each keyword only."""
+    text_lower = text.lower()
+    hits, spans = [], []
+    for keyword in sorted(LEGACY_WEIGHTS, key=len, reverse=True):
+        pos = text_lower.find(keyword)
+        if pos >= 0:
+            end = pos + len(keyword)
+            if not any(not (end <= s or pos >= e) for s, e in spans):
+                hits.append((keyword, LEGACY_WEIGHTS[keyword]))
+                spans.append((pos, end))
+    return hits
+
+
+# Inflected captions the old substring scan scored; scores must not change.
+PARITY_CAPTIONS = (
+    "A woman smiles at the camera.",
+    "The man smiled and looked at the camera.",
+    "A person checks their phones under the desk.",
+    "He is grinning while gesturing with both hands.",
+    "She appears bored and keeps yawning.",
+    "A man with arms crossed, looking away from the screen.",
+)
+# Inflections the old scan missed entirely (its keywords were "nodding",
+# "leaning", ...); these are expected to score differently now.
+NEWLY_MATCHED = (
+    "A man nods along.",
+    "She leans forward towards the laptop.",
+    "He laughs at the joke.",
+    "The audience member frowns, looking confused.",
+)
+
+
+class LegacyLexicon(Lexicon):
+    """Same scoring, with the old matcher's hits."""
+
+    def matches(self, text: str) -> list[str]:
+        return [kw for kw, _ in legacy_hits(text)]
+
+
+def check_parity(lexicon: Lexicon) -> bool:
+    legacy = LegacyLexicon(KEYWORD_WEIGHTS, EMOTION_CATEGORY)
+    ok = True
+    for caption in PARITY_CAPTIONS:
+        old, new = legacy.score(caption)["score"], lexicon.score(caption)["score"]
+        if old != new:
+            ok = False
+            print(f"PARITY MISMATCH {old} -> {new}: {caption}")
+    for caption in NEWLY_MATCHED:
+        old, new = legacy.score(caption)["score"], lexicon.score(caption)["score"]
+        print(f"newly matched   {old} -> {new}: {caption}")
+    print(f"parity: {'ok' if ok else 'FAILED'} on {len(PARITY_CAPTIONS)} inflected captions")
+    return ok
+
+
+def make_corpus(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    phrases = list(LEGACY_WEIGHTS)
+    corpus = []
+    for _ in range(n):
+        words = rng.sample(FILLER, rng.randint(8, 20))
+        for _ in range(rng.randint(0, 5)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(phrases))
+        corpus.append(" ".join(words).capitalize() + ".")
+    return corpus
+
+
+def _rate(fn, corpus) -> float:
+    t0 = time.perf_counter()
+    for caption in corpus:
+        fn(caption)
+    return len(corpus) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--captions", type=int, default=20000)
+    parser.add_argument("--lexicon", help="JSON lexicon file (default: built-in)")
+    args = parser.parse_args()
+
+    lexicon = Lexicon.from_file(args.lexicon) if args.lexicon else load_lexicon()
+    corpus = make_corpus(args.captions)
+    hits = sum(len(lexicon.matches(c)) for c in corpus)
+
+    legacy = _rate(legacy_hits, corpus)
+    compiled_match = _rate(lexicon.matches, corpus)
+    compiled_score = _rate(lexicon.score, corpus)
+    print(f"{len(corpus)} captions, {hits} phrase hits")
+    print(f"legacy find-scan  : {legacy:>10,.0f} captions/s")
+    print(f"compiled matches  : {compiled_match:>10,.0f} captions/s "
+          f"({compiled_match / legacy:.1f}x)")
+    print(f"compiled score()  : {compiled_score:>10,.0f} captions/s")
+    if not args.lexicon and not check_parity(lexicon):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Event-loop lag while sessions stream audio and camera frames, with the
+per-session analyzers on the scheduler's threads versus pinned worker
+processes (workers.py). A probe task sleeps 10 ms in a loop and records
+how late it wakes up; that lag is what every WebSocket on the server
+sees.
+
+    cd backend && python benchmarks/bench_process_workers.py [--sessions 1 4 16] [--workers 2] [--seconds 5]
+
+Each simulated session sends a 1 s, 48 kHz chunk of audio every 250 ms
+and a 720p JPEG every 500 ms, faster than a real client, so the CPU
+stages are saturated.
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agents.audio_agent import StreamingAudioAnalyzer  # noqa: E402
+from agents.frame_change import FrameChangeDetector  # noqa: E402
+from scheduler import Overloaded, scheduler  # noqa: E402
+from workers import ProcessWorkers, RemoteAudioAnalyzer, RemoteFrameGate  # noqa: E402
+
+AUDIO_INTERVAL = 0.25
+FRAME_INTERVAL = 0.5
+
+
+def make_inputs():
+    rng = np.random.default_rng(0)
+    t = np.arange(48000) / 48000
+    pcm = (0.1 * np.sin(2 * np.pi * 140 * t) * (1 + np.sin(2 * np.pi * 4 * t))
+           + 0.01 * rng.standard_normal(48000)).astype(np.float32)
+    frames = []
+    for i in range(2):
+        buf = io.BytesIO()
+        pixels = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(buf, format="JPEG", quality=80)
+        frames.append(buf.getvalue())
+    return pcm, frames
+
+
+async def session(sid: str, analyzer, gate, pcm, frames, stop: float, done: list):
+    async def audio():
+        while time.perf_counter() < stop:
+            try:
+                await scheduler.run("audio", sid, analyzer.process, pcm, 48000)
+                done[0] += 1
+            except Overloaded:
+                pass
+            await asyncio.sleep(AUDIO_INTERVAL)
+
+    async def video():
+        i = 0
+        while time.perf_counter() < stop:
+            try:
+                if await scheduler.run("frames", sid, gate.check, frames[i % 2]) is None:
+                    gate.store({"raw": "x"})
+                done[1] += 1
+            except Overloaded:
+                pass
+            i += 1
+            await asyncio.sleep(FRAME_INTERVAL)
+
+    await asyncio.gather(audio(), video())
+
+
+async def probe(stop: float, lags: list):
+    while time.perf_counter() < stop:
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - t0 - 0.01) * 1000)
+
+
+async def run(n_sessions: int, workers: ProcessWorkers | None, seconds: float, inputs):
+    pcm, frames = inputs
+    stop = time.perf_counter() + seconds
+    lags, done = [], [0, 0]
+    tasks = [probe(stop, lags)]
+    for s in range(n_sessions):
+        sid = f"bench-{'p' if workers else 't'}-{n_sessions}-{s}"
+        if workers:
+            analyzer, gate = RemoteAudioAnalyzer(workers, sid), RemoteFrameGate(workers, sid)
+        else:
+            analyzer, gate = StreamingAudioAnalyzer(), FrameChangeDetector()
+        tasks.append(session(sid, analyzer, gate, pcm, frames, stop, done))
+    await asyncio.gather(*tasks)
+    lags = np.array(lags)
+    return np.percentile(lags, 50), np.percentile(lags, 99), done[0] / seconds, done[1] / seconds
+
+
+async def compare(sessions: list[int], workers: ProcessWorkers, seconds: float, inputs):
+    # One loop for every run: the scheduler's pools are bound to it.
+    for n in sessions:
+        for label, pool in (("threads", None), ("procs", workers)):
+            p50, p99, audio_rate, frame_rate = await run(n, pool, seconds, inputs)
+            print(f"{label:>8} {n:9d} {p50:11.2f} {p99:11.2f} {audio_rate:8.1f} {frame_rate:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    inputs = make_inputs()
+    workers = ProcessWorkers(args.workers)
+    workers.start()
+    time.sleep(2.0)  # let the workers spawn and warm up
+
+    print(f"{os.cpu_count()} CPUs, {args.workers} worker processes, {args.seconds:.0f} s per run")
+    print(f"{'mode':>8} {'sessions':>9} {'lag p50 ms':>11} {'lag p99 ms':>11} "
+          f"{'audio/s':>8} {'frames/s':>9}")
+    try:
+        asyncio.run(compare(args.sessions, workers, args.seconds, inputs))
+    finally:
+        workers.shutdown()
+
+
+if __name__ == "__main__":
+    main()
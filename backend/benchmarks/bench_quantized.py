@@ -0,0 +1,143 @@
+"""
+Coaching-model backends (float / int8 / onnx / gguf) on the repo's jsonl examples:
+accuracy parity against the float32 outputs, latency per call, load time
+and peak RSS. Every backend runs in its own process so memory numbers
+don't bleed into each other. Decoding is greedy so outputs are comparable.
+
+    cd backend && python benchmarks/bench_quantized.py [--backends float int8 onnx gguf] \\
+        [--data ../training_data.jsonl] [--limit 20] [--model /path/to/merged_model] \\
+        [--gguf /path/to/gguf_model]
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+
+
+def load_examples(path: str, limit: int) -> list[dict]:
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return rows[:limit]
+
+
+def call_state(example: dict) -> dict:
+    inp = example["input"]
+    return {
+        "transcript": inp["transcript_chunk"],
+        "client_emotion": inp["client_emotion"],
+        "audio_tone": inp["audio_tone"],
+        "call_goal": inp["call_goal"],
+        "persona": inp["persona"],
+        "cultural_context": inp.get("cultural_context", "US English"),
+    }
+
+
+def run_backend(backend: str, model_path: str, examples: list[dict], queue):
+    from agents import language_agent
+    from models.loader import load_coaching
+
+    language_agent.GENERATION_KWARGS = {**language_agent.GENERATION_KWARGS, "do_sample": False}
+    language_agent.GENERATION_KWARGS.pop("temperature", None)
+
+    t0 = time.perf_counter()
+    loaded = load_coaching(backend, model_path)
+    load_s = time.perf_counter() - t0
+
+    outputs, latencies = [], []
+    for example in examples:
+        prompt = language_agent.build_prompt(**call_state(example))
+        t0 = time.perf_counter()
+        raw = language_agent._generate_batch(loaded, [prompt])[0]
+        latencies.append(time.perf_counter() - t0)
+        outputs.append(language_agent.parse_response(raw))
+
+    queue.put({
+        "backend": backend,
+        "load_s": load_s,
+        "latencies": latencies,
+        "outputs": outputs,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def check_grammar() -> bool:
+    """Parse both GBNF variants with llama.cpp itself; skipped without llama_cpp."""
+    try:
+        from llama_cpp import LlamaGrammar
+    except ImportError:
+        print("grammar check skipped: llama_cpp not installed")
+        return True
+    from agents.json_grammar import gbnf
+    ok = True
+    for reasoning in (False, True):
+        try:
+            LlamaGrammar.from_string(gbnf(reasoning), verbose=False)
+        except Exception as e:
+            ok = False
+            print(f"GBNF (reasoning={reasoning}) rejected by llama.cpp: {e}")
+    print(f"grammar check: {'ok' if ok else 'FAILED'}")
+    return ok
+
+
+def main():
+    from models.loader import COACHING_GGUF_PATH, COACHING_MODEL_PATH
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["float", "int8", "onnx", "gguf"])
+    parser.add_argument("--data", default=os.path.join(ROOT, "training_data.jsonl"))
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--model", default=COACHING_MODEL_PATH)
+    parser.add_argument("--gguf", default=COACHING_GGUF_PATH)
+    args = parser.parse_args()
+
+    if "gguf" in args.backends and not check_grammar():
+        sys.exit(1)
+
+    examples = load_examples(args.data, args.limit)
+    labels = [ex["output"]["action"] for ex in examples]
+    ctx = mp.get_context("spawn")
+
+    results = {}
+    for backend in args.backends:
+        queue = ctx.Queue()
+        path = args.gguf if backend == "gguf" else args.model
+        proc = ctx.Process(target=run_backend, args=(backend, path, examples, queue))
+        proc.start()
+        while proc.is_alive() or not queue.empty():
+            try:
+                results[backend] = queue.get(timeout=1)
+                break
+            except Exception:
+                continue
+        else:
+            print(f"{backend}: failed (see traceback above)")
+        proc.join()
+
+    reference = results.get("float")
+    print(f"\n{len(examples)} examples from {os.path.basename(args.data)}")
+    print(f"{'backend':>8} | {'load s':>6} | {'p50 ms':>7} | {'mean ms':>7} | {'peak RSS MB':>11} | "
+          f"{'label acc':>9} | {'action = float':>14} | {'message = float':>15}")
+    for backend, r in results.items():
+        lat = sorted(r["latencies"])
+        actions = [o["action"] for o in r["outputs"]]
+        acc = sum(a == l for a, l in zip(actions, labels)) / len(labels)
+        if reference:
+            ref = reference["outputs"]
+            action_parity = sum(a["action"] == b["action"] for a, b in zip(r["outputs"], ref)) / len(ref)
+            message_parity = sum(a["message"] == b["message"] for a, b in zip(r["outputs"], ref)) / len(ref)
+            parity = f"{action_parity:>14.0%} | {message_parity:>15.0%}"
+        else:
+            parity = f"{'-':>14} | {'-':>15}"
+        print(f"{backend:>8} | {r['load_s']:>6.1f} | {lat[len(lat) // 2] * 1000:>7.0f} | "
+              f"{sum(lat) / len(lat) * 1000:>7.0f} | {r['peak_rss_mb']:>11.0f} | {acc:>9.0%} | {parity}")
+
+
+if __name__ == "__main__":
+    main()
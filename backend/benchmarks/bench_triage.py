@@ -0,0 +1,242 @@
+"""
+How much of the coaching model's work the rule-based triage removes, and
+how often it disagrees with the labelled model output.
+
+Only "whisper" and "escalate" reach the presenter; "stay_silent" and
+"log_insight" produce nothing live, so those are what the triage may
+answer itself. A labelled whisper the triage silences is a miss.
+
+The examples describe the buyer in words, so the live signals are
+derived from them: engagement score from the emotion lexicon on
+``client_emotion``, energy and pace from keywords in ``audio_tone``.
+
+The cue lists were written against training_data.jsonl, so scoring them
+on it is optimistic. The headline numbers are k-fold held out instead:
+cues are picked from the training folds (any cue that fired on a labelled
+whisper there, mostly on whispers) and scored on the held-out fold, for
+both triage modes. The in-sample numbers follow for the --mode in use,
+then ORDINARY_SPEECH, on-track lines none of which should match a cue.
+
+    cd backend && python benchmarks/bench_triage.py [--data ../training_data.jsonl ...] [--folds 5] [--mode calm] [--show-misses]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agents.lexicon import DEFAULT_LEXICON  # noqa: E402
+from agents.triage import (  # noqa: E402
+    _IDENTIFIER, CALM_SCORE, CONFUSION_CUES, MODE, OBJECTION_CUES, TECH_JARGON,
+    TECH_JARGON_MAX_LEVEL, Triage, _phrase_pattern,
+)
+
+ROOT = os.path.join(os.path.dirname(__file__), "..", "..")
+DELIVERED = {"whisper", "escalate"}
+MODES = ("calm", "full")
+
+LOW_ENERGY_WORDS = ("flat", "deflated", "silent", "quiet", "soft", "monotone", "subdued")
+FAST_WORDS = ("faster", "fast pace", "rushed", "rapid", "speeding")
+SLOW_WORDS = ("very slow", "slowed", "long pause", "hesitant")
+
+CUES = {
+    (kind, cue): _phrase_pattern([cue])
+    for kind, cues in (("jargon", TECH_JARGON), ("confusion", CONFUSION_CUES),
+                       ("objection", OBJECTION_CUES))
+    for cue in cues
+}
+# A cue picked in cross-validation fired on a whisper in the training
+# folds, and at least this share of its firings there were whispers.
+MIN_PRECISION = 0.5
+
+# Calm, on-track lines from sales calls; any cue they match fires on
+# ordinary speech. Not drawn from training_data.jsonl.
+ORDINARY_SPEECH = (
+    "SELLER: As a small token of thanks, the first month is on us.",
+    "BUYER: We have a healthy pipeline for Q3, so the timing works.",
+    "SELLER: Payouts land in the account and routing number you already use.",
+    "BUYER: I don't know about you, but I'm keen to get this going.",
+    "SELLER: There's no risk on your side; you can cancel any month.",
+    "BUYER: Every listener on our show buys through the site, so checkout matters.",
+    "SELLER: Let me give you the bottom line for the finance team.",
+    "BUYER: Wait, that's included in the price? Great.",
+    "BUYER: Honestly, that's something we need this year.",
+    "BUYER: We already love the dashboard from the demo.",
+    "BUYER: Our current team can own the rollout.",
+    "SELLER: We can deploy our onboarding team the week you sign.",
+    "BUYER: Real-time reporting would be great for the board.",
+    "BUYER: In our last planning meeting the CEO signed off on this.",
+    "BUYER: Can we run the pilot in English and Spanish?",
+    "SELLER: Revenue is up 40% for customers your size, and churn is down.",
+    "BUYER: Perfect, send the proposal and I'll share it with my team.",
+    "SELLER: Most customers go live within two weeks.",
+    "BUYER: That makes sense. What does onboarding look like?",
+    "SELLER: You'd have a dedicated account manager from day one.",
+)
+
+
+def signals(example: dict) -> dict:
+    inp = example["input"]
+    tone = inp["audio_tone"].lower()
+    pace = 130
+    if any(w in tone for w in FAST_WORDS):
+        pace = 185
+    elif any(w in tone for w in SLOW_WORDS):
+        pace = 90
+    return {
+        "score": DEFAULT_LEXICON.score(inp["client_emotion"])["score"],
+        "trend": "stable",
+        "energy": "LOW" if any(w in tone for w in LOW_ENERGY_WORDS) else "MED",
+        "pace_wpm": pace,
+    }
+
+
+def matched_cues(text: str) -> set:
+    return {key for key, pattern in CUES.items() if pattern.search(text)}
+
+
+def cross_validate(rows: list[tuple[bool, set, bool]], folds: int, seed: int = 0):
+    """
+    rows: (a non-cue trigger fired, cues matched, labelled whisper/escalate).
+    Returns whispers missed and LLM calls eliminated on the held-out folds,
+    with fold-picked cues and with every shipped cue, plus how many folds
+    picked each cue.
+    """
+    order = list(range(len(rows)))
+    random.Random(seed).shuffle(order)
+    picked_in = Counter()
+    totals = {"picked": [0, 0], "shipped": [0, 0]}
+    for k in range(folds):
+        held_out = set(order[k::folds])
+        fired, on_whisper = Counter(), Counter()
+        for i, (_, cues, delivered) in enumerate(rows):
+            if i not in held_out:
+                fired.update(cues)
+                if delivered:
+                    on_whisper.update(cues)
+        picked = {c for c in fired if on_whisper[c] and on_whisper[c] / fired[c] >= MIN_PRECISION}
+        picked_in.update(picked)
+        for name, cue_set in (("picked", picked), ("shipped", set(CUES))):
+            for i in held_out:
+                other, cues, delivered = rows[i]
+                sent = other or bool(cues & cue_set)
+                totals[name][0] += delivered and not sent
+                totals[name][1] += not sent
+    return totals, picked_in
+
+
+def report_held_out(rows, folds: int, mode: str):
+    """Headline: cues picked on the training folds, scored on the held-out one."""
+    delivered = sum(r[2] for r in rows)
+    totals, _ = cross_validate(rows, folds)
+    missed, silenced = totals["picked"]
+    print(f"  {mode:<5} held out ({folds}-fold): whispers missed {missed}/{delivered} "
+          f"({missed / delivered:.0%}), LLM calls eliminated {silenced}/{len(rows)} "
+          f"({silenced / len(rows):.0%})")
+
+
+def report_cue_support(rows):
+    fired = Counter(c for _, cues, _ in rows for c in cues)
+    single = sorted(cue for (_, cue), n in fired.items() if n == 1)
+    never = sum(1 for key in CUES if key not in fired)
+    print(f"  cues matching one example only ({len(single)}): {single}")
+    print(f"  cues matching no example: {never}")
+
+
+def report_ordinary_speech():
+    hits = [(line, sorted(cue for _, cue in matched_cues(line))) for line in ORDINARY_SPEECH]
+    hits = [(line, cues) for line, cues in hits if cues]
+    print(f"\nordinary speech: {len(hits)}/{len(ORDINARY_SPEECH)} on-track lines match a cue")
+    for line, cues in hits:
+        print(f"  {cues} {line!r}")
+
+
+def evaluate(examples: list[dict], mode: str, tech_level: int) -> dict:
+    """The shipped triage on every example, plus the rows cross_validate needs."""
+    jargon_applies = tech_level <= TECH_JARGON_MAX_LEVEL
+    matrix, triggers, misses, rows = Counter(), Counter(), [], []
+    # One triage per session setup, as in the orchestrator; the baselines
+    # leave out the cue lists and built-in jargon, for cross-validation.
+    triages, baselines = {}, {}
+    elapsed = 0.0
+    for example in examples:
+        inp = example["input"]
+        context, text = inp["cultural_context"], inp["transcript_chunk"]
+        if context not in triages:
+            triages[context] = Triage(tech_level=tech_level, cultural_context=context, mode=mode)
+            baselines[context] = Triage(tech_level=TECH_JARGON_MAX_LEVEL + 1,
+                                        cultural_context=context, mode="full")
+        live = signals(example)
+        t0 = time.perf_counter()
+        found = triages[context].triggers(text, **live)
+        elapsed += time.perf_counter() - t0
+        label = example["output"]["action"]
+        matrix[(bool(found), label)] += 1
+        triggers.update(t.split(":", 1)[0] for t in found)
+        if not found and label in DELIVERED:
+            misses.append(example)
+
+        other = [t for t in baselines[context].triggers(text, **live)
+                 if t not in ("confusion", "objection")]
+        other_fired = (bool(other) or (jargon_applies and bool(_IDENTIFIER.search(text)))
+                       or (mode == "calm" and not calm(live)))
+        cues = {c for c in matched_cues(text) if c[0] != "jargon" or jargon_applies}
+        rows.append((other_fired, cues, label in DELIVERED))
+    return {"matrix": matrix, "triggers": triggers, "misses": misses, "rows": rows,
+            "us": elapsed / len(examples) * 1e6}
+
+
+def calm(live: dict) -> bool:
+    return live["score"] >= CALM_SCORE and live["trend"] == "stable" and live["energy"] == "MED"
+
+
+def report_in_sample(result: dict, n: int, delivered: int, mode: str):
+    """The shipped cue lists on the data they were written against."""
+    matrix = result["matrix"]
+    silenced = sum(v for (sent, _), v in matrix.items() if not sent)
+    quiet_sent = sum(v for (sent, label), v in matrix.items() if sent and label not in DELIVERED)
+    print(f"  {mode} mode, in-sample (optimistic; the cues were written on this data):")
+    print(f"    LLM calls eliminated     {silenced}/{n} ({silenced / n:.0%})")
+    print(f"    whispers missed          {len(result['misses'])}/{delivered}")
+    print(f"    quiet labels sent to LLM {quiet_sent}/{n - delivered}")
+    print(f"    triage cost              {result['us']:.0f} us/chunk")
+    print(f"    by label (sent, silenced): " + ", ".join(
+        f"{label} {matrix[(True, label)]}/{matrix[(False, label)]}"
+        for label in ("whisper", "escalate", "log_insight", "stay_silent")))
+    print(f"    triggers: {dict(result['triggers'].most_common())}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", nargs="+", default=[os.path.join(ROOT, "training_data.jsonl")])
+    parser.add_argument("--tech-level", type=int, default=1)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--mode", choices=MODES, default=MODE)
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args()
+
+    for path in args.data:
+        with open(path) as f:
+            examples = [json.loads(line) for line in f if line.strip()]
+        delivered = sum(ex["output"]["action"] in DELIVERED for ex in examples)
+        print(f"\n{os.path.basename(path)}: {len(examples)} examples, "
+              f"{delivered} labelled whisper/escalate")
+        results = {mode: evaluate(examples, mode, args.tech_level) for mode in MODES}
+        for mode in MODES:
+            report_held_out(results[mode]["rows"], args.folds, mode)
+        report_in_sample(results[args.mode], len(examples), delivered, args.mode)
+        report_cue_support(results[args.mode]["rows"])
+        if args.show_misses:
+            for ex in results[args.mode]["misses"]:
+                inp = ex["input"]
+                print(f"  MISS {inp['transcript_chunk'][:140]!r}\n       -> {ex['output']['message']}")
+
+    report_ordinary_speech()
+
+
+if __name__ == "__main__":
+    main()
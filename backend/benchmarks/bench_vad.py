@@ -0,0 +1,231 @@
+"""
+Speech gate in front of Whisper: the old fixed ``rms >= 0.01`` check
+versus the VAD in stt/vad.py, on 3 s chunks (what the AudioWorklet
+sends) of synthetic speech and of room noise that is louder than 0.01
+RMS: HVAC hum, a fan, keyboard typing, and speech over each of them.
+
+    cd backend && python benchmarks/bench_vad.py [--minutes 2] [--whisper]
+
+Reports, per scene, the share of chunks each gate sends to Whisper (on
+noise-only scenes every one of those is a wasted call), how much of the
+speech and of everything else (pauses between words included) the VAD
+keeps, and its per-chunk cost; then the first-chunk recall when the
+presenter is already mid-word as the session starts. With --whisper (needs the model weights), the chunks
+each gate lets through are transcribed and run through the server's
+hallucination filter. Needs scipy for the formant filters.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.signal import lfilter  # benchmark-only dependency
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from stt.vad import LEGACY_RMS, VoiceActivityDetector  # noqa: E402
+
+SR = 16000
+CHUNK = 3 * SR
+
+
+def speech(seconds: float, rng, level: float = 0.05) -> np.ndarray:
+    """
+    Voice-like signal: a jittered glottal pulse train through three
+    formant resonators, in syllables of 120-300 ms with short pauses
+    between words and longer ones between phrases.
+    """
+    n = int(seconds * SR)
+    out = np.zeros(n, dtype=np.float32)
+    t = 0
+    while t < n:
+        syllables = rng.integers(2, 8)
+        for _ in range(syllables):
+            length = int(rng.uniform(0.12, 0.3) * SR)
+            f0 = rng.uniform(95, 220)
+            period = SR / (f0 * (1 + 0.01 * rng.standard_normal(length // 80 + 1)))
+            pulses = np.cumsum(np.repeat(period, 1 + length // len(period))[:length // 40])
+            source = np.zeros(length)
+            source[pulses[pulses < length].astype(int)] = 1.0
+            voiced = source
+            for formant, bandwidth in ((rng.uniform(300, 800), 80),
+                                       (rng.uniform(900, 2200), 120),
+                                       (rng.uniform(2300, 3200), 200)):
+                voiced = _resonate(voiced, formant, bandwidth) + 0.3 * voiced
+            envelope = np.sin(np.linspace(0, np.pi, length)) ** 0.6
+            syllable = voiced * envelope
+            syllable *= level / (np.sqrt(np.mean(syllable ** 2)) + 1e-9)
+            end = min(n, t + length)
+            out[t:end] = syllable[:end - t]
+            t = end + int(rng.uniform(0.02, 0.12) * SR)
+            if t >= n:
+                break
+        t += int(rng.uniform(0.25, 1.2) * SR)
+    return out
+
+
+def _resonate(x: np.ndarray, freq: float, bandwidth: float) -> np.ndarray:
+    """Two-pole resonator (a formant), unity peak gain."""
+    r = np.exp(-np.pi * bandwidth / SR)
+    return lfilter([1 - r], [1, -2 * r * np.cos(2 * np.pi * freq / SR), r * r], x)
+
+
+def hvac(seconds: float, rng, level: float = 0.03) -> np.ndarray:
+    """Mains hum with harmonics over low-passed rumble."""
+    t = np.arange(int(seconds * SR)) / SR
+    hum = sum(np.sin(2 * np.pi * 60 * k * t) / k for k in (1, 2, 3, 4))
+    rumble = np.cumsum(rng.standard_normal(len(t)))
+    rumble -= np.convolve(rumble, np.ones(400) / 400, mode="same")
+    x = hum / np.std(hum) + rumble / np.std(rumble)
+    return (level * x / np.std(x)).astype(np.float32)
+
+
+def fan(seconds: float, rng, level: float = 0.02) -> np.ndarray:
+    """Broadband airflow noise, slightly tilted towards the lows."""
+    white = rng.standard_normal(int(seconds * SR))
+    x = np.convolve(white, [0.5, 0.3, 0.2], mode="same")
+    return (level * x / np.std(x)).astype(np.float32)
+
+
+def typing(seconds: float, rng, level: float = 0.015) -> np.ndarray:
+    """Key clicks: 5-15 ms decaying broadband bursts, ~6 keys per second."""
+    n = int(seconds * SR)
+    out = np.zeros(n)
+    t = int(rng.uniform(0, 0.2) * SR)
+    while t < n:
+        length = int(rng.uniform(0.005, 0.015) * SR)
+        click = rng.standard_normal(length) * np.exp(-np.linspace(0, 6, length))
+        out[t:t + length] += click[:n - t]
+        t += int(rng.exponential(1 / 6) * SR) + length
+    out += 0.05 * rng.standard_normal(n)
+    return (level * out / np.sqrt(np.mean(out ** 2))).astype(np.float32)
+
+
+def hvac_turns_on(seconds: float, rng) -> np.ndarray:
+    """Quiet for the first third, then the air conditioning starts."""
+    x = hvac(seconds, rng)
+    x[:len(x) // 3] *= 0.05
+    return x
+
+
+def room(seconds: float, rng) -> np.ndarray:
+    return (0.001 * rng.standard_normal(int(seconds * SR))).astype(np.float32)
+
+
+# Scene: (speech level or None, background).
+SCENES = {
+    "speech (quiet room)": (0.05, room),
+    "hvac hum": (None, hvac),
+    "fan": (None, fan),
+    "keyboard": (None, typing),
+    "hvac turns on": (None, hvac_turns_on),
+    "speech + hvac": (0.05, lambda s, rng: hvac(s, rng, 0.015)),
+    "speech + fan": (0.05, lambda s, rng: fan(s, rng, 0.01)),
+    "speech + keyboard": (0.05, lambda s, rng: typing(s, rng, 0.01)),
+    "speech + loud fan": (0.05, lambda s, rng: fan(s, rng, 0.03)),
+    "quiet speech": (0.008, lambda s, rng: 0.5 * room(s, rng)),
+}
+
+
+def run_scene(audio: np.ndarray, truth: np.ndarray, transcribe=None) -> dict:
+    vad = VoiceActivityDetector()
+    starts = range(0, len(audio) - CHUNK + 1, CHUNK)
+    legacy = vad_calls = kept_speech = kept_noise = 0
+    elapsed = 0.0
+    flagged = {"legacy": [0, 0], "vad": [0, 0]}
+    for i in starts:
+        chunk, speech_here = audio[i:i + CHUNK], truth[i:i + CHUNK]
+        rms_pass = float(np.sqrt(np.mean(chunk ** 2))) >= LEGACY_RMS
+        t0 = time.perf_counter()
+        active = vad.mask(chunk)
+        elapsed += time.perf_counter() - t0
+        legacy += rms_pass
+        vad_calls += active.any()
+        kept_speech += np.count_nonzero(active & speech_here)
+        kept_noise += np.count_nonzero(active & ~speech_here)
+        if transcribe:
+            for gate, audio_in in (("legacy", chunk if rms_pass else None),
+                                   ("vad", chunk[active] if active.any() else None)):
+                if audio_in is not None:
+                    text = transcribe(audio_in)
+                    flagged[gate][0] += 1
+                    flagged[gate][1] += bool(text) and is_hallucination(text)
+    n = len(starts)
+    speech_total = np.count_nonzero(truth[:n * CHUNK])
+    return {
+        "chunks": n,
+        "legacy": legacy / n,
+        "vad": vad_calls / n,
+        "recall": kept_speech / speech_total if speech_total else None,
+        "noise_kept": kept_noise / max(1, n * CHUNK - speech_total),
+        "ms": elapsed / n * 1000,
+        "hallucinations": flagged,
+    }
+
+
+def cold_start(seconds: float = 6.0) -> list[float]:
+    """Speech recall per chunk when the stream opens on the loudest syllable."""
+    rng = np.random.default_rng(1)
+    voice = speech(seconds * 2, rng)
+    energy = np.convolve(voice ** 2, np.ones(320), mode="valid")
+    start = int(np.argmax(energy[:CHUNK]))
+    voice = voice[start:start + int(seconds * SR)]
+    audio, truth = voice + room(seconds, rng), voice != 0
+    vad = VoiceActivityDetector()
+    recall = []
+    for i in range(0, len(audio) - CHUNK + 1, CHUNK):
+        active = vad.mask(audio[i:i + CHUNK])
+        recall.append(np.count_nonzero(active & truth[i:i + CHUNK]) / np.count_nonzero(truth[i:i + CHUNK]))
+    return recall
+
+
+def is_hallucination(text: str) -> bool:
+    from main import _is_whisper_hallucination
+    return _is_whisper_hallucination(text)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=2.0)
+    parser.add_argument("--whisper", action="store_true")
+    args = parser.parse_args()
+
+    transcribe = None
+    if args.whisper:
+        from faster_whisper import WhisperModel
+        model = WhisperModel("base", device="cpu", compute_type="int8")
+
+        def transcribe(pcm):
+            segments, _ = model.transcribe(pcm, language="en")
+            return " ".join(s.text for s in segments).strip()
+
+    print(f"{'scene':>20} {'rms gate':>9} {'vad':>6} {'speech kept':>12} {'other kept':>11} {'vad ms':>7}"
+          + (f" {'halluc. rms':>12} {'halluc. vad':>12}" if transcribe else ""))
+    totals = {"legacy": 0.0, "vad": 0.0, "noise_legacy": 0.0, "noise_vad": 0.0, "chunks": 0}
+    seconds = args.minutes * 60
+    for scene, (level, background) in SCENES.items():
+        rng = np.random.default_rng(0)
+        voice = speech(seconds, rng, level) if level else np.zeros(int(seconds * SR), np.float32)
+        r = run_scene(voice + background(seconds, rng), voice != 0, transcribe)
+        recall = f"{r['recall']:.0%}" if r["recall"] is not None else "-"
+        line = (f"{scene:>20} {r['legacy']:8.0%} {r['vad']:6.0%} "
+                f"{recall:>12} {r['noise_kept']:10.0%} {r['ms']:7.2f}")
+        if transcribe:
+            h = r["hallucinations"]
+            line += "".join(f" {h[g][1]:>5}/{h[g][0]:<6}" for g in ("legacy", "vad"))
+        print(line)
+        if not level:
+            totals["noise_legacy"] += r["legacy"] * r["chunks"]
+            totals["noise_vad"] += r["vad"] * r["chunks"]
+        totals["legacy"] += r["legacy"] * r["chunks"]
+        totals["vad"] += r["vad"] * r["chunks"]
+        totals["chunks"] += r["chunks"]
+    print(f"\nWhisper calls: {totals['legacy']:.0f} with the rms gate, {totals['vad']:.0f} with the VAD; "
+          f"on noise-only scenes {totals['noise_legacy']:.0f} -> {totals['noise_vad']:.0f}")
+    print("Speech from the first frame, recall per chunk: "
+          + ", ".join(f"{r:.0%}" for r in cold_start()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+PaliGemma engagement scoring: caption mode (generate + lexicon) versus
+classify mode (one forward pass, label probabilities). Reports latency
+per frame and, on real photos, how closely the two modes agree.
+
+    cd backend && python benchmarks/bench_vision_modes.py [--images dir/] [--batch 4] [--repeats 3]
+
+Without --images, random frames are used, which only makes the timings
+meaningful. Needs the PaliGemma weights.
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agents import emotion_agent  # noqa: E402
+from models.loader import registry  # noqa: E402
+
+
+def load_frames(directory: str | None, n: int) -> list[bytes]:
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, "*.jp*g")))
+        return [open(p, "rb").read() for p in paths]
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(n):
+        buf = io.BytesIO()
+        Image.fromarray(rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)).save(buf, format="JPEG")
+        frames.append(buf.getvalue())
+    return frames
+
+
+def run(mode: str, frames: list[bytes], batch: int, repeats: int) -> tuple[list[dict], float]:
+    emotion_agent.VISION_MODE = mode
+    emotion_agent.analyze_frames(frames[:batch])  # warm up this path
+    results, elapsed = [], 0.0
+    for r in range(repeats):
+        t0 = time.perf_counter()
+        out = []
+        for i in range(0, len(frames), batch):
+            out += emotion_agent.analyze_frames(frames[i:i + batch])
+        elapsed += time.perf_counter() - t0
+        results = out
+    return results, elapsed / repeats / len(frames) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images")
+    parser.add_argument("--frames", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if registry.get("vision", wait=600) is None:
+        sys.exit(f"vision model unavailable: {registry.status()['vision']['error']}")
+    # Side captions would mix caption cost into the classify timings.
+    emotion_agent.CAPTION_INTERVAL = 0
+    frames = load_frames(args.images, args.frames)
+
+    caption, caption_ms = run("caption", frames, args.batch, args.repeats)
+    classify, classify_ms = run("classify", frames, args.batch, args.repeats)
+
+    print(f"{len(frames)} frames, batch {args.batch}")
+    print(f"{'mode':>8} | {'ms/frame':>8}")
+    print(f"{'caption':>8} | {caption_ms:>8.0f}")
+    print(f"{'classify':>8} | {classify_ms:>8.0f}   ({caption_ms / classify_ms:.1f}x faster)")
+    if args.images:
+        diffs = [abs(a["raw_score"] - b["raw_score"]) for a, b in zip(caption, classify)]
+        category = lambda r: max(r["emotions"], key=r["emotions"].get)
+        agree = sum(category(a) == category(b) for a, b in zip(caption, classify))
+        print(f"mean |score difference| {np.mean(diffs):.1f}, "
+              f"top category agreement {agree}/{len(frames)}")
+
+
+if __name__ == "__main__":
+    main()
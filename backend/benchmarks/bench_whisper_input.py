@@ -0,0 +1,105 @@
+"""
+Per-chunk overhead of getting PCM into Whisper: the old WAV + temp-file
+path versus handing the float32 buffer straight to the model.
+
+    cd backend && python benchmarks/bench_whisper_input.py [--transcribe]
+
+Only input preparation is timed by default; --transcribe also runs the
+Whisper "base" model end to end on both paths.
+"""
+import argparse
+import io
+import os
+import struct
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from stt.streaming import resample  # noqa: E402
+
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 3
+
+
+def pcm_to_wav_bytes(pcm: np.ndarray, sample_rate: int = 16000) -> bytes:
+    """The removed WAV builder from main.py, kept here as the baseline."""
+    pcm_16 = np.clip(pcm * 32767, -32768, 32767).astype(np.int16)
+    buf = io.BytesIO()
+    data_size = len(pcm_16) * 2
+    buf.write(b"RIFF")
+    buf.write(struct.pack("<I", 36 + data_size))
+    buf.write(b"WAVE")
+    buf.write(b"fmt ")
+    buf.write(struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16))
+    buf.write(b"data")
+    buf.write(struct.pack("<I", data_size))
+    buf.write(pcm_16.tobytes())
+    return buf.getvalue()
+
+
+def legacy_input(raw: bytes, decode_audio):
+    pcm = np.frombuffer(raw, dtype=np.float32)
+    wav = pcm_to_wav_bytes(pcm, SAMPLE_RATE)
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+        f.write(wav)
+        path = f.name
+    try:
+        # Whisper decodes the file back to float32 before inference.
+        return decode_audio(path) if decode_audio else wav
+    finally:
+        os.unlink(path)
+
+
+def direct_input(raw: bytes, decode_audio=None):
+    return resample(np.frombuffer(raw, dtype=np.float32), SAMPLE_RATE)
+
+
+def _time(fn, raw, iterations, *args):
+    fn(raw, *args)
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn(raw, *args)
+    return (time.perf_counter() - t0) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--transcribe", action="store_true")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    pcm = (0.1 * rng.standard_normal(SAMPLE_RATE * CHUNK_SECONDS)).astype(np.float32)
+    raw = pcm.tobytes()
+
+    try:
+        from faster_whisper.audio import decode_audio
+    except ImportError:
+        decode_audio = None
+        print("faster-whisper not installed: legacy path timed without file decode")
+
+    legacy_ms = _time(legacy_input, raw, args.iterations, decode_audio)
+    direct_ms = _time(direct_input, raw, args.iterations)
+    print(f"{CHUNK_SECONDS}s chunk input prep: legacy {legacy_ms:.3f} ms | "
+          f"direct {direct_ms:.4f} ms | {legacy_ms / max(direct_ms, 1e-6):.0f}x")
+
+    if args.transcribe:
+        from faster_whisper import WhisperModel
+        model = WhisperModel("base", device="cpu", compute_type="int8")
+
+        def run(inp):
+            segments, _ = model.transcribe(inp, language="en")
+            return " ".join(s.text for s in segments)
+
+        n = max(1, args.iterations // 20)
+        legacy_e2e = _time(lambda r: run(legacy_input(r, decode_audio)), raw, n)
+        direct_e2e = _time(lambda r: run(direct_input(r)), raw, n)
+        print(f"end to end: legacy {legacy_e2e:.1f} ms | direct {direct_e2e:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+
+class LRUCache:
+    """
+    Thread-safe bounded mapping that evicts the least recently used entry.
+    Bounded by entry count, and optionally by total size as measured by
+    ``sizeof(value)``. With ``ttl`` (seconds), an entry also expires that
+    long after it was stored.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int | None = None,
+                 sizeof: Callable[[object], int] = len, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+        self._bytes = 0
+        self._data: OrderedDict = OrderedDict()
+        self._expires: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data and not self._expired(key)
+
+    def _expired(self, key) -> bool:
+        return self.ttl is not None and self._expires[key] <= time.monotonic()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data and self._expired(key):
+                self._remove(key)
+                self.expirations += 1
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            if self.max_bytes is not None:
+                size = self._sizeof(value)
+                if size > self.max_bytes:
+                    return
+                if key in self._data:
+                    self._bytes -= self._sizeof(self._data[key])
+                self._bytes += size
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.ttl is not None:
+                self._expires[key] = time.monotonic() + self.ttl
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._evict_oldest()
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            return self._remove(key)
+
+    def _remove(self, key):
+        value = self._data.pop(key)
+        self._expires.pop(key, None)
+        if self.max_bytes is not None:
+            self._bytes -= self._sizeof(value)
+        return value
+
+    def _evict_oldest(self):
+        self._remove(next(iter(self._data)))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            **({"bytes": self._bytes, "max_bytes": self.max_bytes}
+               if self.max_bytes is not None else {}),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            **({"ttl": self.ttl, "expirations": self.expirations}
+               if self.ttl is not None else {}),
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
@@ -1,24 +1,64 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import asyncio
 import base64
-import io
+import itertools
 import json
 import os
 import re
-import struct
-import tempfile
 import uuid
 from datetime import datetime
 import numpy as np
-from faster_whisper import WhisperModel
-from orchestrator import PitchMind
-
-print("Loading Whisper model...")
-whisper_model = WhisperModel("base", device="cpu", compute_type="int8")
-print("✓ Whisper model loaded")
-
-app = FastAPI()
+from orchestrator import (
+    PitchMind, coaching_batcher, cooldown_stats, result_cache_stats, vision_batcher,
+)
+from agents.language_agent import decode_stats, prefix_cache_stats
+from agents.faces import face_stats
+from agents.frame_change import skip_stats
+from agents.triage import triage_stats
+from models.loader import LOADING_MODE, registry
+from scheduler import Overloaded, scheduler
+from pipeline import MERGE, Pipeline, SerializedSender, SessionPipelines
+from protocol import (
+    KIND_AUDIO, KIND_FRAME, ProtocolError, parse_binary, pcm_from_payload,
+)
+from stt.streaming import (
+    MAX_BUFFER_SECONDS, WHISPER_SAMPLE_RATE, StreamingTranscriber, TranscriptUpdate, resample,
+)
+from stt.vad import ENABLED as VAD_ENABLED, LEGACY_RMS, VoiceActivityDetector, vad_stats
+from tts.kokoro import presynthesize, speech_stats, stream_speech, tts_cache_stats
+from workers import process_workers, worker_stats
+
+# Streaming mode keeps a rolling buffer per session and commits words as
+# consecutive Whisper passes agree on them; set to 0 to transcribe each
+# audio chunk in isolation.
+STREAMING_TRANSCRIPTION = os.environ.get("PITCHMIND_STREAMING_STT", "1") != "0"
+# Backlogged speech is fed to the streaming transcriber at most this many
+# samples at a time; with what a pass leaves buffered, it always fits.
+BACKLOG_PIECE = int(MAX_BUFFER_SECONDS * WHISPER_SAMPLE_RATE)
+# Synthesize the common coaching phrases at startup so they play from cache.
+TTS_PRESYNTHESIS = os.environ.get("PITCHMIND_TTS_PRESYNTH", "1") != "0"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Models load in background threads; the port is bound immediately and
+    # /health/ready reports when inference can actually be served.
+    if LOADING_MODE == "eager":
+        registry.start()
+    if process_workers is not None:
+        process_workers.start()
+    presynth = asyncio.create_task(presynthesize()) if TTS_PRESYNTHESIS else None
+    yield
+    if presynth is not None:
+        presynth.cancel()
+    if process_workers is not None:
+        process_workers.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:3001"],
@@ -28,14 +68,20 @@ app.add_middleware(
 
 sessions = {}
 
+_utterance_ids = itertools.count(1)
+# Strong references to in-flight speech streams (the loop only keeps weak ones).
+_speech_tasks: set[asyncio.Task] = set()
+
 
 @app.post("/api/session/start")
 async def start_session(context: dict):
     session_id = str(uuid.uuid4())
-    orchestrator = PitchMind(context)
+    orchestrator = PitchMind(context, session_id)
     sessions[session_id] = {
         "id": session_id,
         "orchestrator": orchestrator,
+        "transcriber": StreamingTranscriber(lambda: registry.get("whisper")),
+        "vad": VoiceActivityDetector(),
         "started_at": datetime.now().isoformat(),
     }
     return {"session_id": session_id, "status": "ready"}
@@ -47,49 +93,71 @@ async def end_session(body: dict):
     if not session:
         return {"error": "not found"}
     debrief = session["orchestrator"].get_debrief()
+    session["orchestrator"].close()
+    scheduler.drop_session(session["id"])
     return {"debrief": debrief, "status": "complete"}
 
 
-def pcm_to_wav_bytes(pcm: np.ndarray, sample_rate: int = 16000) -> bytes:
-    """Convert float32 PCM numpy array to in-memory WAV bytes for Whisper."""
-    pcm_16 = np.clip(pcm * 32767, -32768, 32767).astype(np.int16)
-    buf = io.BytesIO()
-    num_samples = len(pcm_16)
-    data_size = num_samples * 2
-    buf.write(b"RIFF")
-    buf.write(struct.pack("<I", 36 + data_size))
-    buf.write(b"WAVE")
-    buf.write(b"fmt ")
-    buf.write(struct.pack("<I", 16))
-    buf.write(struct.pack("<H", 1))
-    buf.write(struct.pack("<H", 1))
-    buf.write(struct.pack("<I", sample_rate))
-    buf.write(struct.pack("<I", sample_rate * 2))
-    buf.write(struct.pack("<H", 2))
-    buf.write(struct.pack("<H", 16))
-    buf.write(b"data")
-    buf.write(struct.pack("<I", data_size))
-    buf.write(pcm_16.tobytes())
-    return buf.getvalue()
+@app.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    ready = registry.ready()
+    return JSONResponse(
+        {"ready": ready, "engines": registry.status()},
+        status_code=200 if ready else 503,
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "sessions": len(sessions),
+        "models": registry.status(),
+        "scheduler": scheduler.stats(),
+        "batching": {
+            "vision": vision_batcher.stats(),
+            "coaching": coaching_batcher.stats(),
+        },
+        "prefix_cache": prefix_cache_stats(),
+        "coaching_decode": decode_stats(),
+        "coaching_cooldown": cooldown_stats(),
+        "coaching_results": result_cache_stats(),
+        "triage": triage_stats(),
+        "frame_skip": skip_stats(),
+        "faces": face_stats(),
+        "process_workers": worker_stats(),
+        "vad": vad_stats(),
+        "transcripts": transcript_stats(),
+        "tts_cache": tts_cache_stats(),
+        "tts": speech_stats(),
+        "pipelines": {
+            sid: s["pipelines"].stats()
+            for sid, s in sessions.items() if "pipelines" in s
+        },
+    }
 
 
 def _transcribe_pcm(pcm_array: np.ndarray, sample_rate: int) -> str:
-    """Synchronous Whisper transcription -- called via run_in_executor."""
-    tmp_path = None
+    """
+    Synchronous Whisper transcription -- called via run_in_executor.
+    The float32 buffer goes straight to the model: no int16 round trip,
+    no WAV container, no temp file for Whisper to decode again.
+    """
+    whisper_model = registry.get("whisper")
+    if whisper_model is None:
+        print("[Whisper] model not ready, chunk skipped")
+        return ""
     try:
-        wav_bytes = pcm_to_wav_bytes(pcm_array, sample_rate)
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-            f.write(wav_bytes)
-            tmp_path = f.name
-
-        segments, _ = whisper_model.transcribe(tmp_path, language="en")
+        audio = resample(pcm_array, sample_rate)
+        segments, _ = whisper_model.transcribe(audio, language="en")
         return " ".join(seg.text for seg in segments).strip()
     except Exception as e:
         print(f"Whisper transcription error: {e}")
         return ""
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
 
 
 _HALLUCINATION_PHRASES = {
@@ -102,6 +170,17 @@ _REPEAT_PATTERN = re.compile(
 )
 
 
+_transcript_counts = {"transcripts": 0, "hallucinations": 0}
+
+
+def transcript_stats() -> dict:
+    total = _transcript_counts["transcripts"]
+    return {
+        **_transcript_counts,
+        "hallucination_rate": round(_transcript_counts["hallucinations"] / total, 3) if total else 0.0,
+    }
+
+
 def _is_whisper_hallucination(text: str) -> bool:
     """Detect common Whisper hallucination patterns on low-signal audio."""
     stripped = text.strip()
@@ -120,7 +199,7 @@ def _is_whisper_hallucination(text: str) -> bool:
     return False
 
 
-async def flush_orchestrator_events(ws: WebSocket, orch: PitchMind):
+async def flush_orchestrator_events(ws, orch: PitchMind):
     """Send any pending coaching and moment messages from the orchestrator."""
     for coaching in orch.drain_coaching():
         await ws.send_json({
@@ -130,13 +209,10 @@ async def flush_orchestrator_events(ws: WebSocket, orch: PitchMind):
             "via_earbuds": coaching["via_earbuds"],
             "timestamp": coaching["timestamp"],
         })
-        audio_b64 = coaching.get("audio_b64")
-        if audio_b64:
-            await ws.send_json({
-                "type": "coaching_audio",
-                "audio": audio_b64,
-                "message": coaching["message"],
-            })
+        if coaching.get("speak"):
+            task = asyncio.create_task(_stream_coaching_audio(ws, coaching["message"]))
+            _speech_tasks.add(task)
+            task.add_done_callback(_speech_tasks.discard)
     for moment in orch.drain_moments():
         await ws.send_json({
             "type": "moment",
@@ -146,113 +222,305 @@ async def flush_orchestrator_events(ws: WebSocket, orch: PitchMind):
         })
 
 
+async def _stream_coaching_audio(ws, message: str):
+    """
+    Send a whisper's speech as ``coaching_audio`` chunks as soon as each is
+    synthesized; the client queues them by ``id`` and ``seq`` and starts
+    playing on the first one.
+    """
+    utterance_id = next(_utterance_ids)
+    seq = 0
+    try:
+        async for chunk in stream_speech(message):
+            await ws.send_json({
+                "type": "coaching_audio",
+                "id": utterance_id,
+                "seq": seq,
+                "final": chunk.final,
+                "format": chunk.format,
+                "sample_rate": chunk.sample_rate,
+                "audio": base64.b64encode(chunk.data).decode("ascii"),
+                "message": message,
+            })
+            seq += 1
+    except Exception as e:
+        # The socket closed mid-utterance; nothing left to play it on.
+        print(f"[TTS] coaching audio stream stopped: {e}")
+
+
+async def _coach_on_transcript(ws, orch: PitchMind, text: str):
+    """Language pipeline: run the coaching model on (merged) transcript text."""
+    lang_result = await orch.process_transcript(text)
+    action = lang_result.get("action", "?")
+    msg_preview = (lang_result.get("message") or "")[:80]
+    print(f"[Coaching] action={action} msg={msg_preview}")
+    await flush_orchestrator_events(ws, orch)
+
+
+async def _forward_transcript(ws, pipes: SessionPipelines, text: str):
+    """Show transcript text immediately and queue it for coaching."""
+    await ws.send_json({
+        "type": "transcript",
+        "text": text,
+        "timestamp": datetime.now().strftime("%H:%M:%S"),
+        "jargon_flags": [],
+    })
+    pipes["language"].put(text)
+
+
+async def _handle_transcribed_text(ws, pipes: SessionPipelines, text: str):
+    if not text:
+        return
+    _transcript_counts["transcripts"] += 1
+    if _is_whisper_hallucination(text):
+        _transcript_counts["hallucinations"] += 1
+        return
+    print(f"[Whisper] \"{text[:120]}\"")
+    await _forward_transcript(ws, pipes, text)
+
+
+async def _handle_transcript_update(ws, pipes: SessionPipelines, update,
+                                    end_of_utterance: bool = False):
+    """
+    Forward a streaming update: committed text is coached, the rest is a
+    preview. An empty preview tells the client to clear the one it shows;
+    it always goes out at the end of an utterance, whatever the flush
+    produced, so no stale preview outlives it.
+    """
+    if update.committed:
+        await _handle_transcribed_text(ws, pipes, update.committed)
+    if update.partial or update.committed or end_of_utterance:
+        await ws.send_json({
+            "type": "transcript_partial",
+            "text": update.partial,
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+        })
+
+
+async def _run_whisper(session_id: str, fn, *args):
+    try:
+        return await scheduler.run("whisper", session_id, fn, *args)
+    except Overloaded as e:
+        print(f"[Whisper] skipped: {e}")
+        return None
+
+
+async def _transcribe_chunks(ws, session: dict, pipes: SessionPipelines,
+                             segments: list[tuple]):
+    """
+    Transcription pipeline: gets all speech that arrived since the last
+    pass (joined by ``_join_speech``, never dropped) as (16 kHz speech,
+    still speaking) segments, one per utterance, and decodes it in one go.
+    """
+    session_id = session["id"]
+
+    if STREAMING_TRANSCRIPTION:
+        transcriber: StreamingTranscriber = session["transcriber"]
+        needs_pass = False
+        for speech, speaking in segments:
+            # A long backlog goes in in pieces, decoded in between, so the
+            # rolling buffer never has to shed audio to make room.
+            for start in range(0, len(speech), BACKLOG_PIECE):
+                if needs_pass:
+                    update = await _run_whisper(session_id, transcriber.process)
+                    if update:
+                        await _handle_transcript_update(ws, pipes, update)
+                transcriber.insert_audio(speech[start:start + BACKLOG_PIECE], 16000)
+                needs_pass = True
+            if not speaking and len(transcriber.buffer):
+                # A pause ends the utterance: commit the tail now
+                # instead of waiting for the next voiced chunk.
+                update = await _run_whisper(session_id, transcriber.flush)
+                await _handle_transcript_update(ws, pipes, update or TranscriptUpdate(),
+                                                end_of_utterance=True)
+                needs_pass = False
+        if needs_pass:
+            # On overload the audio stays buffered for the next pass.
+            update = await _run_whisper(session_id, transcriber.process)
+            if update:
+                await _handle_transcript_update(ws, pipes, update)
+        return
+
+    voiced = [speech for speech, _ in segments if len(speech)]
+    if voiced:
+        transcript_text = await _run_whisper(
+            session_id, _transcribe_pcm, np.concatenate(voiced), 16000
+        )
+        await _handle_transcribed_text(ws, pipes, transcript_text)
+
+
+def _join_speech(older: list, newer: list) -> list:
+    """
+    Transcription backlog: speech of an utterance still in progress is
+    joined, a finished utterance stays its own segment so it is flushed
+    at its pause, and silence after one adds nothing.
+    """
+    speech, speaking = older[-1]
+    if speaking:
+        return [*older[:-1], (np.concatenate([speech, newer[0][0]]), newer[0][1]), *newer[1:]]
+    if len(newer) == 1 and not len(newer[0][0]) and not newer[0][1]:
+        return older
+    return older + newer
+
+
+async def _analyze_signals(ws, orch: PitchMind, chunk: tuple):
+    """Signals pipeline: pace/energy on every chunk (joined if backlogged), silent ones too."""
+    pcm_array, sample_rate = chunk
+    result = await orch.process_audio(pcm_array, sample_rate)
+    await ws.send_json({
+        "type": "audio_signals",
+        "pace_wpm": result["pace_wpm"],
+        "energy": result["energy"],
+        "timestamp": datetime.now().strftime("%H:%M:%S"),
+    })
+
+
+def _join_chunks(older: tuple, newer: tuple) -> tuple:
+    """The audio analyzer is stateful, so backlogged chunks are joined rather than dropped."""
+    if older[1] != newer[1]:
+        return newer
+    return np.concatenate([older[0], newer[0]]), newer[1]
+
+
+async def _handle_frame(ws, orch: PitchMind, frame):
+    """Vision pipeline: emotion analysis on the newest camera frame."""
+    unit = "chars" if isinstance(frame, str) else "bytes"
+    print(f"[Frame] analyzing ({len(frame)} {unit})")
+    result = await orch.process_frame(frame)
+    score = result.get("score", 50)
+    emotions = result.get("emotions", {
+        "engaged": 10, "neutral": 60,
+        "confused": 10, "checked_out": 20,
+    })
+    await ws.send_json({
+        "type": "emotion",
+        "score": score,
+        "emotions": emotions,
+        "signal": result.get("signal", ""),
+        "faces": result.get("faces", []),
+        "timestamp": datetime.now().strftime("%H:%M:%S"),
+    })
+    await flush_orchestrator_events(ws, orch)
+
+
+def _start_pipelines(ws, session: dict) -> SessionPipelines:
+    orch: PitchMind = session["orchestrator"]
+    pipes = SessionPipelines([
+        Pipeline("vision", lambda frame: _handle_frame(ws, orch, frame)),
+        Pipeline("transcription",
+                 lambda segments: _transcribe_chunks(ws, session, pipes, segments),
+                 mode=MERGE, merge=_join_speech),
+        Pipeline("language",
+                 lambda text: _coach_on_transcript(ws, orch, text),
+                 mode=MERGE, merge=lambda older, newer: f"{older} {newer}"),
+        Pipeline("signals", lambda chunk: _analyze_signals(ws, orch, chunk),
+                 mode=MERGE, merge=_join_chunks),
+    ])
+    pipes.start()
+    session["pipelines"] = pipes
+    return pipes
+
+
+def _accept_audio(pipes: SessionPipelines, vad: VoiceActivityDetector,
+                  pcm_array: np.ndarray, sample_rate: int):
+    """
+    Route a PCM chunk: the signals pipeline gets all of it, transcription
+    only its voiced spans (16 kHz, empty when nobody is speaking) and
+    whether speech runs on past its end.
+    """
+    if len(pcm_array) < 100 or not np.all(np.isfinite(pcm_array)):
+        return
+    if VAD_ENABLED:
+        speech = vad.speech(pcm_array, sample_rate)
+        speaking = vad.speaking
+    else:
+        speaking = float(np.sqrt(np.mean(pcm_array ** 2))) >= LEGACY_RMS
+        speech = resample(pcm_array, sample_rate) if speaking else pcm_array[:0]
+    pipes["transcription"].put([(speech, speaking)])
+    pipes["signals"].put((pcm_array, sample_rate))
+
+
+def _accept_binary(pipes: SessionPipelines, vad: VoiceActivityDetector, data: bytes):
+    try:
+        kind, sample_rate, payload = parse_binary(data)
+    except ProtocolError as e:
+        print(f"[WS] dropped binary message: {e}")
+        return
+
+    if kind == KIND_FRAME:
+        pipes["vision"].put(bytes(payload))
+    elif kind == KIND_AUDIO:
+        _accept_audio(pipes, vad, pcm_from_payload(payload), sample_rate or 16000)
+
+
 @app.websocket("/ws/session")
 async def websocket_session(websocket: WebSocket):
+    """
+    Accepts JSON text messages (base64 media, the original protocol) and
+    binary media frames (see protocol.py) on the same socket.
+
+    The receive loop only decodes and routes; vision, transcription,
+    language and signals each run in their own pipeline task, so a slow
+    model never holds up ingestion.
+    """
     await websocket.accept()
+    ws = SerializedSender(websocket)
     session_id = None
+    pipes: SessionPipelines | None = None
 
     try:
-        async for raw in websocket.iter_text():
-            msg = json.loads(raw)
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            session = sessions.get(session_id)
+            if session and pipes is None:
+                pipes = _start_pipelines(ws, session)
+
+            if message.get("bytes") is not None:
+                if pipes:
+                    _accept_binary(pipes, session["vad"], message["bytes"])
+                continue
+
+            msg = json.loads(message["text"])
 
             if msg["type"] == "init":
                 session_id = msg["session_id"]
                 print(f"Session started: {session_id}")
+                if pipes:
+                    await pipes.stop()
+                    pipes = None
+                if session_id in sessions:
+                    pipes = _start_pipelines(ws, sessions[session_id])
                 continue
 
-            session = sessions.get(session_id)
-            if not session:
+            if not pipes:
                 continue
 
-            orch: PitchMind = session["orchestrator"]
-
             if msg["type"] == "earbud_status":
                 connected = msg.get("connected", False)
-                orch.earbuds_connected = connected
+                session["orchestrator"].earbuds_connected = connected
                 print(f"[Earbuds] {'connected' if connected else 'disconnected'}")
                 continue
 
             # ── Video frame from camera ──────────────────────────
             if msg["type"] == "frame":
-                print(f"[Frame] received ({len(msg['data'])} chars)")
-                result = await orch.process_frame(msg["data"])
-                score = result.get("score", 50)
-                emotions = result.get("emotions", {
-                    "engaged": 10, "neutral": 60,
-                    "confused": 10, "checked_out": 20,
-                })
-                await websocket.send_json({
-                    "type": "emotion",
-                    "score": score,
-                    "emotions": emotions,
-                    "signal": result.get("signal", ""),
-                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                })
-                await flush_orchestrator_events(websocket, orch)
+                pipes["vision"].put(msg["data"])
 
             # ── Transcript chunk (text already transcribed) ──────
             elif msg["type"] == "transcript":
-                result = await orch.process_transcript(msg["text"])
-                await websocket.send_json({
-                    "type": "transcript",
-                    "text": msg["text"],
-                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                    "jargon_flags": [],
-                })
-                await flush_orchestrator_events(websocket, orch)
+                await _forward_transcript(ws, pipes, msg["text"])
 
             # ── Raw PCM audio from AudioWorklet ──────────────────
             elif msg["type"] == "audio":
                 raw_bytes = base64.b64decode(msg["data"])
                 sample_rate = msg.get("sample_rate", 16000)
-
                 pcm_array = np.frombuffer(raw_bytes, dtype=np.float32)
-
-                if len(pcm_array) < 100 or not np.all(np.isfinite(pcm_array)):
-                    continue
-
-                rms = float(np.sqrt(np.mean(pcm_array ** 2)))
-                if rms < 0.01:
-                    # Audio signal analysis still runs on silent chunks
-                    result = await orch.process_audio(pcm_array, sample_rate)
-                    await websocket.send_json({
-                        "type": "audio_signals",
-                        "pace_wpm": result["pace_wpm"],
-                        "energy": result["energy"],
-                        "timestamp": datetime.now().strftime("%H:%M:%S"),
-                    })
-                    continue
-
-                loop = asyncio.get_event_loop()
-
-                transcript_text = await loop.run_in_executor(
-                    None, _transcribe_pcm, pcm_array, sample_rate
-                )
-
-                if transcript_text and not _is_whisper_hallucination(transcript_text):
-                    print(f"[Whisper] \"{transcript_text[:120]}\"")
-                    lang_result = await orch.process_transcript(
-                        transcript_text
-                    )
-                    action = lang_result.get("action", "?")
-                    msg_preview = (lang_result.get("message") or "")[:80]
-                    print(f"[Coaching] action={action} msg={msg_preview}")
-                    await websocket.send_json({
-                        "type": "transcript",
-                        "text": transcript_text,
-                        "timestamp": datetime.now().strftime("%H:%M:%S"),
-                        "jargon_flags": [],
-                    })
-                    await flush_orchestrator_events(websocket, orch)
-
-                # Audio signal analysis (pace, energy)
-                result = await orch.process_audio(pcm_array, sample_rate)
-                await websocket.send_json({
-                    "type": "audio_signals",
-                    "pace_wpm": result["pace_wpm"],
-                    "energy": result["energy"],
-                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                })
+                _accept_audio(pipes, session["vad"], pcm_array, sample_rate)
 
     except WebSocketDisconnect:
         print(f"Session {session_id} disconnected")
+    finally:
+        if pipes:
+            await pipes.stop()
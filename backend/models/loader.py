@@ -1,3 +1,7 @@
+import glob
+import os
+
+import numpy as np
 import torch
 from transformers import (
     AutoModelForCausalLM,
@@ -6,45 +10,166 @@ from transformers import (
     PaliGemmaForConditionalGeneration,
 )
 
-print("Loading models... (one time, ~2 min)")
+from models.registry import registry
 
 DEVICE = "cuda" if torch.cuda.is_available() else \
          "mps" if torch.backends.mps.is_available() else "cpu"
 
-print(f"Using device: {DEVICE}")
+# The -224 checkpoint takes 256 image tokens instead of 1024. With face
+# detection on (agents/faces.py) each input is a single face, for which it
+# is enough, and four crops cost what one whole 448 px frame did.
+PALIGEMMA_ID = os.environ.get(
+    "PITCHMIND_VISION_MODEL",
+    "google/paligemma2-3b-pt-224" if os.environ.get("PITCHMIND_FACE_DETECTION", "1") != "0"
+    else "google/paligemma2-3b-pt-448",
+)
+PALIGEMMA_RESOLUTION = int(PALIGEMMA_ID.rsplit("-", 1)[-1]) if PALIGEMMA_ID[-3:].isdigit() else 448
+COACHING_MODEL_PATH = os.environ.get(
+    "PITCHMIND_COACHING_MODEL", "/home/hackathon/finetune/merged_model"
+)
+WHISPER_SIZE = os.environ.get("PITCHMIND_WHISPER_MODEL", "base")
+
+# Inference backend per model:
+#   "float" -- fp16 on GPU, fp32 on CPU (the original behaviour)
+#   "int8"  -- dynamic int8 quantization of every Linear layer (CPU only)
+#   "onnx"  -- ONNX Runtime graph with int8 weights, via optimum (coaching only)
+#   "gguf"  -- the q4_k_m GGUF from train.py on llama.cpp (coaching only)
+BACKENDS = ("float", "int8", "onnx", "gguf")
+VISION_BACKEND = os.environ.get("PITCHMIND_VISION_BACKEND", "float")
+COACHING_BACKEND = os.environ.get("PITCHMIND_COACHING_BACKEND", "float")
+# Exported/quantized ONNX graphs are built once and reused from here.
+ONNX_DIR = os.environ.get(
+    "PITCHMIND_ONNX_DIR", os.path.expanduser("~/.cache/pitchmind/onnx")
+)
+# A .gguf file, or the directory train.py's save_pretrained_gguf wrote.
+COACHING_GGUF_PATH = os.environ.get(
+    "PITCHMIND_COACHING_GGUF", "/home/hackathon/finetune/gguf_model"
+)
+GGUF_CONTEXT = int(os.environ.get("PITCHMIND_GGUF_CONTEXT", 2048))
+GGUF_THREADS = int(os.environ.get("PITCHMIND_GGUF_THREADS", os.cpu_count() or 4))
+# llama.cpp keeps evaluated prompt states keyed by token prefix, so each
+# session's static prompt prefix is only prefilled once.
+GGUF_PROMPT_CACHE_MB = int(os.environ.get("PITCHMIND_GGUF_PROMPT_CACHE_MB", 512))
+
+# "eager" loads every engine in background threads at startup; "lazy"
+# loads each one the first time it is asked for.
+LOADING_MODE = os.environ.get("PITCHMIND_MODEL_LOADING", "eager")
+# Run one tiny inference per engine before reporting it ready, so the
+# first real request doesn't pay kernel selection and allocation costs.
+registry.warmup_enabled = os.environ.get("PITCHMIND_WARMUP", "1") != "0"
+
+
+def _dtype():
+    return torch.float16 if DEVICE != "cpu" else torch.float32
+
+
+def _check_backend(backend: str, allowed=BACKENDS):
+    if backend not in allowed:
+        raise ValueError(f"unknown backend {backend!r}, expected one of {allowed}")
+
+
+def _from_pretrained(cls, path: str, backend: str):
+    if backend == "int8" and DEVICE != "cpu":
+        print(f"⚠ int8 dynamic quantization is CPU-only; loading {path} as float on {DEVICE}")
+        backend = "float"
+    if backend == "float":
+        return cls.from_pretrained(path, dtype=_dtype(), device_map="auto")
+    # Dynamic quantization stores int8 Linear weights and quantizes
+    # activations on the fly: ~4x less weight memory, int8 GEMMs on CPU.
+    model = cls.from_pretrained(path, dtype=torch.float32)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# ── Whisper (speech-to-text) ─────────────────────────────────────
+def load_whisper():
+    from faster_whisper import WhisperModel
+    return WhisperModel(WHISPER_SIZE, device="cpu", compute_type="int8")
+
+
+def warmup_whisper(model):
+    segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), language="en")
+    list(segments)
+
 
 # ── PaliGemma 2 (vision — reads audience faces) ──────────────────
-paligemma_model = None
-paligemma_processor = None
-PALIGEMMA_RESOLUTION = 448
-
-try:
-    print("Loading PaliGemma 2 (pt-448)...")
-    paligemma_id = "google/paligemma2-3b-pt-448"
-    paligemma_processor = PaliGemmaProcessor.from_pretrained(paligemma_id)
-    paligemma_model = PaliGemmaForConditionalGeneration.from_pretrained(
-        paligemma_id,
-        dtype=torch.float16 if DEVICE != "cpu" else torch.float32,
-        device_map="auto",
-    )
-    print("✓ PaliGemma 2 loaded")
-except Exception as e:
-    print(f"⚠ PaliGemma 2 not available ({e}). Emotion agent will use fallback.")
+def load_paligemma(backend: str = VISION_BACKEND):
+    _check_backend(backend, ("float", "int8"))
+    processor = PaliGemmaProcessor.from_pretrained(PALIGEMMA_ID)
+    model = _from_pretrained(PaliGemmaForConditionalGeneration, PALIGEMMA_ID, backend)
+    model.eval()
+    return model, processor
+
+
+def warmup_paligemma(loaded):
+    from PIL import Image
+    model, processor = loaded
+    image = Image.new("RGB", (PALIGEMMA_RESOLUTION, PALIGEMMA_RESOLUTION))
+    inputs = processor(text=["<image>caption en\n"], images=[image], return_tensors="pt").to(DEVICE)
+    with torch.no_grad():
+        model.generate(**inputs, max_new_tokens=2, do_sample=False)
+
 
 # ── Fine-tuned Gemma 2 (sales coaching agent) ────────────────────
 # Loaded with vanilla transformers to avoid Unsloth's class-level
 # monkey-patching of Gemma2Model/DecoderLayer/Attention, which
 # breaks PaliGemma's internal Gemma2 language model.
-print("Loading fine-tuned coaching model...")
-coaching_tokenizer = AutoTokenizer.from_pretrained(
-    "/home/hackathon/finetune/merged_model"
-)
-coaching_model = AutoModelForCausalLM.from_pretrained(
-    "/home/hackathon/finetune/merged_model",
-    dtype=torch.float16 if DEVICE != "cpu" else torch.float32,
-    device_map="auto",
-)
-coaching_model.eval()
-print("✓ Fine-tuned coaching model loaded")
+def load_coaching(backend: str = COACHING_BACKEND, path: str = COACHING_MODEL_PATH):
+    """(model, tokenizer); a llama.cpp model tokenizes itself, so its tokenizer is None."""
+    _check_backend(backend)
+    if backend == "gguf":
+        return _load_gguf(COACHING_GGUF_PATH if path == COACHING_MODEL_PATH else path), None
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    if backend == "onnx":
+        return _load_onnx_causal_lm(path), tokenizer
+    model = _from_pretrained(AutoModelForCausalLM, path, backend)
+    model.eval()
+    return model, tokenizer
+
+
+def _load_onnx_causal_lm(path: str):
+    """Export to ONNX and quantize weights to int8 on first use, then reuse."""
+    from optimum.onnxruntime import ORTModelForCausalLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    name = os.path.basename(os.path.normpath(path))
+    export_dir = os.path.join(ONNX_DIR, name)
+    quant_dir = os.path.join(ONNX_DIR, f"{name}-int8")
+    if not os.path.exists(os.path.join(quant_dir, "model_quantized.onnx")):
+        print(f"[Models] exporting {path} to ONNX (one time)...")
+        ORTModelForCausalLM.from_pretrained(path, export=True).save_pretrained(export_dir)
+        ORTQuantizer.from_pretrained(export_dir).quantize(
+            save_dir=quant_dir,
+            quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=True),
+        )
+    return ORTModelForCausalLM.from_pretrained(quant_dir, file_name="model_quantized.onnx")
+
+
+def _load_gguf(path: str):
+    from llama_cpp import Llama, LlamaRAMCache
+
+    if os.path.isdir(path):
+        files = sorted(glob.glob(os.path.join(path, "*.gguf")))
+        preferred = [f for f in files if "q4_k_m" in f.lower()]
+        if not files:
+            raise FileNotFoundError(f"no .gguf file in {path}")
+        path = (preferred or files)[0]
+    llm = Llama(model_path=path, n_ctx=GGUF_CONTEXT, n_threads=GGUF_THREADS, verbose=False)
+    llm.set_cache(LlamaRAMCache(capacity_bytes=GGUF_PROMPT_CACHE_MB << 20))
+    return llm
+
+
+def warmup_coaching(loaded):
+    model, tokenizer = loaded
+    if tokenizer is None:
+        model.create_completion("Call state", max_tokens=2, temperature=0)
+        return
+    input_ids = tokenizer("Call state", return_tensors="pt")["input_ids"].to(DEVICE)
+    with torch.no_grad():
+        model.generate(input_ids=input_ids, attention_mask=torch.ones_like(input_ids),
+                       max_new_tokens=2, do_sample=False, pad_token_id=tokenizer.pad_token_id)
+
 
-print("All models ready.")
+registry.register("whisper", load_whisper, warmup_whisper)
+# The emotion agent has a fallback, so the server is usable without vision.
+registry.register("vision", load_paligemma, warmup_paligemma, required=False)
+registry.register("coaching", load_coaching, warmup_coaching)
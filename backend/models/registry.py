@@ -0,0 +1,107 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+
+PENDING = "pending"
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+@dataclass
+class _Engine:
+    name: str
+    loader: Callable[[], object]
+    warmup: Callable[[object], None] | None
+    required: bool
+    state: str = PENDING
+    model: object = None
+    error: str | None = None
+    load_seconds: float | None = None
+    warmup_seconds: float | None = None
+    _loaded: threading.Event = field(default_factory=threading.Event)
+
+
+class ModelRegistry:
+    """
+    Named model engines loaded off the import path: either all at once in
+    background threads (``start``) or on first use (``get``). Callers get
+    None until an engine is ready and fall back the way they always have
+    for a missing model.
+    """
+
+    def __init__(self):
+        self._engines: dict[str, _Engine] = {}
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self.warmup_enabled = False
+
+    def register(self, name: str, loader: Callable[[], object],
+                 warmup: Callable[[object], None] | None = None, required: bool = True):
+        self._engines[name] = _Engine(name, loader, warmup, required)
+
+    def start(self, names: list[str] | None = None):
+        """Begin loading ``names`` (default: every engine) in parallel."""
+        for name in names or list(self._engines):
+            self._schedule(self._engines[name])
+
+    def get(self, name: str, wait: float = 0.0):
+        """The loaded model, or None while it is pending, loading or failed."""
+        engine = self._engines[name]
+        self._schedule(engine)
+        if wait and not engine._loaded.is_set():
+            engine._loaded.wait(wait)
+        return engine.model if engine.state == READY else None
+
+    def ready(self) -> bool:
+        return all(e.state == READY for e in self._engines.values() if e.required)
+
+    def status(self) -> dict:
+        return {
+            e.name: {
+                "state": e.state,
+                "required": e.required,
+                "load_seconds": e.load_seconds,
+                "warmup_seconds": e.warmup_seconds,
+                "error": e.error,
+            }
+            for e in self._engines.values()
+        }
+
+    def _schedule(self, engine: _Engine):
+        with self._lock:
+            if engine.state != PENDING:
+                return
+            engine.state = LOADING
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(1, len(self._engines)), thread_name_prefix="pm-load"
+                )
+        self._executor.submit(self._load, engine)
+
+    def _load(self, engine: _Engine):
+        print(f"[Models] loading {engine.name}...")
+        t0 = time.perf_counter()
+        try:
+            model = engine.loader()
+            engine.load_seconds = round(time.perf_counter() - t0, 2)
+            if self.warmup_enabled and engine.warmup is not None:
+                engine.state = WARMING
+                t1 = time.perf_counter()
+                engine.warmup(model)
+                engine.warmup_seconds = round(time.perf_counter() - t1, 2)
+            engine.model = model
+            engine.state = READY
+            print(f"✓ {engine.name} ready ({engine.load_seconds}s)")
+        except Exception as e:
+            engine.error = str(e)[:200]
+            engine.state = FAILED
+            print(f"⚠ {engine.name} not available ({e}).")
+        finally:
+            engine._loaded.set()
+
+
+registry = ModelRegistry()
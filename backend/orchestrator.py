@@ -1,11 +1,17 @@
 import asyncio
+import os
+import re
 from collections import deque
 from datetime import datetime
-from functools import partial
-from agents.emotion_agent import analyze_frame
-from agents.language_agent import analyze_call_state
-from agents.audio_agent import analyze_audio_chunk
-from tts.kokoro import synthesize_wav_base64
+from batching import MicroBatcher
+from cache import LRUCache
+from scheduler import scheduler
+from workers import RemoteAudioAnalyzer, RemoteFrameGate, process_workers
+from agents.emotion_agent import ScoreSmoother, analyze_frames, forget_session, smooth
+from agents.frame_change import FrameChangeDetector
+from agents.language_agent import analyze_call_states, release_prefix, session_prefix
+from agents.audio_agent import StreamingAudioAnalyzer
+from agents.triage import ENABLED as TRIAGE_ENABLED, Triage
 
 
 ENERGY_TO_TONE = {
@@ -16,9 +22,69 @@ ENERGY_TO_TONE = {
 
 TREND_WINDOW = 5
 
+# Transcript held back during a coaching cooldown is merged into the next
+# generation; only the most recent text is kept so the prompt stays short.
+MAX_DEFERRED_CHARS = int(os.environ.get("PITCHMIND_MAX_DEFERRED_CHARS", 600))
+
+# Coaching results by call state, so filler chunks ("okay", "right, yeah")
+# arriving in the same emotional state don't each cost a generation.
+# "session" keeps each session's results to itself; "global" shares them
+# between sessions with the same setup (persona, goal, jargon, ...).
+RESULT_CACHE_SCOPE = os.environ.get("PITCHMIND_COACHING_CACHE_SCOPE", "session")
+SCORE_BUCKET = 10
+
+_result_cache = LRUCache(
+    max_entries=int(os.environ.get("PITCHMIND_COACHING_CACHE_SIZE", 512)),
+    ttl=float(os.environ.get("PITCHMIND_COACHING_CACHE_TTL", 60)),
+)
+
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+
+# Requests from all sessions are pooled into shared model batches; a batch
+# runs on its engine under a shared key since it serves everyone.
+BATCH_KEY = "*"
+
+vision_batcher = MicroBatcher(
+    "vision",
+    lambda items: scheduler.run(
+        "vision", BATCH_KEY, analyze_frames,
+        [frame for _, frame in items], [sid for sid, _ in items],
+    ),
+    max_batch=int(os.environ.get("PITCHMIND_VISION_BATCH", 8)),
+    max_wait_ms=float(os.environ.get("PITCHMIND_VISION_BATCH_WAIT_MS", 15)),
+)
+
+coaching_batcher = MicroBatcher(
+    "coaching",
+    lambda states: scheduler.run("coaching", BATCH_KEY, analyze_call_states, states),
+    max_batch=int(os.environ.get("PITCHMIND_COACHING_BATCH", 4)),
+    max_wait_ms=float(os.environ.get("PITCHMIND_COACHING_BATCH_WAIT_MS", 20)),
+)
+
+
+# Running estimate of one coaching generation, shared by every session
+# since they share the model. A call may start this long before the
+# cooldown ends, because its result lands after it.
+_generation_seconds = 1.0
+
+_cooldown_stats = {"generations": 0, "avoided": 0, "merged_chunks": 0, "discarded": 0}
+
+
+def cooldown_stats() -> dict:
+    return {**_cooldown_stats, "generation_seconds_ema": round(_generation_seconds, 3)}
+
+
+def result_cache_stats() -> dict:
+    return {"scope": RESULT_CACHE_SCOPE, **_result_cache.stats()}
+
+
+def normalize_transcript(text: str) -> str:
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
 
 class PitchMind:
-    def __init__(self, session_context: dict):
+    def __init__(self, session_context: dict, session_id: str = ""):
+        self.session_id = session_id
         self.context = session_context
         self.persona = session_context.get("persona",
                        session_context.get("audience", "CFO"))
@@ -34,7 +100,20 @@ class PitchMind:
         self.last_coaching_time = 0
         self.cooldown_seconds = 8
         self._pending_coaching = []
+        self._deferred_transcript: list[str] = []
         self.earbuds_connected = False
+        self.score_smoother = ScoreSmoother()
+        if process_workers is not None:
+            self.frame_gate = RemoteFrameGate(process_workers, session_id)
+            self.audio_analyzer = RemoteAudioAnalyzer(process_workers, session_id)
+        else:
+            self.frame_gate = FrameChangeDetector()
+            self.audio_analyzer = StreamingAudioAnalyzer()
+        self.triage = Triage(self.jargon_to_avoid, self.tech_level, self.cultural_context)
+        self._setup_key = hash(session_prefix(
+            self.goal, self.persona, self.cultural_context,
+            self.jargon_to_avoid, self.tech_level, self.presenting,
+        ))
 
     # ── Emotion helpers ──────────────────────────────────────────
 
@@ -108,22 +187,51 @@ class PitchMind:
 
         return " | ".join(parts)
 
-    def _latest_audio_tone(self) -> str:
+    def _latest_audio(self) -> dict | None:
         for entry in reversed(self.memory):
             if entry["type"] == "audio":
-                data = entry["data"]
-                energy = data.get("energy", "MED")
-                pace = data.get("pace_wpm", 130)
-                return f"{ENERGY_TO_TONE.get(energy, 'neutral')}, {pace} WPM"
-        return "neutral"
+                return entry["data"]
+        return None
+
+    def _latest_audio_tone(self) -> str:
+        data = self._latest_audio()
+        if data is None:
+            return "neutral"
+        energy = data.get("energy", "MED")
+        pace = data.get("pace_wpm", 130)
+        return f"{ENERGY_TO_TONE.get(energy, 'neutral')}, {pace} WPM"
+
+    def _signals(self) -> dict:
+        """Latest engagement score and trend, audio energy and pace."""
+        entries = self._recent_emotion_entries()
+        trend_dir, _ = self._emotion_trend()
+        audio = self._latest_audio() or {}
+        return {
+            "score": entries[-1]["data"].get("score", 50) if entries else 50,
+            "trend": trend_dir,
+            "energy": audio.get("energy", "MED"),
+            "pace_wpm": audio.get("pace_wpm", 130),
+        }
+
+    def _result_key(self, text: str, signals: dict) -> tuple:
+        scope = self.session_id if RESULT_CACHE_SCOPE == "session" else ""
+        return (
+            scope, self._setup_key, normalize_transcript(text),
+            int(signals["score"]) // SCORE_BUCKET, signals["trend"], signals["energy"],
+        )
 
     # ── Processing pipelines ─────────────────────────────────────
 
-    async def process_frame(self, frame_base64: str) -> dict:
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, analyze_frame, frame_base64
+    async def process_frame(self, frame: str | bytes) -> dict:
+        # An unchanged shot reuses the last reading but still feeds the EMA
+        # and trend logic below, exactly like a freshly analyzed frame.
+        raw = await scheduler.run(
+            "frames", self.session_id, self.frame_gate.check, frame
         )
+        if raw is None:
+            raw = await vision_batcher.submit((self.session_id, frame))
+            self.frame_gate.store(raw)
+        result = smooth(raw, self.score_smoother)
         self.memory.append({
             "type": "emotion",
             "data": result,
@@ -142,26 +250,75 @@ class PitchMind:
 
         return result
 
-    async def process_transcript(self, text: str) -> dict:
+    async def _generate(self, text: str) -> dict:
+        """One coaching-model call on ``text`` in the current call state."""
+        global _generation_seconds
         loop = asyncio.get_event_loop()
         client_emotion = self._latest_emotion()
         audio_tone = self._latest_audio_tone()
 
-        result = await loop.run_in_executor(
-            None,
-            partial(
-                analyze_call_state,
-                transcript=text,
-                client_emotion=client_emotion,
-                audio_tone=audio_tone,
-                call_goal=self.goal,
-                persona=self.persona,
-                cultural_context=self.cultural_context,
-                jargon_to_avoid=self.jargon_to_avoid,
-                tech_level=self.tech_level,
-                presenting=self.presenting,
-            ),
-        )
+        t0 = loop.time()
+        result = await coaching_batcher.submit({
+            "transcript": text,
+            "client_emotion": client_emotion,
+            "audio_tone": audio_tone,
+            "call_goal": self.goal,
+            "persona": self.persona,
+            "cultural_context": self.cultural_context,
+            "jargon_to_avoid": self.jargon_to_avoid,
+            "tech_level": self.tech_level,
+            "presenting": self.presenting,
+        })
+        _generation_seconds = 0.8 * _generation_seconds + 0.2 * (loop.time() - t0)
+        _cooldown_stats["generations"] += 1
+        # Started early and finished early: hold the result until it can
+        # be delivered instead of discarding it.
+        remaining = self._cooldown_remaining(loop.time())
+        if 0 < remaining <= _generation_seconds:
+            await asyncio.sleep(remaining)
+        return result
+
+    async def process_transcript(self, text: str) -> dict:
+        loop = asyncio.get_event_loop()
+        # A result that arrives during the cooldown would be thrown away by
+        # coach(), so don't generate it; keep the text for the next window.
+        if self._cooldown_remaining(loop.time()) > _generation_seconds:
+            self._deferred_transcript.append(text)
+            _cooldown_stats["avoided"] += 1
+            self.memory.append({
+                "type": "transcript",
+                "data": {"action": "deferred", "message": None, "text": text},
+                "time": datetime.now().isoformat(),
+            })
+            return {"action": "stay_silent", "message": None,
+                    "reasoning": "coaching cooldown", "_coaching": None}
+
+        if self._deferred_transcript:
+            _cooldown_stats["merged_chunks"] += len(self._deferred_transcript)
+            text = " ".join([*self._deferred_transcript, text])
+            self._deferred_transcript.clear()
+            if len(text) > MAX_DEFERRED_CHARS:
+                text = text[-MAX_DEFERRED_CHARS:].split(" ", 1)[-1]
+
+        signals = self._signals()
+        # Calm, on-track chunks get "stay_silent" without a generation.
+        if TRIAGE_ENABLED and not self.triage.check(text, **signals):
+            self.memory.append({
+                "type": "transcript",
+                "data": {"action": "stay_silent", "message": None, "text": text},
+                "time": datetime.now().isoformat(),
+            })
+            return {"action": "stay_silent", "message": None,
+                    "reasoning": "triage: no trigger", "_coaching": None}
+
+        key = self._result_key(text, signals)
+        cached = _result_cache.get(key)
+        if cached is not None:
+            result = dict(cached)
+        else:
+            result = await self._generate(text)
+            if not result.get("error"):
+                _result_cache.put(key, dict(result))
 
         self.memory.append({
             "type": "transcript",
@@ -186,9 +343,8 @@ class PitchMind:
         return result
 
     async def process_audio(self, pcm_array, sample_rate: int = 16000) -> dict:
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None, analyze_audio_chunk, pcm_array, sample_rate
+        result = await scheduler.run(
+            "audio", self.session_id, self.audio_analyzer.process, pcm_array, sample_rate
         )
         self.memory.append({
             "type": "audio",
@@ -199,17 +355,19 @@ class PitchMind:
 
     # ── Coaching ─────────────────────────────────────────────────
 
+    def _cooldown_remaining(self, now: float) -> float:
+        return max(0.0, self.cooldown_seconds - (now - self.last_coaching_time))
+
     async def coach(self, message: str, category: str, jargon_flags=None):
         now = asyncio.get_event_loop().time()
-        if now - self.last_coaching_time < self.cooldown_seconds:
+        if self._cooldown_remaining(now) > 0:
+            _cooldown_stats["discarded"] += 1
             return None
 
         self.last_coaching_time = now
 
-        audio_b64 = None
-        if self.earbuds_connected:
-            audio_b64 = await synthesize_wav_base64(message)
-
+        # Speech is streamed to the earpiece after the card is sent, so the
+        # text never waits on synthesis.
         payload = {
             "type": "coaching",
             "category": category,
@@ -217,7 +375,7 @@ class PitchMind:
             "jargon_flags": jargon_flags or [],
             "via_earbuds": self.earbuds_connected,
             "timestamp": datetime.now().strftime("%H:%M:%S"),
-            "audio_b64": audio_b64,
+            "speak": self.earbuds_connected,
         }
         self._pending_coaching.append(payload)
         return payload
@@ -239,6 +397,16 @@ class PitchMind:
             "color": color,
         })
 
+    def close(self):
+        """Release per-session resources held outside this object."""
+        forget_session(self.session_id)
+        if process_workers is not None:
+            process_workers.drop_session(self.session_id)
+        release_prefix(session_prefix(
+            self.goal, self.persona, self.cultural_context,
+            self.jargon_to_avoid, self.tech_level, self.presenting,
+        ))
+
     def get_debrief(self) -> dict:
         return {
             "total_events": len(self.memory),
@@ -0,0 +1,98 @@
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable
+
+from scheduler import Overloaded
+
+# Mailbox policies for what happens to items that arrive while the
+# pipeline's handler is still busy with the previous one.
+LATEST = "latest"   # keep only the newest pending item
+MERGE = "merge"     # fold pending items together with a merge function
+
+
+class Pipeline:
+    """
+    One stage of a session's processing, run by its own task so a slow
+    stage never blocks the WebSocket receive loop or the other stages.
+    """
+
+    def __init__(self, name: str, handler: Callable[..., Awaitable[None]],
+                 mode: str = LATEST, merge: Callable | None = None):
+        self.name = name
+        self.mode = mode
+        self._handler = handler
+        self._merge = merge
+        self._pending: deque = deque()
+        self._ready = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.counters = {"received": 0, "processed": 0, "superseded": 0, "errors": 0}
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def put(self, item):
+        self.counters["received"] += 1
+        if self._pending and self.mode == LATEST:
+            self._pending.clear()
+            self.counters["superseded"] += 1
+        elif self._pending and self.mode == MERGE:
+            item = self._merge(self._pending.pop(), item)
+            self.counters["superseded"] += 1
+        self._pending.append(item)
+        self._ready.set()
+
+    async def _run(self):
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            if not self._pending:
+                continue
+            item = self._pending[-1]
+            self._pending.clear()
+            try:
+                await self._handler(item)
+                self.counters["processed"] += 1
+            except Overloaded as e:
+                print(f"[{self.name}] skipped: {e}")
+            except Exception as e:
+                self.counters["errors"] += 1
+                print(f"[{self.name}] pipeline error: {e}")
+
+
+class SerializedSender:
+    """Serializes sends from concurrent pipelines onto one WebSocket."""
+
+    def __init__(self, ws):
+        self._ws = ws
+        self._lock = asyncio.Lock()
+
+    async def send_json(self, data: dict):
+        async with self._lock:
+            await self._ws.send_json(data)
+
+
+class SessionPipelines:
+    def __init__(self, pipelines: list[Pipeline]):
+        self._pipelines = {p.name: p for p in pipelines}
+
+    def __getitem__(self, name: str) -> Pipeline:
+        return self._pipelines[name]
+
+    def start(self):
+        for p in self._pipelines.values():
+            p.start()
+
+    async def stop(self):
+        for p in self._pipelines.values():
+            await p.stop()
+
+    def stats(self) -> dict:
+        return {name: dict(p.counters) for name, p in self._pipelines.items()}
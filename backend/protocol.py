@@ -0,0 +1,41 @@
+import struct
+
+import numpy as np
+
+# Binary WebSocket frames: a fixed little-endian header followed by the raw
+# payload, so audio and video skip base64 and JSON entirely.
+#
+#   u8   kind          KIND_AUDIO or KIND_FRAME
+#   u8   version       BINARY_VERSION
+#   u16  reserved      0
+#   u32  sample_rate   audio only (0 for frames)
+#
+# Audio payloads are float32 PCM; frame payloads are JPEG bytes. Control
+# messages (init, earbud_status, transcript) stay JSON text frames.
+HEADER = struct.Struct("<BBHI")
+BINARY_VERSION = 1
+
+KIND_AUDIO = 1
+KIND_FRAME = 2
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def parse_binary(data: bytes) -> tuple[int, int, memoryview]:
+    """Split a binary message into (kind, sample_rate, payload view)."""
+    if len(data) < HEADER.size:
+        raise ProtocolError(f"binary message too short ({len(data)} bytes)")
+    kind, version, _, sample_rate = HEADER.unpack_from(data)
+    if version != BINARY_VERSION:
+        raise ProtocolError(f"unsupported binary version {version}")
+    if kind not in (KIND_AUDIO, KIND_FRAME):
+        raise ProtocolError(f"unknown binary kind {kind}")
+    return kind, sample_rate, memoryview(data)[HEADER.size:]
+
+
+def pcm_from_payload(payload) -> np.ndarray:
+    """Zero-copy float32 view over an audio payload (trailing partial sample dropped)."""
+    usable = len(payload) - len(payload) % 4
+    return np.frombuffer(payload[:usable], dtype=np.float32)
@@ -0,0 +1,227 @@
+import asyncio
+import heapq
+import itertools
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class EngineConfig:
+    workers: int
+    max_queue: int
+    # Lower runs first when engines compete for a CPU slot.
+    priority: int
+    # When the queue is full: drop the oldest queued job (stale frames and
+    # audio stats are worthless) instead of rejecting the new one.
+    shed_oldest: bool
+
+
+ENGINES = {
+    "coaching": EngineConfig(workers=2, max_queue=32, priority=0, shed_oldest=False),
+    "whisper":  EngineConfig(workers=2, max_queue=32, priority=1, shed_oldest=False),
+    "vision":   EngineConfig(workers=1, max_queue=16, priority=2, shed_oldest=True),
+    # Cheap image work in front of the vision model (change detection).
+    "frames":   EngineConfig(workers=2, max_queue=64, priority=2, shed_oldest=True),
+    "audio":    EngineConfig(workers=2, max_queue=64, priority=3, shed_oldest=True),
+}
+
+MAX_CONCURRENCY = int(os.environ.get(
+    "PITCHMIND_MAX_CONCURRENCY", max(2, (os.cpu_count() or 4) // 2)
+))
+
+
+class Overloaded(RuntimeError):
+    """Raised to a caller whose job was rejected or shed by a full queue."""
+
+
+@dataclass
+class _Job:
+    session_id: str
+    fn: object
+    args: tuple
+    future: asyncio.Future
+
+
+class _PriorityGate:
+    """Global CPU slots handed out lowest-priority-value first, FIFO within a priority."""
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self._free = slots
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for *_, f in self._waiters if not f.done())
+
+    async def acquire(self, priority: int):
+        if self._free > 0 and not self.waiting:
+            self._free -= 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._free += 1
+
+
+class EnginePool:
+    """
+    Bounded worker pool for one inference engine. Queued jobs are kept per
+    session and served round-robin, so one chatty session can't starve the
+    others.
+    """
+
+    def __init__(self, name: str, config: EngineConfig, gate: _PriorityGate):
+        self.name = name
+        self.config = config
+        self._gate = gate
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.workers, thread_name_prefix=f"pm-{name}"
+        )
+        self._queues: OrderedDict[str, deque[_Job]] = OrderedDict()
+        self._depth = 0
+        self._ready: asyncio.Event | None = None
+        self._workers: list[asyncio.Task] = []
+        self.running = 0
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0,
+                         "rejected": 0, "shed": 0}
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def submit(self, session_id: str, fn, *args) -> asyncio.Future:
+        self._ensure_started()
+        if self._depth >= self.config.max_queue:
+            if not self.config.shed_oldest:
+                self.counters["rejected"] += 1
+                raise Overloaded(f"{self.name} queue full ({self._depth})")
+            self._shed_one()
+
+        fut = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(session_id, deque()).append(
+            _Job(session_id, fn, args, fut)
+        )
+        self._depth += 1
+        self.counters["submitted"] += 1
+        self._ready.set()
+        return fut
+
+    def drop_session(self, session_id: str):
+        for job in self._queues.pop(session_id, ()):
+            self._depth -= 1
+            job.future.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._depth,
+            "running": self.running,
+            "workers": self.config.workers,
+            "max_queue": self.config.max_queue,
+            "sessions_queued": len(self._queues),
+            **self.counters,
+        }
+
+    def _shed_one(self):
+        # The session with the longest backlog pays for the overflow.
+        session_id = max(self._queues, key=lambda s: len(self._queues[s]))
+        queue = self._queues[session_id]
+        job = queue.popleft()
+        if not queue:
+            del self._queues[session_id]
+        self._depth -= 1
+        self.counters["shed"] += 1
+        if not job.future.done():
+            job.future.set_exception(Overloaded(f"{self.name} job shed"))
+
+    def _next_job(self) -> _Job | None:
+        if not self._queues:
+            return None
+        session_id, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(session_id)
+        else:
+            del self._queues[session_id]
+        self._depth -= 1
+        return job
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        self._ready = asyncio.Event()
+        self._workers = [
+            asyncio.get_running_loop().create_task(self._worker())
+            for _ in range(self.config.workers)
+        ]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            if job.future.done():
+                continue
+
+            await self._gate.acquire(self.config.priority)
+            self.running += 1
+            try:
+                if job.future.done():
+                    continue
+                result = await loop.run_in_executor(self._executor, job.fn, *job.args)
+                self.counters["completed"] += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            except Exception as e:
+                self.counters["failed"] += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self.running -= 1
+                self._gate.release()
+
+
+class InferenceScheduler:
+    def __init__(self, engines: dict[str, EngineConfig] = ENGINES,
+                 max_concurrency: int = MAX_CONCURRENCY):
+        self._gate = _PriorityGate(max_concurrency)
+        self.pools = {
+            name: EnginePool(name, config, self._gate)
+            for name, config in engines.items()
+        }
+
+    async def run(self, engine: str, session_id: str, fn, *args):
+        """Queue ``fn(*args)`` on ``engine`` for ``session_id`` and await its result."""
+        return await self.pools[engine].submit(session_id, fn, *args)
+
+    def drop_session(self, session_id: str):
+        for pool in self.pools.values():
+            pool.drop_session(session_id)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self._gate.slots,
+            "waiting_for_slot": self._gate.waiting,
+            "engines": {name: pool.stats() for name, pool in self.pools.items()},
+        }
+
+
+scheduler = InferenceScheduler()
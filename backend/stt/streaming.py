@@ -0,0 +1,218 @@
+import re
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+WHISPER_SAMPLE_RATE = 16000
+
+# Force-commit the hypothesis once this much uncommitted audio has piled up,
+# so a speaker who never pauses can't grow the re-decoded tail without bound.
+MAX_BUFFER_SECONDS = 15.0
+# Committed words are held back until a sentence ends or this many have
+# accumulated, so the hallucination filter and coaching model see phrases
+# rather than one or two words at a time.
+MIN_EMIT_WORDS = 8
+PROMPT_CHARS = 200
+
+_SENTENCE_END = re.compile(r"[.?!]$")
+
+
+def resample(pcm: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Linear-resample float32 PCM to Whisper's 16 kHz (no-op at 16 kHz)."""
+    if sample_rate == WHISPER_SAMPLE_RATE or len(pcm) == 0:
+        return pcm
+    n_out = int(round(len(pcm) * WHISPER_SAMPLE_RATE / sample_rate))
+    x_old = np.arange(len(pcm), dtype=np.float32)
+    x_new = np.linspace(0, len(pcm) - 1, n_out, dtype=np.float32)
+    return np.interp(x_new, x_old, pcm).astype(np.float32)
+
+
+class RollingAudioBuffer:
+    """
+    Preallocated float32 buffer holding the not-yet-committed audio tail.
+    Appends write into spare capacity; discarding from the front just moves
+    the start offset, and live samples are compacted back to index 0 only
+    when the tail runs out of room.
+    """
+
+    def __init__(self, max_seconds: float = MAX_BUFFER_SECONDS * 2,
+                 sample_rate: int = WHISPER_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self._data = np.zeros(int(max_seconds * sample_rate), dtype=np.float32)
+        self._start = 0
+        self._end = 0
+        # Absolute stream time (seconds) of the first live sample.
+        self.offset = 0.0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def duration(self) -> float:
+        return len(self) / self.sample_rate
+
+    def append(self, pcm: np.ndarray):
+        n = len(pcm)
+        capacity = len(self._data)
+        if n >= capacity:
+            # A single chunk larger than the buffer: keep its newest audio.
+            dropped = len(self) + n - capacity
+            self._data[:] = pcm[-capacity:]
+            self._start, self._end = 0, capacity
+            self.offset += dropped / self.sample_rate
+            return
+        if self._end + n > capacity:
+            live = len(self)
+            if live + n > capacity:
+                self.discard(live + n - capacity)
+                live = len(self)
+            self._data[:live] = self._data[self._start:self._end]
+            self._start, self._end = 0, live
+        self._data[self._end:self._end + n] = pcm
+        self._end += n
+
+    def discard(self, n_samples: int):
+        n_samples = max(0, min(n_samples, len(self)))
+        self._start += n_samples
+        self.offset += n_samples / self.sample_rate
+        if self._start == self._end:
+            self._start = self._end = 0
+
+    def discard_until(self, t: float):
+        """Drop audio before absolute stream time ``t`` (seconds)."""
+        self.discard(int((t - self.offset) * self.sample_rate))
+
+    def view(self) -> np.ndarray:
+        return self._data[self._start:self._end]
+
+    def clear(self):
+        self.discard(len(self))
+
+
+@dataclass
+class Word:
+    start: float
+    end: float
+    text: str
+
+    @property
+    def key(self) -> str:
+        return self.text.strip().lower().strip(".,!?;:\"'")
+
+
+@dataclass
+class TranscriptUpdate:
+    committed: str = ""
+    partial: str = ""
+
+
+@dataclass
+class StreamingTranscriber:
+    """
+    Per-session streaming Whisper with LocalAgreement-2 commit policy.
+
+    Each ``process`` call re-decodes only the uncommitted audio tail. Words
+    that two consecutive hypotheses agree on are committed, their audio is
+    dropped from the buffer, and the committed text is fed back to Whisper
+    as the prompt for the next pass.
+    """
+
+    # Returns the Whisper model, or None while it is still loading.
+    get_model: Callable[[], object | None]
+    language: str = "en"
+    buffer: RollingAudioBuffer = field(default_factory=RollingAudioBuffer)
+    _hypothesis: list[Word] = field(default_factory=list)
+    _unemitted: list[Word] = field(default_factory=list)
+    _committed_text: str = ""
+    _last_committed_end: float = 0.0
+    # Audio inserted since the last decode.
+    _dirty: bool = False
+
+    def insert_audio(self, pcm: np.ndarray, sample_rate: int):
+        self.buffer.append(resample(pcm, sample_rate))
+        self._dirty = True
+
+    def process(self) -> TranscriptUpdate:
+        """Decode the buffered tail and commit the agreed prefix (blocking)."""
+        if len(self.buffer) == 0:
+            return TranscriptUpdate()
+
+        words = self._decode()
+        # Whisper may re-emit the tail of already-committed speech at the
+        # start of the buffer; ignore anything that ends before the cursor.
+        words = [w for w in words if w.end > self._last_committed_end + 0.05]
+
+        agreed = 0
+        for prev, new in zip(self._hypothesis, words):
+            if prev.key != new.key:
+                break
+            agreed += 1
+
+        self._commit(words[:agreed])
+        self._hypothesis = words[agreed:]
+
+        if self.buffer.duration > MAX_BUFFER_SECONDS:
+            self._commit(self._hypothesis)
+            self._hypothesis = []
+            self.buffer.clear()
+
+        return self._emit(force=False)
+
+    def flush(self) -> TranscriptUpdate:
+        """End of utterance: commit whatever is left and reset the buffer."""
+        if len(self.buffer) and self._dirty:
+            self._hypothesis = [
+                w for w in self._decode()
+                if w.end > self._last_committed_end + 0.05
+            ]
+        self._commit(self._hypothesis)
+        self._hypothesis = []
+        self.buffer.clear()
+        return self._emit(force=True)
+
+    def _decode(self) -> list[Word]:
+        model = self.get_model()
+        if model is None:
+            return []
+        self._dirty = False
+        prompt = self._committed_text[-PROMPT_CHARS:] or None
+        offset = self.buffer.offset
+        words = []
+        try:
+            segments, _ = model.transcribe(
+                self.buffer.view(),
+                language=self.language,
+                word_timestamps=True,
+                condition_on_previous_text=False,
+                initial_prompt=prompt,
+            )
+            for seg in segments:
+                for w in seg.words or []:
+                    words.append(Word(w.start + offset, w.end + offset, w.word))
+        except Exception as e:
+            print(f"Whisper streaming error: {e}")
+        return words
+
+    def _commit(self, words: list[Word]):
+        if not words:
+            return
+        self._unemitted.extend(words)
+        self._last_committed_end = words[-1].end
+        self._committed_text = (
+            self._committed_text + "".join(w.text for w in words)
+        )[-PROMPT_CHARS * 2:]
+        self.buffer.discard_until(self._last_committed_end)
+
+    def _emit(self, force: bool) -> TranscriptUpdate:
+        committed = ""
+        if self._unemitted:
+            last = self._unemitted[-1].text.strip()
+            if (force or len(self._unemitted) >= MIN_EMIT_WORDS
+                    or _SENTENCE_END.search(last)):
+                committed = "".join(w.text for w in self._unemitted).strip()
+                self._unemitted = []
+        partial = "".join(
+            w.text for w in self._unemitted + self._hypothesis
+        ).strip()
+        return TranscriptUpdate(committed=committed, partial=partial)
@@ -0,0 +1,155 @@
+"""
+Voice activity detection in front of Whisper. Replaces the fixed
+``rms >= 0.01`` gate, which lets HVAC hum, fans and keyboards through on
+any decent microphone and then leaves the hallucination filter to throw
+away the "thank you"s Whisper invents from them.
+
+Each 20 ms frame counts as speech when it is loud enough relative to the
+session's own noise floor *and* looks like a voice: most of its energy
+in the 250-4000 Hz speech band, and a peaky (harmonic) rather than flat
+spectrum there. The noise floor is a low percentile of recent frame
+energies, so it follows a room that gets louder or quieter, and it can
+be measured mid-sentence because speech always has gaps. A short onset
+requirement drops clicks; hangover and pre-roll keep word edges and
+unvoiced consonants attached to the speech around them.
+"""
+import os
+from collections import deque
+
+import numpy as np
+
+from stt.streaming import WHISPER_SAMPLE_RATE, resample
+
+ENABLED = os.environ.get("PITCHMIND_VAD", "1") != "0"
+
+FRAME = 320          # 20 ms at 16 kHz
+N_FFT = 512
+SPEECH_BAND_HZ = (250, 4000)
+# Frame energy must clear the noise floor by this much (dB) ...
+MARGIN_DB = float(os.environ.get("PITCHMIND_VAD_MARGIN_DB", 6.0))
+# ... and be above this absolute level (dBFS; about 0.002 RMS).
+MIN_ENERGY_DB = -54.0
+# Share of the frame's energy inside SPEECH_BAND_HZ.
+MIN_BAND_RATIO = 0.5
+# Spectral flatness inside the band: ~0.56 for white noise, far lower
+# for voiced speech.
+MAX_FLATNESS = 0.35
+# Noise floor: this percentile of the last NOISE_WINDOW frame energies.
+NOISE_PERCENTILE = 10
+NOISE_WINDOW = 100   # 2 s
+# Until the window fills, the missing frames count as this (dBFS): a quiet
+# room. Padding with measured frames would start the floor at speech level
+# when the presenter is already talking, and gate out their first words.
+NOISE_PRIOR_DB = -60.0
+ONSET_FRAMES = 3     # 60 ms of voice-like frames starts speech
+HANGOVER_FRAMES = 15  # 300 ms of trailing audio stays attached
+PREROLL_FRAMES = 5   # 100 ms kept before an onset
+# The gate this replaces, still computed so /metrics can compare.
+LEGACY_RMS = 0.01
+
+_stats = {
+    "chunks": 0, "speech_chunks": 0, "legacy_speech_chunks": 0,
+    "whisper_calls_avoided": 0, "quiet_speech_passed": 0,
+    "seconds_in": 0.0, "seconds_passed": 0.0,
+}
+
+
+class VoiceActivityDetector:
+    """Per-session VAD: keeps the noise floor and onset/hangover state across chunks."""
+
+    def __init__(self):
+        self._energies: deque[float] = deque(maxlen=NOISE_WINDOW)
+        self._run = 0        # consecutive voice-like frames
+        self._hangover = 0   # frames left before speech is considered over
+        self._band = None
+        self.noise_floor_db: float | None = None
+        # Whether speech was still going at the end of the last chunk.
+        self.speaking = False
+
+    def speech(self, pcm: np.ndarray, sample_rate: int) -> np.ndarray:
+        """
+        The voiced spans of a chunk, resampled to 16 kHz and joined; empty
+        when the chunk holds no speech.
+        """
+        audio = resample(np.asarray(pcm, dtype=np.float32), sample_rate)
+        active = self.mask(audio)
+        voiced = audio if active.all() else audio[active]
+
+        rms = float(np.sqrt(np.mean(audio * audio))) if len(audio) else 0.0
+        self._count(len(audio), len(voiced), rms)
+        return voiced
+
+    def mask(self, audio: np.ndarray) -> np.ndarray:
+        """Per-sample speech decision for the next 16 kHz chunk of the stream."""
+        n_frames = len(audio) // FRAME
+        if n_frames == 0:
+            return np.full(len(audio), self.speaking)
+        frames = audio[:n_frames * FRAME].reshape(n_frames, FRAME)
+
+        energy_db, band_ratio, flatness = self._features(frames)
+        floor_db = self._noise_floor(energy_db)
+        candidate = (
+            (energy_db > np.maximum(floor_db + MARGIN_DB, MIN_ENERGY_DB))
+            & (band_ratio >= MIN_BAND_RATIO)
+            & (flatness <= MAX_FLATNESS)
+        )
+        active = np.repeat(self._smooth(candidate), FRAME)
+        self.speaking = bool(active[-1])
+        # The last partial frame follows the frame before it.
+        return np.concatenate([active, np.full(len(audio) - len(active), self.speaking)])
+
+    def _features(self, frames: np.ndarray):
+        power = np.abs(np.fft.rfft(frames, N_FFT, axis=1)) ** 2 + 1e-12
+        if self._band is None:
+            freqs = np.fft.rfftfreq(N_FFT, 1 / WHISPER_SAMPLE_RATE)
+            self._band = (freqs >= SPEECH_BAND_HZ[0]) & (freqs <= SPEECH_BAND_HZ[1])
+        band = power[:, self._band]
+        energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-12)
+        band_ratio = band.sum(axis=1) / power.sum(axis=1)
+        flatness = np.exp(np.mean(np.log(band), axis=1)) / np.mean(band, axis=1)
+        return energy_db, band_ratio, flatness
+
+    def _noise_floor(self, energy_db: np.ndarray) -> np.ndarray:
+        """Per-frame floor: a low percentile over the trailing window."""
+        history = np.fromiter(self._energies, dtype=np.float64, count=len(self._energies))
+        series = np.concatenate([history, energy_db])
+        self._energies.extend(energy_db.tolist())
+        pad = max(0, NOISE_WINDOW - 1 - len(history))
+        series = np.concatenate([np.full(pad, NOISE_PRIOR_DB), series])
+        windows = np.lib.stride_tricks.sliding_window_view(series, NOISE_WINDOW)
+        floor = np.percentile(windows[-len(energy_db):], NOISE_PERCENTILE, axis=1)
+        self.noise_floor_db = round(float(floor[-1]), 1)
+        return floor
+
+    def _smooth(self, candidate: np.ndarray) -> np.ndarray:
+        """Onset, hangover and pre-roll over the per-frame decisions."""
+        active = np.zeros(len(candidate), dtype=bool)
+        for i, voice_like in enumerate(candidate):
+            self._run = self._run + 1 if voice_like else 0
+            if self._run >= ONSET_FRAMES:
+                if self._hangover == 0:
+                    active[max(0, i - self._run - PREROLL_FRAMES + 1):i] = True
+                self._hangover = HANGOVER_FRAMES
+            if self._hangover > 0:
+                active[i] = True
+                self._hangover -= 1
+        return active
+
+    def _count(self, n_in: int, n_voiced: int, rms: float):
+        legacy = rms >= LEGACY_RMS
+        _stats["chunks"] += 1
+        _stats["speech_chunks"] += n_voiced > 0
+        _stats["legacy_speech_chunks"] += legacy
+        _stats["whisper_calls_avoided"] += legacy and not n_voiced
+        _stats["quiet_speech_passed"] += n_voiced > 0 and not legacy
+        _stats["seconds_in"] += n_in / WHISPER_SAMPLE_RATE
+        _stats["seconds_passed"] += n_voiced / WHISPER_SAMPLE_RATE
+
+
+def vad_stats() -> dict:
+    seconds_in = _stats["seconds_in"]
+    return {
+        "enabled": ENABLED,
+        **{k: round(v, 1) if isinstance(v, float) else v for k, v in _stats.items()},
+        "audio_passed": round(_stats["seconds_passed"] / seconds_in, 3) if seconds_in else 0.0,
+    }
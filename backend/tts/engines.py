@@ -0,0 +1,110 @@
+"""
+Speech engines behind ``tts.kokoro``. Each engine streams one utterance
+as encoded chunks as soon as they exist, so the earpiece can start
+playing before the whole whisper is synthesized.
+"""
+import asyncio
+import os
+from typing import AsyncIterator
+
+import edge_tts
+import numpy as np
+
+from models.registry import registry
+
+MP3 = "mp3"
+PCM16 = "pcm_s16le"
+WAV = "wav"
+
+EDGE_VOICE = "en-US-AriaNeural"
+EDGE_RATE = "+10%"
+
+KOKORO_MODEL = os.environ.get("PITCHMIND_KOKORO_MODEL", "models/kokoro-v1.0.onnx")
+KOKORO_VOICES = os.environ.get("PITCHMIND_KOKORO_VOICES", "models/voices-v1.0.bin")
+KOKORO_VOICE = os.environ.get("PITCHMIND_KOKORO_VOICE", "af_heart")
+KOKORO_SPEED = float(os.environ.get("PITCHMIND_KOKORO_SPEED", 1.1))
+
+# "kokoro": local model first, edge-tts if it is unavailable.
+# "edge": networked edge-tts only. Default: kokoro when its files exist.
+ENGINE = os.environ.get(
+    "PITCHMIND_TTS_ENGINE", "kokoro" if os.path.exists(KOKORO_MODEL) else "edge"
+)
+
+
+class EngineUnavailable(RuntimeError):
+    """The engine can't synthesize right now (model still loading or missing)."""
+
+
+class TTSEngine:
+    name = ""
+    format = MP3
+    sample_rate = 24000
+    # Everything that changes the audio for the same text; part of the cache key.
+    voice = ""
+
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+        yield b""
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Whether the engine can synthesize, waiting up to ``timeout`` s for it to load."""
+        return True
+
+
+class EdgeTTSEngine(TTSEngine):
+    """Microsoft's neural voices over the network; streams MP3 frames."""
+
+    name = "edge"
+    format = MP3
+    sample_rate = 24000
+
+    def __init__(self, voice: str = EDGE_VOICE, rate: str = EDGE_RATE):
+        self.voice = f"{voice}|{rate}"
+        self._voice, self._rate = voice, rate
+
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        async for chunk in edge_tts.Communicate(text, self._voice, rate=self._rate).stream():
+            if chunk["type"] == "audio":
+                yield chunk["data"]
+
+
+class KokoroEngine(TTSEngine):
+    """Kokoro-82M on ONNX Runtime, in-process; streams 16-bit PCM per clause."""
+
+    name = "kokoro"
+    format = PCM16
+    sample_rate = 24000
+
+    def __init__(self, voice: str = KOKORO_VOICE, speed: float = KOKORO_SPEED):
+        self.voice = f"{voice}|{speed}"
+        self._voice, self._speed = voice, speed
+
+    async def stream(self, text: str) -> AsyncIterator[bytes]:
+        model = registry.get("kokoro")
+        if model is None:
+            raise EngineUnavailable("kokoro model not loaded")
+        async for samples, _ in model.create_stream(text, self._voice, speed=self._speed):
+            yield (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+    async def wait_ready(self, timeout: float) -> bool:
+        # Starts the load if nothing has yet (lazy loading mode).
+        return await asyncio.to_thread(registry.get, "kokoro", timeout) is not None
+
+
+def load_kokoro():
+    from kokoro_onnx import Kokoro
+    return Kokoro(KOKORO_MODEL, KOKORO_VOICES)
+
+
+def warmup_kokoro(model):
+    model.create("Okay.", KOKORO_VOICE, speed=KOKORO_SPEED)
+
+
+def build_engines(engine: str = ENGINE) -> list[TTSEngine]:
+    """Engines in the order they are tried."""
+    if engine == "kokoro":
+        registry.register("kokoro", load_kokoro, warmup_kokoro, required=False)
+        return [KokoroEngine(), EdgeTTSEngine()]
+    if engine == "edge":
+        return [EdgeTTSEngine()]
+    raise ValueError(f"unknown TTS engine {engine!r}")
@@ -1,13 +1,63 @@
+import asyncio
 import base64
+import functools
+import hashlib
 import io
-import math
-import struct
-import tempfile
 import os
+import re
+import struct
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+import numpy as np
+
+from cache import LRUCache
+from tts.engines import PCM16, WAV, EngineUnavailable, TTSEngine, build_engines
+
+_engines: list[TTSEngine] = build_engines()
+
+
+@dataclass(frozen=True)
+class AudioChunk:
+    format: str
+    sample_rate: int
+    data: bytes
+    final: bool = False
 
-import edge_tts
 
-VOICE = "en-US-AriaNeural"
+# Synthesized coaching audio (the complete utterance), keyed by engine,
+# voice and normalized text. Whispers repeat a lot, so most messages
+# after the first few minutes are cache hits.
+_audio_cache = LRUCache(
+    max_entries=int(os.environ.get("PITCHMIND_TTS_CACHE_ENTRIES", 1024)),
+    max_bytes=int(os.environ.get("PITCHMIND_TTS_CACHE_MB", 32)) << 20,
+    sizeof=lambda chunk: len(chunk.data),
+)
+# Optional second tier that survives restarts; unset to keep it in memory only.
+CACHE_DIR = os.environ.get("PITCHMIND_TTS_CACHE_DIR")
+# Newline-separated phrases synthesized at startup; unset uses DEFAULT_PHRASES.
+PHRASES_FILE = os.environ.get("PITCHMIND_TTS_PHRASES")
+# How long startup presynthesis waits for the primary engine's model.
+PRESYNTH_WAIT = float(os.environ.get("PITCHMIND_TTS_PRESYNTH_WAIT", 300))
+
+DEFAULT_PHRASES = (
+    "Drop the jargon.",
+    "Ask a question.",
+    "Slow down.",
+    "Pause and let them talk.",
+    "Check in with them.",
+    "Bring it back to cost savings.",
+    "Summarize the value in one sentence.",
+    "Ask what's on their mind.",
+)
+
+_in_flight: dict[str, asyncio.Future] = {}
+_stats = {"utterances": 0, "cache_hits": 0, "fallbacks": 0, "beeps": 0,
+          "first_audio_ms_total": 0.0}
+_disk_hits = 0
+
+_WHITESPACE = re.compile(r"\s+")
 
 
 def speak(text: str):
@@ -15,45 +65,179 @@ def speak(text: str):
     print(f"[COACH whisper] {text}")
 
 
+def cache_key(text: str, engine: TTSEngine) -> str:
+    normalized = _WHITESPACE.sub(" ", text).strip().lower()
+    return hashlib.sha256(f"{engine.name}|{engine.voice}|{normalized}".encode()).hexdigest()
+
+
+async def stream_speech(text: str) -> AsyncIterator[AudioChunk]:
+    """
+    Speak ``text`` as a stream of audio chunks, ending with a ``final``
+    chunk. Cached phrases come back as one chunk; otherwise the first
+    engine that works streams as it synthesizes, and a beep is the last
+    resort.
+    """
+    t0 = time.perf_counter()
+    first = True
+    async for chunk in _stream_speech(text):
+        if first and chunk.data:
+            _stats["utterances"] += 1
+            _stats["first_audio_ms_total"] += (time.perf_counter() - t0) * 1000
+            first = False
+        yield chunk
+
+
+async def _stream_speech(text: str) -> AsyncIterator[AudioChunk]:
+    for engine in _engines:
+        key = cache_key(text, engine)
+        cached = _audio_cache.get(key) or _read_disk(key, engine)
+        if cached:
+            _stats["cache_hits"] += 1
+            yield cached
+            return
+
+    for i, engine in enumerate(_engines):
+        key = cache_key(text, engine)
+        # Concurrent requests for the same phrase share one synthesis.
+        pending = _in_flight.get(key)
+        if pending is not None:
+            whole = await asyncio.shield(pending)
+            if whole is not None:
+                yield whole
+                return
+            continue
+
+        future = asyncio.get_running_loop().create_future()
+        _in_flight[key] = future
+        parts, complete = [], False
+        try:
+            async for data in engine.stream(text):
+                parts.append(data)
+                yield AudioChunk(engine.format, engine.sample_rate, data)
+            complete = True
+        except EngineUnavailable:
+            pass
+        except Exception as e:
+            print(f"[TTS] {engine.name} error: {e}")
+        finally:
+            whole = None
+            audio = b"".join(parts)
+            if complete and len(audio) > 100:
+                whole = AudioChunk(engine.format, engine.sample_rate, audio, final=True)
+                _audio_cache.put(key, whole)
+                _write_disk(key, engine, audio)
+            del _in_flight[key]
+            future.set_result(whole)
+
+        if parts:
+            print(f"[TTS] {engine.name} synthesized {len(audio)} bytes for: {text[:60]}")
+            yield AudioChunk(engine.format, engine.sample_rate, b"", final=True)
+            return
+        if i + 1 < len(_engines):
+            _stats["fallbacks"] += 1
+
+    print("[TTS] no engine available — falling back to beep")
+    _stats["beeps"] += 1
+    yield AudioChunk(WAV, 22050, _beep_wav(), final=True)
+
+
 async def synthesize_wav_base64(text: str) -> str | None:
     """
-    Generate MP3 audio from text using edge-tts (neural voice) and return
-    as base64. Falls back to a short notification beep on failure.
+    Whole-utterance variant of ``stream_speech`` for callers that want one
+    playable file: MP3 or WAV bytes, base64-encoded.
     """
-    tmp_path = None
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
-            tmp_path = f.name
+    parts, fmt, sample_rate = [], WAV, 22050
+    async for chunk in stream_speech(text):
+        parts.append(chunk.data)
+        fmt, sample_rate = chunk.format, chunk.sample_rate
+    audio = b"".join(parts)
+    if fmt == PCM16:
+        audio = _wav_bytes(audio, sample_rate)
+    return base64.b64encode(audio).decode("ascii")
 
-        communicate = edge_tts.Communicate(text, VOICE, rate="+10%")
-        await communicate.save(tmp_path)
 
-        with open(tmp_path, "rb") as f:
-            audio_data = f.read()
+async def presynthesize(phrases: list[str] | None = None):
+    """
+    Fill the cache with common whispers in the primary engine's voice so
+    they play without synthesis. Waits for that engine's model to load;
+    a fallback voice is never cached in its place.
+    """
+    if phrases is None:
+        phrases = list(DEFAULT_PHRASES)
+        if PHRASES_FILE:
+            with open(PHRASES_FILE) as f:
+                phrases = [line.strip() for line in f if line.strip()]
 
-        if len(audio_data) > 100:
-            print(f"[TTS] synthesized {len(audio_data)} bytes for: {text[:60]}")
-            return base64.b64encode(audio_data).decode("ascii")
+    engine = _engines[0]
+    if not await engine.wait_ready(PRESYNTH_WAIT):
+        print(f"[TTS] {engine.name} not ready, skipping pre-synthesis")
+        return
+    results = await asyncio.gather(*(_cache_phrase(engine, p) for p in phrases))
+    print(f"[TTS] pre-synthesized {sum(results)}/{len(phrases)} phrases with {engine.name}")
 
-        return _generate_beep_wav_base64()
 
+async def _cache_phrase(engine: TTSEngine, text: str) -> bool:
+    key = cache_key(text, engine)
+    if key in _audio_cache or _read_disk(key, engine):
+        return True
+    try:
+        audio = b"".join([data async for data in engine.stream(text)])
+    except EngineUnavailable:
+        return False
     except Exception as e:
-        print(f"[TTS] edge-tts error: {e} — falling back to beep")
-        return _generate_beep_wav_base64()
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
+        print(f"[TTS] {engine.name} error: {e}")
+        return False
+    if len(audio) <= 100:
+        return False
+    _audio_cache.put(key, AudioChunk(engine.format, engine.sample_rate, audio, final=True))
+    _write_disk(key, engine, audio)
+    return True
 
 
-def _generate_beep_wav_base64(sample_rate: int = 22050) -> str:
-    """Generate a short notification beep as base64 WAV."""
-    duration = 0.3
-    freq = 880
-    num_samples = int(sample_rate * duration)
+def tts_cache_stats() -> dict:
+    return {**_audio_cache.stats(), "disk_hits": _disk_hits, "disk_tier": bool(CACHE_DIR)}
+
+
+def speech_stats() -> dict:
+    spoken = _stats["utterances"]
+    return {
+        "engines": [e.name for e in _engines],
+        **{k: v for k, v in _stats.items() if k != "first_audio_ms_total"},
+        "mean_first_audio_ms": round(_stats["first_audio_ms_total"] / spoken, 1) if spoken else 0.0,
+    }
+
+
+def _read_disk(key: str, engine: TTSEngine) -> AudioChunk | None:
+    global _disk_hits
+    if not CACHE_DIR:
+        return None
+    try:
+        with open(os.path.join(CACHE_DIR, f"{key}.{engine.format}"), "rb") as f:
+            chunk = AudioChunk(engine.format, engine.sample_rate, f.read(), final=True)
+    except OSError:
+        return None
+    _disk_hits += 1
+    _audio_cache.put(key, chunk)
+    return chunk
 
-    buf = io.BytesIO()
-    data_size = num_samples * 2
 
+def _write_disk(key: str, engine: TTSEngine, audio: bytes):
+    if not CACHE_DIR:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = os.path.join(CACHE_DIR, f"{key}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, os.path.join(CACHE_DIR, f"{key}.{engine.format}"))
+    except OSError as e:
+        print(f"[TTS] disk cache write failed: {e}")
+
+
+def _wav_bytes(pcm16: bytes, sample_rate: int) -> bytes:
+    """Wrap mono 16-bit little-endian PCM in a WAV header."""
+    data_size = len(pcm16)
+    buf = io.BytesIO()
     buf.write(b"RIFF")
     buf.write(struct.pack("<I", 36 + data_size))
     buf.write(b"WAVE")
@@ -67,11 +251,23 @@ def _generate_beep_wav_base64(sample_rate: int = 22050) -> str:
     buf.write(struct.pack("<H", 16))
     buf.write(b"data")
     buf.write(struct.pack("<I", data_size))
+    buf.write(pcm16)
+    return buf.getvalue()
+
+
+@functools.lru_cache(maxsize=4)
+def _beep_wav(sample_rate: int = 22050) -> bytes:
+    """A short notification beep as WAV bytes (built once per rate)."""
+    duration = 0.3
+    freq = 880
+    num_samples = int(sample_rate * duration)
 
-    for i in range(num_samples):
-        t = i / sample_rate
-        envelope = 1.0 - (t / duration)
-        sample = int(16000 * envelope * math.sin(2 * math.pi * freq * t))
-        buf.write(struct.pack("<h", max(-32768, min(32767, sample))))
+    t = np.arange(num_samples) / sample_rate
+    envelope = 1.0 - (t / duration)
+    samples = (16000 * envelope * np.sin(2 * np.pi * freq * t)).astype("<i2")
+    return _wav_bytes(samples.tobytes(), sample_rate)
 
-    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+def _generate_beep_wav_base64(sample_rate: int = 22050) -> str:
+    """Generate a short notification beep as base64 WAV."""
+    return base64.b64encode(_beep_wav(sample_rate)).decode("ascii")
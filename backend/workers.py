@@ -0,0 +1,261 @@
+"""
+Optional worker processes for the per-session CPU stages: pace/energy/pitch
+extraction and the frame-change gate's JPEG decode. Run on the scheduler's
+threads, their numpy and Pillow work still holds the GIL often enough to
+add latency to the event loop that serves every session's WebSocket; in a
+worker process it can't.
+
+Each session is pinned to one single-process worker, so its stateful
+analyzers live there between calls. PCM and image bytes are handed over
+through reusable ``multiprocessing.shared_memory`` blocks instead of being
+pickled; only the block name, length and small result dicts cross the
+pipe. Workers are spawned and warmed up at startup.
+
+Enable with PITCHMIND_PROCESS_WORKERS=<n> (0, the default, keeps
+everything on threads).
+"""
+import base64
+import io
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from agents.audio_agent import DEFAULT_SIGNALS, StreamingAudioAnalyzer
+from agents.frame_change import FrameChangeDetector, tally
+
+PROCESS_WORKERS = int(os.environ.get("PITCHMIND_PROCESS_WORKERS", 0))
+# Smallest shared block; a 4 s chunk of 48 kHz float32 PCM fits in 1 MiB.
+MIN_BLOCK_BYTES = 64 * 1024
+# Idle blocks kept for reuse; beyond this the smallest are unlinked.
+MAX_FREE_BLOCKS = 16
+# Blocks a worker keeps mapped.
+MAX_ATTACHED = 32
+
+
+# ── Worker side ──────────────────────────────────────────────────
+
+_attached: dict[str, shared_memory.SharedMemory] = {}
+_audio: dict[str, StreamingAudioAnalyzer] = {}
+_gates: dict[str, FrameChangeDetector] = {}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = _attached.get(name)
+    if shm is None:
+        if len(_attached) >= MAX_ATTACHED:
+            _attached.pop(next(iter(_attached))).close()
+        # Spawned workers share the server's resource tracker, so attaching
+        # doesn't make the worker an owner; the server unlinks its blocks.
+        shm = _attached[name] = shared_memory.SharedMemory(name=name)
+    return shm
+
+
+def _warm():
+    """Pool initializer: pay for imports, FFT plans and the JPEG decoder up front."""
+    from PIL import Image
+    StreamingAudioAnalyzer().process(np.zeros(16000, dtype=np.float32))
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buf, format="JPEG")
+    FrameChangeDetector().check(buf.getvalue())
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _process_audio(session_id: str, block: str, n: int, sample_rate: int) -> dict:
+    pcm = np.ndarray((n,), dtype=np.float32, buffer=_attach(block).buf)
+    analyzer = _audio.get(session_id)
+    if analyzer is None:
+        analyzer = _audio[session_id] = StreamingAudioAnalyzer()
+    # The analyzer copies what it keeps, so the block can be reused right after.
+    return analyzer.process(pcm, sample_rate)
+
+
+def _check_frame(session_id: str, block: str, n: int) -> dict | None:
+    gate = _gates.get(session_id)
+    if gate is None:
+        gate = _gates[session_id] = FrameChangeDetector()
+    return gate.check(bytes(_attach(block).buf[:n]))
+
+
+def _store_frame(session_id: str, result: dict):
+    gate = _gates.get(session_id)
+    if gate is not None:
+        gate.store(result)
+
+
+def _drop(session_id: str):
+    _audio.pop(session_id, None)
+    _gates.pop(session_id, None)
+
+
+# ── Parent side ──────────────────────────────────────────────────
+
+class _Blocks:
+    """Free list of shared memory blocks, reused across calls and workers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._free: list[shared_memory.SharedMemory] = []
+        self.created = 0
+
+    def acquire(self, nbytes: int) -> shared_memory.SharedMemory:
+        with self._lock:
+            for i, shm in enumerate(self._free):
+                if shm.size >= nbytes:
+                    return self._free.pop(i)
+        size = max(MIN_BLOCK_BYTES, 1 << (nbytes - 1).bit_length())
+        self.created += 1
+        return shared_memory.SharedMemory(create=True, size=size)
+
+    def release(self, shm: shared_memory.SharedMemory):
+        with self._lock:
+            self._free.append(shm)
+            self._free.sort(key=lambda s: s.size)
+            if len(self._free) > MAX_FREE_BLOCKS:
+                _unlink(self._free.pop(0))
+
+    def close(self):
+        with self._lock:
+            for shm in self._free:
+                _unlink(shm)
+            self._free.clear()
+
+    @property
+    def idle(self) -> int:
+        return len(self._free)
+
+
+def _unlink(shm: shared_memory.SharedMemory):
+    shm.close()
+    shm.unlink()
+
+
+class ProcessWorkers:
+    """
+    Pinned worker processes. The blocking calls (``process_audio``,
+    ``check_frame``) are meant to run on a scheduler thread, which waits
+    on the worker without holding the GIL.
+    """
+
+    def __init__(self, workers: int):
+        context = multiprocessing.get_context("spawn")
+        self._executors = [
+            ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_warm)
+            for _ in range(workers)
+        ]
+        self._blocks = _Blocks()
+        self._sessions: set[str] = set()
+        self.counters = {"audio_calls": 0, "frame_calls": 0, "bytes_shared": 0}
+
+    def start(self):
+        """Spawn and warm every worker now rather than on the first session's audio."""
+        for executor in self._executors:
+            executor.submit(_ping)
+
+    def shutdown(self):
+        for executor in self._executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._blocks.close()
+
+    def _executor(self, session_id: str) -> ProcessPoolExecutor:
+        # Stable across calls (unlike hash()), so a session always meets its state.
+        self._sessions.add(session_id)
+        return self._executors[zlib.crc32(session_id.encode()) % len(self._executors)]
+
+    def _call(self, session_id: str, fn, data, *args):
+        view = memoryview(data).cast("B")
+        shm = self._blocks.acquire(view.nbytes)
+        try:
+            shm.buf[:view.nbytes] = view
+            self.counters["bytes_shared"] += view.nbytes
+            return self._executor(session_id).submit(
+                fn, session_id, shm.name, *args
+            ).result()
+        finally:
+            self._blocks.release(shm)
+
+    def process_audio(self, session_id: str, pcm: np.ndarray, sample_rate: int) -> dict:
+        pcm = np.ascontiguousarray(pcm, dtype=np.float32)
+        self.counters["audio_calls"] += 1
+        return self._call(session_id, _process_audio, pcm, len(pcm), sample_rate)
+
+    def check_frame(self, session_id: str, frame: str | bytes) -> dict | None:
+        data = frame if isinstance(frame, bytes) else base64.b64decode(frame)
+        self.counters["frame_calls"] += 1
+        cached = self._call(session_id, _check_frame, data, len(data))
+        if cached is not None:
+            tally("skipped")
+        return cached
+
+    def store_frame(self, session_id: str, result: dict):
+        # Same single-process worker as the checks, so it lands in order.
+        tally("analyzed")
+        self._executor(session_id).submit(_store_frame, session_id, result)
+
+    def drop_session(self, session_id: str):
+        if session_id in self._sessions:
+            self._executor(session_id).submit(_drop, session_id)
+            self._sessions.discard(session_id)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._executors),
+            "sessions": len(self._sessions),
+            "blocks_created": self._blocks.created,
+            "blocks_idle": self._blocks.idle,
+            **self.counters,
+        }
+
+
+class RemoteAudioAnalyzer:
+    """``StreamingAudioAnalyzer`` interface for a session pinned to a worker."""
+
+    def __init__(self, workers: ProcessWorkers, session_id: str):
+        self._workers = workers
+        self._session_id = session_id
+
+    def process(self, audio: np.ndarray, sample_rate: int = 16000) -> dict:
+        try:
+            return self._workers.process_audio(self._session_id, audio, sample_rate)
+        except Exception as e:
+            print(f"[Workers] audio analysis failed: {e!r}")
+            return dict(DEFAULT_SIGNALS)
+
+
+class RemoteFrameGate:
+    """``FrameChangeDetector`` interface (check/store) for a pinned session."""
+
+    def __init__(self, workers: ProcessWorkers, session_id: str):
+        self._workers = workers
+        self._session_id = session_id
+
+    def check(self, frame: str | bytes) -> dict | None:
+        try:
+            return self._workers.check_frame(self._session_id, frame)
+        except Exception as e:
+            # Unknown means changed: the frame goes to the vision model.
+            print(f"[Workers] frame check failed: {e!r}")
+            return None
+
+    def store(self, result: dict):
+        self._workers.store_frame(self._session_id, result)
+
+
+# Spawned workers import this module too; only the server process owns a pool.
+process_workers = (
+    ProcessWorkers(PROCESS_WORKERS)
+    if PROCESS_WORKERS > 0 and multiprocessing.parent_process() is None else None
+)
+
+
+def worker_stats() -> dict:
+    if process_workers is None:
+        return {"enabled": False}
+    return {"enabled": True, **process_workers.stats()}
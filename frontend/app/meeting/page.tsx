@@ -11,19 +11,28 @@ import { EmotionPanel } from '@/components/EmotionPanel'
 import { TranscriptPanel } from '@/components/meeting/transcript-panel'
 import { CoachingFeed } from '@/components/CoachingFeed'
 
-function float32ToBase64(buffer: ArrayBuffer): string {
-  const bytes = new Uint8Array(buffer)
-  let binary = ''
-  for (let i = 0; i < bytes.length; i++) {
-    binary += String.fromCharCode(bytes[i])
-  }
-  return btoa(binary)
+// Binary media frame: 8-byte little-endian header (kind u8, version u8,
+// reserved u16, sample_rate u32) followed by the raw payload. Mirrors
+// backend/protocol.py.
+const BINARY_VERSION = 1
+const KIND_AUDIO = 1
+const KIND_FRAME = 2
+
+function encodeBinaryFrame(kind: number, payload: ArrayBuffer, sampleRate = 0): ArrayBuffer {
+  const out = new Uint8Array(8 + payload.byteLength)
+  const header = new DataView(out.buffer)
+  header.setUint8(0, kind)
+  header.setUint8(1, BINARY_VERSION)
+  header.setUint16(2, 0, true)
+  header.setUint32(4, sampleRate, true)
+  out.set(new Uint8Array(payload), 8)
+  return out.buffer
 }
 
 export default function MeetingPage() {
   const router = useRouter()
   const { setupData, setEarbud, earbud } = useMeeting()
-  const { connectionStatus, connect, disconnect, send } = useWebSocket()
+  const { connectionStatus, connect, disconnect, send, sendBinary } = useWebSocket()
   const { selectedDeviceId, isDeviceConnected } = useAudioOutputDevice()
 
   const videoRef = useRef<HTMLVideoElement>(null)
@@ -77,9 +86,14 @@ export default function MeetingPage() {
           const ctx = canvas.getContext('2d')
           if (!ctx) return
           ctx.drawImage(video, 0, 0)
-          const dataUrl = canvas.toDataURL('image/jpeg', 0.7)
-          const base64 = dataUrl.split(',')[1]
-          send({ type: 'frame', data: base64 })
+          canvas.toBlob(
+            async (blob) => {
+              if (!blob) return
+              sendBinary(encodeBinaryFrame(KIND_FRAME, await blob.arrayBuffer()))
+            },
+            'image/jpeg',
+            0.7
+          )
         }, 3000)
 
         // Raw PCM audio capture via AudioWorklet (16kHz float32)
@@ -94,8 +108,7 @@ export default function MeetingPage() {
 
           worklet.port.onmessage = (e: MessageEvent) => {
             const pcmBuffer: ArrayBuffer = e.data.pcm
-            const base64 = float32ToBase64(pcmBuffer)
-            send({ type: 'audio', data: base64, sample_rate: 16000, format: 'float32' })
+            sendBinary(encodeBinaryFrame(KIND_AUDIO, pcmBuffer, 16000))
           }
 
           source.connect(worklet)
@@ -114,7 +127,7 @@ export default function MeetingPage() {
       audioCtxRef.current?.close()
       streamRef.current?.getTracks().forEach((t) => t.stop())
     }
-  }, [send])
+  }, [sendBinary])
 
   async function handleEndMeeting() {
     disconnect()
@@ -3,11 +3,11 @@
 import { useEffect, useRef, useMemo } from 'react'
 import { useMeeting } from '@/lib/meeting-context'
 import { AlertTriangle } from 'lucide-react'
-import type { TranscriptEntry } from '@/lib/types'
+import type { TranscriptEntry, TranscriptPartial } from '@/lib/types'
 
 export function TranscriptFeed() {
   const { session } = useMeeting()
-  const { transcript } = session
+  const { transcript, partialTranscript } = session
   const scrollRef = useRef<HTMLDivElement>(null)
 
   useEffect(() => {
@@ -17,7 +17,7 @@ export function TranscriptFeed() {
         behavior: 'smooth',
       })
     }
-  }, [transcript])
+  }, [transcript, partialTranscript])
 
   const hasJargon = useMemo(
     () => transcript.some((t) => t.jargonFlags.length > 0),
@@ -40,7 +40,7 @@ export function TranscriptFeed() {
         className="flex-1 overflow-y-auto rounded-lg bg-panel p-3"
         style={{ minHeight: 0 }}
       >
-        {transcript.length === 0 && (
+        {transcript.length === 0 && !partialTranscript && (
           <div className="flex h-full items-center justify-center">
             <span className="font-mono text-xs text-muted-foreground">
               Waiting for transcript...
@@ -51,6 +51,7 @@ export function TranscriptFeed() {
           {transcript.map((entry, i) => (
             <TranscriptLine key={i} entry={entry} />
           ))}
+          {partialTranscript && <PartialLine partial={partialTranscript} />}
         </div>
       </div>
     </div>
@@ -88,3 +89,14 @@ function TranscriptLine({ entry }: { entry: TranscriptEntry }) {
     </div>
   )
 }
+
+function PartialLine({ partial }: { partial: TranscriptPartial }) {
+  return (
+    <div className="flex gap-3 text-sm leading-relaxed">
+      <span className="flex-shrink-0 font-mono text-[10px] tabular-nums text-muted-foreground">
+        {partial.timestamp}
+      </span>
+      <p className="flex-1 italic text-muted-foreground">{partial.text}</p>
+    </div>
+  )
+}
@@ -4,6 +4,7 @@ import { useCallback, useEffect, useRef, useState } from 'react'
 import { useMeeting } from '@/lib/meeting-context'
 import type { CoachingCard, WireMessage, CoachingMessage } from '@/lib/types'
 import { WIRE_CATEGORY_MAP } from '@/lib/types'
+import { CoachingAudioQueue } from '@/lib/audio-queue'
 
 type ConnectionStatus = 'connecting' | 'connected' | 'disconnected'
 
@@ -16,6 +17,7 @@ export function useWebSocket(url: string = 'ws://localhost:8000/ws/session') {
   const retryMsRef = useRef(INITIAL_RETRY_MS)
   const intentionalCloseRef = useRef(false)
   const coachIdRef = useRef(0)
+  const audioQueueRef = useRef<CoachingAudioQueue | null>(null)
 
   const [connectionStatus, setConnectionStatus] = useState<ConnectionStatus>('disconnected')
   const { session: state, dispatch, earbud } = useMeeting()
@@ -55,6 +57,13 @@ export function useWebSocket(url: string = 'ws://localhost:8000/ws/session') {
               })
               break
 
+            case 'transcript_partial':
+              dispatch({
+                type: 'SET_PARTIAL_TRANSCRIPT',
+                payload: data.text ? { text: data.text, timestamp: data.timestamp } : null,
+              })
+              break
+
             case 'emotion':
               dispatch({
                 type: 'UPDATE_EMOTION',
@@ -107,22 +116,8 @@ export function useWebSocket(url: string = 'ws://localhost:8000/ws/session') {
                 console.log('[Coaching] Audio suppressed — no earbud device connected')
                 break
               }
-              try {
-                const audioBytes = Uint8Array.from(atob(data.audio), (c) => c.charCodeAt(0))
-                const blob = new Blob([audioBytes], { type: 'audio/mpeg' })
-                const audioUrl = URL.createObjectURL(blob)
-                const audio = new Audio(audioUrl)
-                audio.volume = 0.8
-                if ('setSinkId' in audio) {
-                  await (audio as unknown as { setSinkId: (id: string) => Promise<void> }).setSinkId(
-                    deviceId
-                  )
-                }
-                audio.play().catch(() => {})
-                audio.onended = () => URL.revokeObjectURL(audioUrl)
-              } catch {
-                // audio playback not available
-              }
+              audioQueueRef.current ??= new CoachingAudioQueue()
+              audioQueueRef.current.push(data, deviceId)
               break
             }
           }
@@ -155,8 +150,16 @@ export function useWebSocket(url: string = 'ws://localhost:8000/ws/session') {
     }
   }, [])
 
+  const sendBinary = useCallback((data: ArrayBuffer) => {
+    if (wsRef.current?.readyState === WebSocket.OPEN) {
+      wsRef.current.send(data)
+    }
+  }, [])
+
   const disconnect = useCallback(() => {
     intentionalCloseRef.current = true
+    audioQueueRef.current?.close()
+    audioQueueRef.current = null
     clearTimeout(reconnectTimeoutRef.current)
     wsRef.current?.close()
     wsRef.current = null
@@ -169,8 +172,9 @@ export function useWebSocket(url: string = 'ws://localhost:8000/ws/session') {
       intentionalCloseRef.current = true
       clearTimeout(reconnectTimeoutRef.current)
       wsRef.current?.close()
+      audioQueueRef.current?.close()
     }
   }, [])
 
-  return { state, connectionStatus, connect, disconnect, send }
+  return { state, connectionStatus, connect, disconnect, send, sendBinary }
 }
@@ -0,0 +1,101 @@
+import type { CoachingAudioMessage } from './types'
+
+const VOLUME = 0.8
+// Small lead so the first buffer isn't scheduled in the past.
+const START_LEAD_S = 0.02
+
+type Pending = { format: CoachingAudioMessage['format']; parts: Uint8Array[] }
+
+function decodeBase64(b64: string): Uint8Array {
+  return Uint8Array.from(atob(b64), (c) => c.charCodeAt(0))
+}
+
+function concat(parts: Uint8Array[]): Uint8Array {
+  const out = new Uint8Array(parts.reduce((n, p) => n + p.byteLength, 0))
+  let offset = 0
+  for (const p of parts) {
+    out.set(p, offset)
+    offset += p.byteLength
+  }
+  return out
+}
+
+/**
+ * Plays streamed coaching audio back to back on one AudioContext.
+ * PCM chunks are scheduled the moment they arrive; encoded formats are
+ * buffered per utterance and decoded once the final chunk lands.
+ */
+export class CoachingAudioQueue {
+  private ctx: AudioContext | null = null
+  private gain: GainNode | null = null
+  private sinkId = ''
+  private nextStart = 0
+  private pending = new Map<number, Pending>()
+  // Chunks are handled strictly in arrival order, even across async decodes.
+  private tail: Promise<void> = Promise.resolve()
+
+  push(chunk: CoachingAudioMessage, sinkId: string) {
+    this.tail = this.tail.then(() => this.handle(chunk, sinkId)).catch(() => {})
+  }
+
+  close() {
+    this.pending.clear()
+    this.ctx?.close().catch(() => {})
+    this.ctx = null
+    this.gain = null
+    this.nextStart = 0
+  }
+
+  private async handle(chunk: CoachingAudioMessage, sinkId: string) {
+    const ctx = await this.context(sinkId)
+    const bytes = decodeBase64(chunk.audio)
+
+    if (chunk.format === 'pcm_s16le') {
+      if (bytes.byteLength) this.schedule(ctx, this.pcmBuffer(ctx, bytes, chunk.sample_rate))
+      return
+    }
+
+    const entry = this.pending.get(chunk.id) ?? { format: chunk.format, parts: [] }
+    entry.parts.push(bytes)
+    this.pending.set(chunk.id, entry)
+    if (!chunk.final) return
+
+    this.pending.delete(chunk.id)
+    const data = concat(entry.parts)
+    if (!data.byteLength) return
+    this.schedule(ctx, await ctx.decodeAudioData(data.buffer as ArrayBuffer))
+  }
+
+  private async context(sinkId: string): Promise<AudioContext> {
+    if (!this.ctx) {
+      this.ctx = new AudioContext()
+      this.gain = this.ctx.createGain()
+      this.gain.gain.value = VOLUME
+      this.gain.connect(this.ctx.destination)
+      this.sinkId = ''
+    }
+    if (this.ctx.state === 'suspended') await this.ctx.resume()
+    if (sinkId !== this.sinkId && 'setSinkId' in this.ctx) {
+      await (this.ctx as unknown as { setSinkId: (id: string) => Promise<void> }).setSinkId(sinkId)
+      this.sinkId = sinkId
+    }
+    return this.ctx
+  }
+
+  private pcmBuffer(ctx: AudioContext, bytes: Uint8Array, sampleRate: number): AudioBuffer {
+    const samples = new Int16Array(bytes.buffer, bytes.byteOffset, bytes.byteLength >> 1)
+    const buffer = ctx.createBuffer(1, samples.length, sampleRate)
+    const channel = buffer.getChannelData(0)
+    for (let i = 0; i < samples.length; i++) channel[i] = samples[i] / 32768
+    return buffer
+  }
+
+  private schedule(ctx: AudioContext, buffer: AudioBuffer) {
+    const source = ctx.createBufferSource()
+    source.buffer = buffer
+    source.connect(this.gain!)
+    const start = Math.max(ctx.currentTime + START_LEAD_S, this.nextStart)
+    source.start(start)
+    this.nextStart = start + buffer.duration
+  }
+}
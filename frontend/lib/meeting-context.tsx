@@ -5,6 +5,7 @@ import type {
   SetupData,
   SessionState,
   TranscriptEntry,
+  TranscriptPartial,
   EmotionData,
   CoachingCard,
   AudioSignals,
@@ -16,6 +17,7 @@ const MAX_EMOTION_HISTORY = 60
 
 export type SessionAction =
   | { type: 'ADD_TRANSCRIPT'; payload: TranscriptEntry }
+  | { type: 'SET_PARTIAL_TRANSCRIPT'; payload: TranscriptPartial | null }
   | { type: 'UPDATE_EMOTION'; payload: EmotionData }
   | { type: 'ADD_COACHING'; payload: CoachingCard }
   | { type: 'UPDATE_AUDIO'; payload: AudioSignals }
@@ -39,6 +41,7 @@ interface MeetingContextType {
 
 const initialSessionState: SessionState = {
   transcript: [],
+  partialTranscript: null,
   coaching: [],
   emotionHistory: [],
   currentEmotion: null,
@@ -49,7 +52,13 @@ const initialSessionState: SessionState = {
 function sessionReducer(state: SessionState, action: SessionAction): SessionState {
   switch (action.type) {
     case 'ADD_TRANSCRIPT':
-      return { ...state, transcript: [...state.transcript, action.payload] }
+      return {
+        ...state,
+        transcript: [...state.transcript, action.payload],
+        partialTranscript: null,
+      }
+    case 'SET_PARTIAL_TRANSCRIPT':
+      return { ...state, partialTranscript: action.payload }
     case 'UPDATE_EMOTION':
       return {
         ...state,
@@ -9,6 +9,12 @@ export type TranscriptMessage = {
   jargon_flags: string[]
 }
 
+export type TranscriptPartialMessage = {
+  type: 'transcript_partial'
+  text: string
+  timestamp: string
+}
+
 export type EmotionMessage = {
   type: 'emotion'
   score: number
@@ -43,14 +49,22 @@ export type MomentMessage = {
   color: 'red' | 'amber' | 'green' | 'blue'
 }
 
+// One utterance arrives as several chunks sharing an id; the last has final: true.
+// pcm_s16le chunks are playable on their own, mp3/wav only once complete.
 export type CoachingAudioMessage = {
   type: 'coaching_audio'
+  id: number
+  seq: number
+  final: boolean
+  format: 'mp3' | 'pcm_s16le' | 'wav'
+  sample_rate: number
   audio: string
   message: string
 }
 
 export type WireMessage =
   | TranscriptMessage
+  | TranscriptPartialMessage
   | EmotionMessage
   | CoachingMessage
   | AudioMessage
@@ -75,6 +89,12 @@ export interface TranscriptEntry {
   jargonFlags: string[]
 }
 
+// Words Whisper hasn't committed yet; each update replaces the last.
+export interface TranscriptPartial {
+  text: string
+  timestamp: string
+}
+
 export interface EmotionData {
   score: number
   emotions: {
@@ -115,6 +135,7 @@ export interface MomentMarker {
 
 export interface SessionState {
   transcript: TranscriptEntry[]
+  partialTranscript: TranscriptPartial | null
   coaching: CoachingCard[]
   emotionHistory: EmotionData[]
   currentEmotion: EmotionData | null